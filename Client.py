@@ -1,18 +1,27 @@
 import hashlib
 import re
-from database import connect_to_db, close_db_connection
+from database import db_connection
+
+NAME_RE = re.compile(r'^[А-Яа-я\s\-]*$')
+PHONE_RE = re.compile(r'^\d{3} \d{3} \d{2} \d{2}$')
+EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+DIGIT_RE = re.compile(r'\d')
+LOWER_RE = re.compile(r'[a-z]')
+UPPER_RE = re.compile(r'[A-Z]')
+# Тип клиента при регистрации -> тип клиента в БД
+CLIENT_TYPES = {'individual': 'Физическое лицо', 'company': 'Юридическое лицо'}
 
 
 def is_valid_name(name):
     """Функция для проверки переданной строки."""
-    return bool(re.match(r'^[А-Яа-я\s\-]*$', name))
+    return bool(NAME_RE.match(name))
 
 
 def is_valid_phone():
     """Функция для проверки формата телефона"""
     while True:
         phone = input("Введите телефон в формате '999 999 99 99' с пробелами: ")
-        if re.match(r'^\d{3} \d{3} \d{2} \d{2}$', phone):
+        if PHONE_RE.match(phone):
             return phone
         else:
             print("Некорректный формат телефона. Пожалуйста, введите еще раз.")
@@ -22,12 +31,53 @@ def is_valid_email():
     """Функция для проверки формата почты"""
     while True:
         email = input("Введите почту в формате 'info@rambler.ru': ")
-        if re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', email):
+        if EMAIL_RE.match(email):
             return email
         else:
             print("Некорректный формат почты. Пожалуйста, введите еще раз.")
 
 
+def password_error(password):
+    """Проверяет сложность пароля. Возвращает сообщение об ошибке или None"""
+    if len(password) < 8:
+        return "Ошибка: Пароль должен содержать как минимум 8 символов."
+    if not DIGIT_RE.search(password):
+        return "Ошибка: Пароль должен содержать хотя бы одну цифру."
+    if not LOWER_RE.search(password):
+        return "Ошибка: Пароль должен содержать хотя бы одну маленькую латинскую букву."
+    if not UPPER_RE.search(password):
+        return "Ошибка: Пароль должен содержать хотя бы одну большую латинскую букву."
+    return None
+
+
+def hash_password(password):
+    """Хеш пароля, который хранится в clients.password"""
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def registration_error(client_type, full_name, company_name, director_name, email, phone, password):
+    """Проверяет данные регистрации теми же правилами, что и register_client. Возвращает сообщение об ошибке или None"""
+    if client_type not in CLIENT_TYPES:
+        return "Некорректный тип клиента"
+    if client_type == 'individual':
+        if len(full_name) > 75:
+            return "Ошибка: ФИО не может превышать 75 символов."
+        if not full_name or not is_valid_name(full_name):
+            return 'Ошибка. ФИО не должно содержать цифры или специальные символы.'
+    else:
+        if not company_name or len(company_name) > 40:
+            return "Ошибка: Название компании не должно превышать 40 символов."
+        if len(director_name) > 75:
+            return "Ошибка: ФИО директора не должно превышать 75 символов."
+        if not director_name or not is_valid_name(director_name):
+            return 'Ошибка. ФИО не должно содержать цифры или специальные символы.'
+    if not EMAIL_RE.match(email):
+        return "Некорректный формат почты."
+    if not PHONE_RE.match(phone):
+        return "Некорректный формат телефона."
+    return password_error(password)
+
+
 class Client:
     @staticmethod
     def update_client_info_company(client_id, new_name, new_director_name, new_phone, new_email, new_password):
@@ -45,19 +95,17 @@ class Client:
         Возвращает:
         str: Сообщение об успешном обновлении данных клиента.
         """
-        conn, cursor = connect_to_db()  # Открытие соединения
-
         # Хеширование нового пароля
         hashed_password = hashlib.sha256(new_password.encode()).hexdigest()
 
-        # Обновление данных клиента в таблицах clients и accounts
-        cursor.execute('UPDATE clients SET full_name = ?, director_name = ?, phone = ?, email = ?, password = ? '
-                       'WHERE id = ?', (new_name, new_director_name, new_phone, new_email, hashed_password, client_id))
-        cursor.execute('UPDATE accounts SET owner_name = ? WHERE client_id = ?',
-                       (new_name, client_id))
+        with db_connection() as (conn, cursor):
+            # Обновление данных клиента в таблицах clients и accounts
+            cursor.execute('UPDATE clients SET full_name = ?, director_name = ?, phone = ?, email = ?, password = ? '
+                           'WHERE id = ?',
+                           (new_name, new_director_name, new_phone, new_email, hashed_password, client_id))
+            cursor.execute('UPDATE accounts SET owner_name = ? WHERE client_id = ?',
+                           (new_name, client_id))
 
-        conn.commit()  # Сохраняем
-        close_db_connection(conn)  # Закрытие соединения
         return 'Данные успешно обновлены.'
 
     @staticmethod
@@ -75,19 +123,16 @@ class Client:
             str: Сообщение об успешном обновлении данных.
 
         """
-        conn, cursor = connect_to_db()  # Открытие соединения
-
         # Хеширование нового пароля
         hashed_password = hashlib.sha256(new_password.encode()).hexdigest()
 
-        # ООбновление данных клиента в таблицах clients и accounts
-        cursor.execute('UPDATE clients SET full_name = ?, phone = ?, email = ?, password = ? '
-                       'WHERE id = ?', (new_name, new_phone, new_email, hashed_password, client_id))
-        cursor.execute('UPDATE accounts SET owner_name = ? WHERE client_id = ?',
-                       (new_name, client_id))
+        with db_connection() as (conn, cursor):
+            # ООбновление данных клиента в таблицах clients и accounts
+            cursor.execute('UPDATE clients SET full_name = ?, phone = ?, email = ?, password = ? '
+                           'WHERE id = ?', (new_name, new_phone, new_email, hashed_password, client_id))
+            cursor.execute('UPDATE accounts SET owner_name = ? WHERE client_id = ?',
+                           (new_name, client_id))
 
-        conn.commit()  # Сохраняем
-        close_db_connection(conn)  # Закрытие соединения
         return 'Данные успешно обновлены.'
 
     @staticmethod
@@ -102,14 +147,17 @@ class Client:
     Returns:
         str: Сообщение об успешном создании счета или ошибка, если счет уже существует или указан некорректный тип клиента.
     """
-        conn, cursor = connect_to_db()  # Открытие соединения
+        with db_connection() as (conn, cursor):
+            return Client._create_account(cursor, client_id, user_type)
 
+    @staticmethod
+    def _create_account(cursor, client_id, user_type):
+        """Создает счет клиента через уже открытый курсор (см. create_account_for_client)"""
         # Проверка наличия счета "Расчетный" для данного юридического лица
         cursor.execute('SELECT COUNT(*) FROM accounts WHERE client_id = ? AND account_type = "Расчетный"', (client_id,))
         existing_count = cursor.fetchone()[0]
 
         if existing_count > 0:
-            close_db_connection(conn)  # Закрытие соединения
             return "Для данного юридического лица уже существует счет."
 
         # Запрос на получение типа клиента
@@ -117,7 +165,6 @@ class Client:
         client_type = cursor.fetchone()
 
         if client_type is None:
-            close_db_connection(conn)  # Закрытие соединения
             return "Такого клиента нет."
 
         if user_type == 'Физическое лицо':
@@ -133,10 +180,8 @@ class Client:
         cursor.execute('''
             INSERT INTO accounts (client_id, owner_name, account_type, is_legal_entity, balance)
             VALUES (?, ?, ?, ?, ?)
-        ''', (client_id, owner_name, account_type, client_type[0] == 'Юридическое лицо', 0.0))
+        ''', (client_id, owner_name, account_type, client_type[0] == 'Юридическое лицо', 0))
 
-        conn.commit()  # Записываем
-        close_db_connection(conn)  # Закрытие соединения
         return f"Счет успешно создан для владельца для владельца: {owner_name}"
 
     @staticmethod
@@ -146,24 +191,12 @@ class Client:
             password = input("Пароль должен содержать минимум 8 символов, хотя бы одну цифру, одну маленькую и одну \n"
                              "большую латинскую букву. Введите пароль для регистрации : ")
 
-            if len(password) < 8:
-                print("Ошибка: Пароль должен содержать как минимум 8 символов.")
-                continue
-
-            if not re.search(r'\d', password):
-                print("Ошибка: Пароль должен содержать хотя бы одну цифру.")
-                continue
-
-            if not re.search(r'[a-z]', password):
-                print("Ошибка: Пароль должен содержать хотя бы одну маленькую латинскую букву.")
-                continue
-
-            if not re.search(r'[A-Z]', password):
-                print("Ошибка: Пароль должен содержать хотя бы одну большую латинскую букву.")
+            error = password_error(password)
+            if error is not None:
+                print(error)
                 continue
 
-            hashed_password = hashlib.sha256(password.encode()).hexdigest()
-            return hashed_password
+            return hash_password(password)
 
     @staticmethod
     def register_client(client_type, user_type=None):
@@ -220,9 +253,18 @@ class Client:
         email = is_valid_email()
         phone = is_valid_phone()
 
-        # Сохранение информации в базу данных
-        conn, cursor = connect_to_db()  # Открытие соединения
+        # Сохранение информации в базу данных и создание счета выполняются на одном соединении
+        with db_connection() as (conn, cursor):
+            owner_id = Client._insert_client(cursor, client_type, full_name, company_name, director_name, email, phone,
+                                             hashed_password)
+            # Создаем счет для определенного клиента
+            Client._create_account(cursor, owner_id, user_type or CLIENT_TYPES[client_type])
+
+        print("Регистрация успешно завершена!")
 
+    @staticmethod
+    def _insert_client(cursor, client_type, full_name, company_name, director_name, email, phone, hashed_password):
+        """Добавляет клиента через уже открытый курсор и возвращает его ID"""
         if client_type == 'individual':
             cursor.execute('''
                 INSERT INTO clients (type, full_name, email, phone, password, is_legal_entity, withdrawal_limit,
@@ -231,15 +273,39 @@ class Client:
             ''', ('Физическое лицо', full_name, email, phone, hashed_password, False, None, None, None))
         else:
             cursor.execute('''
-                INSERT INTO clients (type, full_name, director_name, email, phone, password, is_legal_entity, 
+                INSERT INTO clients (type, full_name, director_name, email, phone, password, is_legal_entity,
                 withdrawal_limit, transfer_fee_rate, transfer_limit)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', ('Юридическое лицо', company_name, director_name, email, phone, hashed_password, True, 0.0, 0.0, 0.0))
+            ''', ('Юридическое лицо', company_name, director_name, email, phone, hashed_password, True, 0.0, 0.0,
+                  0.0))
+        return cursor.lastrowid
 
-        owner_id = cursor.lastrowid  # Возвращаем ID последней записи
-        Client.create_account_for_client(owner_id, user_type)  # Создаем счет для определенного клиента
+    @staticmethod
+    def register(client_type, email, phone, password, full_name='', company_name='', director_name=''):
+        """
+    Регистрация клиента без интерактивного ввода (для HTTP-сервиса и импорта).
 
-        conn.commit()  # Записываем в БД
-        close_db_connection(conn)  # Закрытие соединения
+    Данные проверяются registration_error, затем клиент и его счет создаются в одной транзакции.
 
-        print("Регистрация успешно завершена!")
+    Args:
+        client_type (str): 'individual' (физическое лицо) или 'company' (юридическое лицо).
+        email (str): Почта.
+        phone (str): Телефон в формате '999 999 99 99'.
+        password (str): Пароль (сохраняется хеш).
+        full_name (str): ФИО физического лица.
+        company_name (str): Название компании.
+        director_name (str): ФИО директора компании.
+
+    Returns:
+        tuple: (ID нового клиента или None, сообщение).
+    """
+        error = registration_error(client_type, full_name, company_name, director_name, email, phone, password)
+        if error is not None:
+            return None, error
+
+        hashed_password = hash_password(password)
+        with db_connection() as (conn, cursor):
+            client_id = Client._insert_client(cursor, client_type, full_name, company_name, director_name, email,
+                                              phone, hashed_password)
+            Client._create_account(cursor, client_id, CLIENT_TYPES[client_type])
+        return client_id, "Регистрация успешно завершена!"
@@ -0,0 +1,151 @@
+"""
+Asyncio-интерфейс к операциям банка.
+
+Функции main_bank_system и Client блокируют поток на время запроса к SQLite. AsyncBank выполняет их в своих
+потоках (DatabaseExecutor): каждый поток при старте закрепляет за собой соединение пула на запись и соединение
+пула на чтение (ConnectionPool.pin) и работает только с ними. Цикл событий лишь ждет готовый результат.
+
+Число одновременно ожидающих операций ограничено max_in_flight (остальные ждут в asyncio.Semaphore, не занимая
+ни потоков, ни памяти очереди). timeout= ограничивает ожидание результата. Отмена (или истекший timeout) снимает
+операцию, если она еще в очереди; уже начатая операция доводит свою транзакцию до конца, а результат отбрасывается.
+
+Потоки закрепляют по соединению из каждого общего пула, поэтому пул настраивается (database.configure_pool) до
+создания AsyncBank и с размером больше workers, если БД пользуются и другие потоки.
+
+    async with AsyncBank(workers=4) as bank:
+        token = await bank.authenticate('ivanov@example.com', 'Password1')
+        await bank.make_transfer(1, 3, 100, timeout=1.0)
+"""
+import asyncio
+import queue
+import threading
+from concurrent.futures import Future
+
+import Client
+import database
+import main_bank_system
+import sessions
+
+WORKERS = 4
+MAX_IN_FLIGHT = 10000
+
+
+class DatabaseExecutor:
+    """Фиксированный набор потоков с закрепленными соединениями и общей очередью задач"""
+
+    def __init__(self, workers=WORKERS):
+        self._tasks = queue.SimpleQueue()
+        self._threads = [threading.Thread(target=self._run, name=f'bank-db-{index}', daemon=True)
+                         for index in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def _run(self):
+        pools = (database.get_pool(), database.get_read_pool())
+        for pool in pools:
+            pool.pin()
+        try:
+            while True:
+                task = self._tasks.get()
+                if task is None:
+                    break
+                future, func, args, kwargs = task
+                if not future.set_running_or_notify_cancel():
+                    continue  # Отменена, пока ждала в очереди
+                try:
+                    result = func(*args, **kwargs)
+                except BaseException as error:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+        finally:
+            for pool in pools:
+                pool.unpin()
+
+    def submit(self, func, *args, **kwargs):
+        """Ставит вызов в очередь; возвращает concurrent.futures.Future"""
+        future = Future()
+        self._tasks.put((future, func, args, kwargs))
+        return future
+
+    def shutdown(self):
+        """Дожидается выполнения поставленных задач и останавливает потоки"""
+        for _ in self._threads:
+            self._tasks.put(None)
+        for thread in self._threads:
+            thread.join()
+
+
+class AsyncBank:
+    """
+    Асинхронные версии операций банка.
+
+    Args:
+        workers (int): Потоков с закрепленными соединениями.
+        max_in_flight (int): Сколько операций может одновременно ждать очереди или выполняться.
+        timeout (float): Ограничение ожидания каждой операции в секундах по умолчанию (None - без ограничения).
+    """
+
+    def __init__(self, workers=WORKERS, max_in_flight=MAX_IN_FLIGHT, timeout=None):
+        self.timeout = timeout
+        self._executor = DatabaseExecutor(workers)
+        self._limit = asyncio.Semaphore(max_in_flight)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        await self.close()
+
+    async def close(self):
+        """Дожидается начатых операций и останавливает потоки, не блокируя цикл событий"""
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+
+    async def call(self, func, *args, timeout=None, **kwargs):
+        """Выполняет блокирующую функцию в потоке БД"""
+        async with self._limit:
+            future = asyncio.wrap_future(self._executor.submit(func, *args, **kwargs))
+            return await asyncio.wait_for(future, timeout if timeout is not None else self.timeout)
+
+    async def deposit_money(self, client_id, amount, timeout=None):
+        return await self.call(main_bank_system.deposit_money, client_id, amount, timeout=timeout)
+
+    async def pay_salary(self, sender_id, recipient_id, salary_amount, principal=None, timeout=None):
+        return await self.call(main_bank_system.pay_salary, sender_id, recipient_id, salary_amount, principal,
+                               timeout=timeout)
+
+    async def pay_salary_batch(self, sender_id, payments, principal=None, timeout=None):
+        return await self.call(main_bank_system.pay_salary_batch, sender_id, payments, principal, timeout=timeout)
+
+    async def make_transfer(self, sender_id, recipient_id, amount, principal=None, timeout=None):
+        return await self.call(main_bank_system.make_transfer, sender_id, recipient_id, amount, principal,
+                               timeout=timeout)
+
+    async def view_balance(self, account_id, timeout=None):
+        return await self.call(main_bank_system.view_balance, account_id, timeout=timeout)
+
+    async def withdraw_money(self, account_id, amount, principal=None, timeout=None):
+        """Асинхронный money_cash: сумма передается аргументом, а не вводится"""
+        return await self.call(main_bank_system.withdraw_money, account_id, amount, principal, timeout=timeout)
+
+    async def authenticate(self, email_or_phone, password, timeout=None):
+        """Асинхронный login: возвращает токен сессии или None"""
+        return await self.call(sessions.authenticate, email_or_phone, password, timeout=timeout)
+
+    async def register(self, client_type, email, phone, password, full_name='', company_name='', director_name='',
+                       timeout=None):
+        return await self.call(Client.Client.register, client_type, email, phone, password, full_name, company_name,
+                               director_name, timeout=timeout)
+
+    async def create_account_for_client(self, client_id, user_type, timeout=None):
+        return await self.call(Client.Client.create_account_for_client, client_id, user_type, timeout=timeout)
+
+    async def update_client_info_individual(self, client_id, new_name, new_phone, new_email, new_password,
+                                            timeout=None):
+        return await self.call(Client.Client.update_client_info_individual, client_id, new_name, new_phone,
+                               new_email, new_password, timeout=timeout)
+
+    async def update_client_info_company(self, client_id, new_name, new_director_name, new_phone, new_email,
+                                         new_password, timeout=None):
+        return await self.call(Client.Client.update_client_info_company, client_id, new_name, new_director_name,
+                               new_phone, new_email, new_password, timeout=timeout)
@@ -0,0 +1,118 @@
+"""
+Кэш балансов счетов в памяти процесса.
+
+view_balance сначала смотрит в кэш и только при промахе читает баланс из БД. Кэш ограничен по размеру (вытесняется
+давно не читанный счет) и по времени жизни записи.
+
+Денежные операции (transfer_engine) не меняют кэш сразу, а регистрируют сброс затронутых счетов на момент
+COMMIT своей транзакции (database.on_commit): откатанная операция кэш не трогает, а после зафиксированной записи
+этого процесса чтение всегда идет в БД. Чтобы чтение, начатое до записи, не положило в кэш старое значение уже
+после сброса, put принимает поколение кэша, полученное до чтения, и ничего не записывает, если с тех пор были сбросы.
+
+Записи других процессов, работающих с тем же bank.db, кэш не видит. Для них устаревание ограничивается временем
+жизни записи (configure(ttl=...)), а configure(enabled=False) отключает кэш полностью.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from database import on_commit
+
+MAX_SIZE = 100000
+TTL = 5.0  # секунд; None - записи не устаревают (только один процесс работает с БД)
+
+
+class BalanceCache:
+    """LRU-кэш балансов в копейках с ограничением времени жизни записи и счетчиками попаданий"""
+
+    def __init__(self, max_size=MAX_SIZE, ttl=TTL, enabled=True):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # id счета -> (баланс, время записи)
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, account_id):
+        """Возвращает баланс из кэша или None при промахе"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(account_id)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[1] > self.ttl:
+                del self._entries[account_id]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(account_id)
+            self.hits += 1
+            return entry[0]
+
+    def generation(self):
+        """Поколение кэша: берется перед чтением баланса из БД и передается в put"""
+        return self._generation
+
+    def put(self, account_id, balance, generation):
+        """Кладет прочитанный из БД баланс, если с момента generation не было сбросов"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[account_id] = (balance, time.monotonic())
+            self._entries.move_to_end(account_id)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, account_ids):
+        """Сбрасывает балансы счетов"""
+        with self._lock:
+            self._generation += 1
+            for account_id in account_ids:
+                self._entries.pop(account_id, None)
+
+    def clear(self):
+        """Сбрасывает весь кэш и счетчики"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        """Счетчики кэша: попадания, промахи, доля попаданий и число записей"""
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / requests if requests else 0.0,
+                'size': len(self._entries),
+            }
+
+
+cache = BalanceCache()
+
+
+def configure(max_size=MAX_SIZE, ttl=TTL, enabled=True):
+    """
+    Настраивает кэш балансов процесса.
+
+    Args:
+        max_size (int): Максимальное число счетов в кэше.
+        ttl (float): Время жизни записи в секундах - предел устаревания, если в БД пишут другие процессы
+            (None - без ограничения).
+        enabled (bool): False отключает кэш: каждое чтение идет в БД.
+    """
+    cache.max_size = max_size
+    cache.ttl = ttl
+    cache.enabled = enabled
+    cache.clear()
+
+
+def invalidate_on_commit(cursor, *account_ids):
+    """Сбрасывает балансы счетов после COMMIT текущей транзакции курсора"""
+    account_ids = [int(account_id) for account_id in account_ids]
+    on_commit(cursor.connection, lambda: cache.invalidate(account_ids))
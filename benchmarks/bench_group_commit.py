@@ -0,0 +1,61 @@
+"""
+Сравнение пропускной способности: фиксация каждой операции отдельно и групповая фиксация (group_commit).
+
+    python benchmarks/bench_group_commit.py --threads 16 --operations 200
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+import main_bank_system  # noqa: E402
+from bench_transfer import build_database  # noqa: E402
+from group_commit import GroupCommitWriter  # noqa: E402
+
+
+def run_threads(threads, operations, accounts, operation):
+    """Запускает threads потоков, каждый выполняет operations переводов; возвращает операций в секунду"""
+    def worker(seed):
+        rnd = random.Random(seed)
+        for _ in range(operations):
+            operation(rnd.randrange(2, accounts + 1, 2), rnd.randrange(2, accounts + 1, 2), rnd.randint(1, 1000))
+
+    workers = [threading.Thread(target=worker, args=(seed,)) for seed in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return threads * operations / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--accounts', type=int, default=10000)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--operations', type=int, default=200, help='Операций на поток')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        build_database(os.path.join(directory, 'bench.db'), args.accounts)
+        database.configure_pool(os.path.join(directory, 'bench.db'), size=args.threads)
+
+        direct = run_threads(args.threads, args.operations, args.accounts, main_bank_system.make_transfer)
+        print(f'make_transfer, COMMIT на каждую операцию: {direct:.0f} операций/с')
+
+        writer = GroupCommitWriter().start()
+        grouped = run_threads(args.threads, args.operations, args.accounts,
+                              lambda *transfer: writer.make_transfer(*transfer).result())
+        writer.stop()
+        print(f'GroupCommitWriter.make_transfer: {grouped:.0f} операций/с')
+        database.close_pool()
+
+
+if __name__ == '__main__':
+    main()
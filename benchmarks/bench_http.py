@@ -0,0 +1,170 @@
+"""
+Нагрузочный тест http_service: запросов в секунду и задержка p50/p99 при разном числе одновременных клиентов.
+
+Сервис запускается отдельным процессом на синтетической БД (data_generator). Каждый клиент - поток с одним
+keep-alive соединением: вход, затем смесь запросов (половина - баланс, четверть - пополнение, четверть - перевод).
+
+Запуск из корня репозитория:
+    python benchmarks/bench_http.py --accounts 10000 --concurrency 1 4 16 64 --duration 5
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import database  # noqa: E402
+from bench_transfer import percentile  # noqa: E402
+from data_generator import PASSWORD  # noqa: E402
+from suite import build_database  # noqa: E402
+from transfer_engine import BANK_ACCOUNT_ID, INDIVIDUAL  # noqa: E402
+
+CONCURRENCY = (1, 4, 16, 64)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(db_path, port, workers):
+    """Запускает http_service отдельным процессом и ждет, пока он начнет принимать соединения"""
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'http_service.py'), '--db', db_path,
+                                '--port', str(port), '--workers', str(workers), '--backlog', '256'],
+                               stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError('Сервис не запустился')
+
+
+def load_users(db_path, count, seed):
+    """Случайные физические лица: (почта, счет)"""
+    database.configure_pool(db_path, size=1)
+    with database.db_read_connection() as (conn, cursor):
+        cursor.execute('SELECT c.email, a.id FROM clients c JOIN accounts a ON a.client_id = c.id '
+                       'WHERE c.type = ? AND c.id != ?', (INDIVIDUAL, BANK_ACCOUNT_ID))
+        users = cursor.fetchall()
+    database.close_pool()
+    return random.Random(seed).sample(users, min(count, len(users)))
+
+
+class Client:
+    """Клиент сервиса с одним keep-alive соединением"""
+
+    def __init__(self, port):
+        self.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        self.token = None
+
+    def request(self, method, path, body=None):
+        headers = {'Content-Type': 'application/json'}
+        if self.token is not None:
+            headers['Authorization'] = f'Bearer {self.token}'
+        self.conn.request(method, path, json.dumps(body) if body is not None else None, headers)
+        response = self.conn.getresponse()
+        payload = json.loads(response.read())
+        if response.status >= 400:
+            raise RuntimeError(f'{method} {path}: {response.status} {payload}')
+        return payload
+
+
+def run(port, users, concurrency, duration, seed):
+    """Нагрузка concurrency клиентами в течение duration секунд: (запросов в секунду, задержки в секундах)"""
+    latencies = [[] for _ in range(concurrency)]
+    errors = []
+    start = threading.Barrier(concurrency + 1)
+
+    def worker(index):
+        rnd = random.Random(seed * 1000 + index)
+        email, account_id = users[index % len(users)]
+        client = Client(port)
+        try:
+            client.token = client.request('POST', '/login', {'login': email, 'password': PASSWORD})['token']
+            start.wait()
+            samples = latencies[index]
+            deadline = time.perf_counter() + duration
+            while True:
+                started = time.perf_counter()
+                if started >= deadline:
+                    break
+                kind = rnd.random()
+                if kind < 0.5:
+                    client.request('GET', f'/accounts/{account_id}/balance')
+                elif kind < 0.75:
+                    client.request('POST', '/deposit', {'account_id': account_id, 'amount': rnd.randint(1, 1000)})
+                else:
+                    recipient_id = rnd.choice(users)[1]
+                    client.request('POST', '/transfer', {'sender_id': account_id, 'recipient_id': recipient_id,
+                                                         'amount': rnd.randint(1, 100)})
+                samples.append(time.perf_counter() - started)
+        except threading.BrokenBarrierError:
+            pass
+        except Exception as error:
+            errors.append(error)
+            start.abort()
+        finally:
+            client.conn.close()
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    try:
+        start.wait()
+    except threading.BrokenBarrierError:
+        pass
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    if errors:
+        raise errors[0]
+
+    samples = sorted(sample for worker_samples in latencies for sample in worker_samples)
+    return len(samples) / elapsed, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--accounts', type=int, default=10000)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=CONCURRENCY, help='Числа клиентов')
+    parser.add_argument('--workers', type=int,
+                        help='Потоков сервиса (по умолчанию - наибольшее число клиентов: keep-alive соединение '
+                             'занимает поток до закрытия)')
+    parser.add_argument('--duration', type=float, default=5.0, help='Секунд на один замер')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, 'bench.db')
+        build_database(db_path, args.accounts, args.seed)
+        users = load_users(db_path, max(args.concurrency), args.seed)
+
+        port = free_port()
+        server = start_server(db_path, port, args.workers or max(args.concurrency))
+        try:
+            for concurrency in args.concurrency:
+                throughput, samples = run(port, users, concurrency, args.duration, args.seed)
+                print(f'клиентов {concurrency}: {throughput:.0f} запр/с, p50 {percentile(samples, 0.5) * 1000:.2f} мс, '
+                      f'p99 {percentile(samples, 0.99) * 1000:.2f} мс')
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Замер поиска клиента при входе в личный кабинет (find_client) на большой таблице clients.
+
+Сравнивает задержку до и после миграций с индексами:
+    python benchmarks/bench_login.py --clients 1000000 --lookups 2000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+import migrations  # noqa: E402
+from sessions import find_client  # noqa: E402
+
+
+def build_clients(clients):
+    """Заполняет таблицу clients синтетическими клиентами с уникальными почтой и телефоном"""
+    with database.db_connection() as (conn, cursor):
+        cursor.executemany('INSERT INTO clients (id, type, full_name, email, phone, password) '
+                           'VALUES (?, ?, ?, ?, ?, ?)',
+                           ((i, 'Физическое лицо', f'Клиент {i}', f'client{i}@bank.ru',
+                             f'{i // 10 ** 7:03d} {i // 10 ** 4 % 1000:03d} {i // 100 % 100:02d} {i % 100:02d}', '')
+                            for i in range(1, clients + 1)))
+
+
+def measure(title, lookups):
+    """Выполняет поиск по списку почт/телефонов и печатает p50/p99"""
+    latencies = []
+    with database.db_connection() as (conn, cursor):
+        for key in lookups:
+            started = time.perf_counter()
+            find_client(cursor, key)
+            latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    print(f'{title}: поисков {len(lookups)}, p50 {latencies[len(latencies) // 2] * 1000:.3f} мс, '
+          f'p99 {latencies[int(len(latencies) * 0.99)] * 1000:.3f} мс')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=1000000)
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        database.configure_pool(os.path.join(directory, 'bench.db'), size=1)
+        database.create_tables()
+        build_clients(args.clients)
+
+        lookups = [f'client{rnd.randint(1, args.clients)}@bank.ru' for _ in range(args.lookups)]
+        measure('без индексов', lookups[:max(1, args.lookups // 100)])
+        migrations.migrate()
+        measure('с индексами', lookups)
+        database.close_pool()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Сравнение make_transfer через SQLite (транзакция на операцию) и через memory_ledger (баланс в памяти, журнал
+с fsync пачками и отложенная запись в БД): пропускная способность и задержка p50/p99.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_memory_ledger.py --accounts 10000 --operations 20000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+import main_bank_system  # noqa: E402
+import memory_ledger  # noqa: E402
+from bench_transfer import build_database, percentile  # noqa: E402
+
+
+def run(name, operation, transfers):
+    """Выполняет переводы и печатает скорость и задержку"""
+    latencies = []
+    started = time.perf_counter()
+    for args in transfers:
+        operation_started = time.perf_counter()
+        operation(*args)
+        latencies.append(time.perf_counter() - operation_started)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f'{name}: операций {len(transfers)}, {len(transfers) / elapsed:.0f} оп/с, '
+          f'p50 {percentile(latencies, 0.5) * 1000:.3f} мс, p99 {percentile(latencies, 0.99) * 1000:.3f} мс')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--accounts', type=int, default=10000)
+    parser.add_argument('--operations', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        build_database(os.path.join(directory, 'bench.db'), args.accounts)
+
+        individuals = range(4, args.accounts + 1, 2)
+        transfers = [(rnd.choice(individuals), rnd.choice(individuals), rnd.randint(1, 200000))
+                     for _ in range(args.operations)]
+
+        run('SQLite на каждую операцию', main_bank_system.make_transfer, transfers)
+
+        memory_ledger.start(os.path.join(directory, 'ledger_log'))
+        run('memory_ledger', memory_ledger.make_transfer, transfers)
+        started = time.perf_counter()
+        memory_ledger.stop()
+        print(f'Перенос оставшихся операций в БД при остановке: {time.perf_counter() - started:.3f} с')
+        database.close_pool()
+
+
+if __name__ == '__main__':
+    main()
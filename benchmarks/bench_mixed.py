@@ -0,0 +1,76 @@
+"""
+Смешанная нагрузка: потоки-писатели выполняют make_transfer, потоки-читатели - view_balance.
+
+Сравнивает профиль хранения с журналом отката (DELETE) и профиль WAL; чтение в обоих случаях идет через пул
+соединений только на чтение.
+    python benchmarks/bench_mixed.py --writers 4 --readers 16 --seconds 5
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+import main_bank_system  # noqa: E402
+from bench_transfer import build_database  # noqa: E402
+
+
+def run(writers, readers, seconds, accounts):
+    """Запускает потоки на seconds секунд и возвращает (записей в секунду, чтений в секунду)"""
+    stop = threading.Event()
+    counts = {'write': 0, 'read': 0}
+    lock = threading.Lock()
+
+    def loop(kind, seed):
+        rnd = random.Random(seed)
+        done = 0
+        while not stop.is_set():
+            if kind == 'write':
+                main_bank_system.make_transfer(rnd.randrange(2, accounts + 1, 2), rnd.randrange(2, accounts + 1, 2),
+                                               rnd.randint(1, 1000))
+            else:
+                main_bank_system.view_balance(rnd.randint(1, accounts))
+            done += 1
+        with lock:
+            counts[kind] += done
+
+    threads = ([threading.Thread(target=loop, args=('write', seed)) for seed in range(writers)] +
+               [threading.Thread(target=loop, args=('read', seed)) for seed in range(readers)])
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return counts['write'] / seconds, counts['read'] / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--accounts', type=int, default=10000)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    profiles = {
+        'DELETE': database.storage_profile(journal_mode='DELETE', synchronous='FULL', busy_timeout=30000),
+        'WAL': database.storage_profile(busy_timeout=30000),
+    }
+    for name, pragmas in profiles.items():
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.db')
+            build_database(path, args.accounts)
+            database.configure_pool(path, size=args.writers, pragmas=pragmas, read_size=args.readers)
+            writes, reads = run(args.writers, args.readers, args.seconds, args.accounts)
+            print(f'{name}: записей {writes:.0f}/с, чтений {reads:.0f}/с')
+            database.close_pool()
+
+
+if __name__ == '__main__':
+    main()
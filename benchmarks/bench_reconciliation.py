@@ -0,0 +1,78 @@
+"""
+Скорость сверки балансов с журналом (reconciliation) и пиковая память процесса.
+
+Синтетическая БД строится data_generator; ее история переводов не применена к балансам, поэтому расхождения
+в отчете ожидаемы - замеряется только скорость чтения и суммирования журнала.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_reconciliation.py --accounts 100000 --transactions 5000000 --workers 1 2 4
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_generator  # noqa: E402
+import database  # noqa: E402
+import migrations  # noqa: E402
+import reconciliation  # noqa: E402
+
+
+def peak_rss_mb():
+    """Пиковый RSS процесса (VmHWM, Linux): в отличие от ru_maxrss он не наследуется от родителя через fork"""
+    with open('/proc/self/status', encoding='ascii') as file:
+        for line in file:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) // 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024
+
+
+def measure(db_path, workers, chunk_size, no_numpy):
+    """Сверка в отдельном процессе, чтобы пиковая память не включала построение БД"""
+    code = (f'import sys; sys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r}); '
+            f'import bench_reconciliation; bench_reconciliation.run({db_path!r}, {workers}, {chunk_size}, {no_numpy})')
+    subprocess.run([sys.executable, '-c', code], check=True)
+
+
+def run(db_path, workers, chunk_size, no_numpy):
+    if no_numpy:
+        reconciliation.np = None
+    # Без mmap: иначе прочитанные страницы файла БД попадают в RSS и заслоняют память самой сверки
+    database.configure_pool(db_path, size=1, pragmas=database.storage_profile(mmap_size=0), read_size=1)
+    report = reconciliation.reconcile(workers, chunk_size)
+    database.close_pool()
+    print(f"процессов {workers} ({'NumPy' if reconciliation.np is not None else 'SQLite'}): "
+          f"{report['transactions'] / report['seconds']:.0f} транзакций/с, {report['seconds']:.2f} с, "
+          f"пиковая память {peak_rss_mb()} МБ", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--accounts', type=int, default=100000)
+    parser.add_argument('--transactions', type=int, default=5000000)
+    parser.add_argument('--workers', type=int, nargs='+', default=(1, 2, 4))
+    parser.add_argument('--chunk-size', type=int, default=reconciliation.CHUNK_SIZE)
+    parser.add_argument('--no-numpy', action='store_true', help='Суммировать куски в SQLite даже при наличии NumPy')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, 'bench.db')
+        database.configure_pool(db_path, size=1)
+        database.create_tables()
+        migrations.migrate()
+        started = time.perf_counter()
+        data_generator.load(args.accounts, args.transactions)
+        database.close_pool()
+        print(f'БД: {args.accounts} счетов, {args.transactions} транзакций за {time.perf_counter() - started:.1f} с')
+
+        for workers in args.workers:
+            measure(db_path, workers, args.chunk_size, args.no_numpy)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Пропускная способность переводов на шардированном хранилище (sharding) в зависимости от числа шардов.
+
+Исходная БД строится как в bench_transfer и переносится в 1, 2, 4 ... шардов через sharding.reshard. Переводы
+между физическими лицами выполняются из --processes процессов (у каждого свои соединения, общего GIL нет); доля
+--cross-shard переводов идет между шардами (двухфазный коммит), остальные - внутри шарда отправителя.
+
+Запись в один файл упирается в его блокировку на запись, поэтому выигрыш от шардов растет с числом ядер и временем
+COMMIT: с --synchronous FULL каждый COMMIT ждет fsync, и независимые файлы сбрасываются на диск параллельно.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_sharding.py --accounts 10000 --operations 20000 --shards 1 2 4 8 --processes 8
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+import sharding  # noqa: E402
+from bench_transfer import build_database  # noqa: E402
+
+
+def plan(bank, accounts, operations, cross_shard, seed):
+    """Переводы (отправитель, получатель, сумма): получатель из другого шарда с вероятностью cross_shard"""
+    rnd = random.Random(seed)
+    by_shard = {}
+    for account_id in range(4, accounts + 1, 2):
+        by_shard.setdefault(bank.shard_of(account_id), []).append(account_id)
+    shards = sorted(by_shard)
+    transfers = []
+    for _ in range(operations):
+        sender_shard = rnd.choice(shards)
+        recipient_shard = sender_shard
+        if len(shards) > 1 and rnd.random() < cross_shard:
+            recipient_shard = rnd.choice([shard for shard in shards if shard != sender_shard])
+        transfers.append((rnd.choice(by_shard[sender_shard]), rnd.choice(by_shard[recipient_shard]),
+                          rnd.randint(1, 200000)))
+    return transfers
+
+
+def worker(path, pragmas, part, barrier):
+    """Процесс нагрузки: свое соединение с каждым шардом, переводы после общего старта"""
+    bank = sharding.ShardedBank(path, pool_size=1, pragmas=pragmas)
+    barrier.wait()
+    for sender_id, recipient_id, amount in part:
+        bank.transfer(sender_id, recipient_id, amount)
+    bank.close()
+
+
+def run(path, pragmas, transfers, processes):
+    """Выполняет переводы из processes процессов (без общего GIL); возвращает время в секундах"""
+    barrier = multiprocessing.Barrier(processes + 1)
+    workers = [multiprocessing.Process(target=worker, args=(path, pragmas, transfers[index::processes], barrier))
+               for index in range(processes)]
+    for process in workers:
+        process.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for process in workers:
+        process.join()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--accounts', type=int, default=10000)
+    parser.add_argument('--operations', type=int, default=20000)
+    parser.add_argument('--shards', type=int, nargs='+', default=(1, 2, 4, 8))
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--cross-shard', type=float, default=0.1, help='Доля переводов между шардами')
+    parser.add_argument('--synchronous', default='NORMAL', help='PRAGMA synchronous шардов (NORMAL или FULL)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    pragmas = database.storage_profile(synchronous=args.synchronous)
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'bench.db')
+        build_database(source, args.accounts)
+        database.close_pool()
+
+        baseline = None
+        for shards in args.shards:
+            path = os.path.join(directory, f'shards_{shards}')
+            sharding.reshard(source, path, shards)
+            bank = sharding.ShardedBank(path)
+            transfers = plan(bank, args.accounts, args.operations, args.cross_shard, args.seed)
+            bank.close()
+            elapsed = run(path, pragmas, transfers, args.processes)
+
+            throughput = len(transfers) / elapsed
+            baseline = baseline or throughput
+            print(f'шардов {shards}: {throughput:.0f} переводов/с ({throughput / baseline:.2f}x), '
+                  f'процессов {args.processes}, между шардами {args.cross_shard:.0%}')
+
+
+if __name__ == '__main__':
+    main()
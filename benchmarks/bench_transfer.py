@@ -0,0 +1,90 @@
+"""
+Замер make_transfer и pay_salary: число SQL-запросов, открытых соединений и задержка (p50/p99) на одну операцию.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_transfer.py --accounts 10000 --operations 5000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+import main_bank_system  # noqa: E402
+import migrations  # noqa: E402
+
+
+def build_database(path, accounts):
+    """Создает БД: счет банка id 2, четные id - физические лица, нечетные - юридические"""
+    database.configure_pool(path, size=1)
+    database.create_tables()
+    migrations.migrate()
+    with database.db_connection() as (conn, cursor):
+        cursor.executemany('INSERT INTO clients (id, type, full_name) VALUES (?, ?, ?)',
+                           ((i, 'Физическое лицо' if i % 2 == 0 else 'Юридическое лицо', f'Клиент {i}')
+                            for i in range(1, accounts + 1)))
+        cursor.executemany('INSERT INTO accounts (id, client_id, account_type, balance) VALUES (?, ?, ?, ?)',
+                           ((i, i, 'Лицевой' if i % 2 == 0 else 'Расчетный', 10.0 ** 9)
+                            for i in range(1, accounts + 1)))
+
+
+def percentile(samples, fraction):
+    """Возвращает перцентиль отсортированной выборки"""
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def measure(name, operation, args_list):
+    """Выполняет операцию для каждого набора аргументов и печатает статистику"""
+    pool = database.get_pool()
+    statements = []
+
+    conn = pool.acquire()
+    conn.set_trace_callback(statements.append)
+    pool.release(conn)
+    connections_before = pool._created
+
+    latencies = []
+    for args in args_list:
+        started = time.perf_counter()
+        operation(*args)
+        latencies.append(time.perf_counter() - started)
+
+    latencies.sort()
+    print(f'{name}: операций {len(args_list)}, '
+          f'запросов на операцию {len(statements) / len(args_list):.1f}, '
+          f'новых соединений {pool._created - connections_before}, '
+          f'p50 {percentile(latencies, 0.5) * 1000:.3f} мс, '
+          f'p99 {percentile(latencies, 0.99) * 1000:.3f} мс, '
+          f'среднее {statistics.mean(latencies) * 1000:.3f} мс')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--accounts', type=int, default=10000)
+    parser.add_argument('--operations', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        build_database(os.path.join(directory, 'bench.db'), args.accounts)
+
+        individuals = range(4, args.accounts + 1, 2)
+        companies = range(3, args.accounts + 1, 2)
+        transfers = [(rnd.choice(individuals), rnd.choice(individuals), rnd.randint(1, 200000))
+                     for _ in range(args.operations)]
+        salaries = [(rnd.choice(companies), rnd.choice(individuals), rnd.randint(1, 100000))
+                    for _ in range(args.operations)]
+
+        measure('make_transfer', main_bank_system.make_transfer, transfers)
+        measure('pay_salary', main_bank_system.pay_salary, salaries)
+        database.close_pool()
+
+
+if __name__ == '__main__':
+    main()
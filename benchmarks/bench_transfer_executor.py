@@ -0,0 +1,89 @@
+"""
+Пропускная способность многопроцессного исполнителя переводов (transfer_executor) в зависимости от числа разделов.
+
+БД строится как в bench_transfer. Переводы между физическими лицами; доля --cross-partition переводов идет
+между разделами (через координатор), остальные - внутри раздела отправителя. Для сравнения те же переводы
+проводятся по одному через main_bank_system.make_transfer. С --shards исполнитель работает с шардированным
+хранилищем (sharding) из стольких шардов.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_transfer_executor.py --accounts 10000 --operations 20000 --partitions 1 2 4 8
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+import main_bank_system  # noqa: E402
+import sharding  # noqa: E402
+from bench_transfer import build_database  # noqa: E402
+from transfer_executor import TransferExecutor  # noqa: E402
+
+
+def plan(accounts, operations, partitions, cross_partition, seed):
+    """Переводы (отправитель, получатель, сумма): получатель из другого раздела с вероятностью cross_partition"""
+    rnd = random.Random(seed)
+    individuals = range(4, accounts + 1, 2)
+    by_partition = {}
+    for account_id in individuals:
+        by_partition.setdefault(account_id % partitions, []).append(account_id)
+    transfers = []
+    for _ in range(operations):
+        sender_id = rnd.choice(individuals)
+        recipients = individuals if rnd.random() < cross_partition else by_partition[sender_id % partitions]
+        transfers.append((sender_id, rnd.choice(recipients), rnd.randint(1, 20000)))
+    return transfers
+
+
+def measure(name, transfers, submit):
+    """Ставит все переводы и ждет результаты; печатает скорость"""
+    started = time.perf_counter()
+    futures = [submit(*args) for args in transfers]
+    for future in futures:
+        future.result()
+    elapsed = time.perf_counter() - started
+    print(f'{name}: {len(transfers) / elapsed:.0f} переводов/с', flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--accounts', type=int, default=10000)
+    parser.add_argument('--operations', type=int, default=20000)
+    parser.add_argument('--partitions', type=int, nargs='+', default=(1, 2, 4, 8))
+    parser.add_argument('--cross-partition', type=float, default=0.1, help='Доля переводов между разделами')
+    parser.add_argument('--shards', type=int, default=0, help='Число шардов (0 - одна БД в режиме WAL)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'bench.db')
+        build_database(source, args.accounts)
+        started = time.perf_counter()
+        for sender_id, recipient_id, amount in plan(args.accounts, args.operations, 1, 1.0, args.seed):
+            main_bank_system.make_transfer(sender_id, recipient_id, amount)
+        print(f'main_bank_system.make_transfer по одному: {args.operations / (time.perf_counter() - started):.0f} '
+              f'переводов/с')
+        database.close_pool()
+
+        for partitions in args.partitions:
+            path = os.path.join(directory, f'run_{partitions}.db')
+            shutil.copy(source, path)
+            shards_path = None
+            if args.shards:
+                shards_path = os.path.join(directory, f'shards_{partitions}')
+                sharding.reshard(path, shards_path, args.shards)
+            transfers = plan(args.accounts, args.operations, partitions, args.cross_partition, args.seed)
+            executor = TransferExecutor(partitions, path, shards_path).start()
+            measure(f'разделов {partitions} (между разделами {args.cross_partition:.0%})', transfers,
+                    executor.make_transfer)
+            executor.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""
+Набор замеров всех операций банка на синтетической БД: задержка (p50/p90/p99/max) и пропускная способность при
+1, 4 и 16 параллельных потоках.
+
+Результаты записываются в JSON. С --baseline результаты сравниваются с предыдущим прогоном: если пропускная
+способность упала или p99 вырос больше чем на --threshold, скрипт завершается с кодом 1.
+
+Запуск из корня репозитория:
+    python benchmarks/suite.py --accounts 10k --output results.json
+    python benchmarks/suite.py --accounts 1M --baseline results.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Client  # noqa: E402
+import data_generator  # noqa: E402
+import database  # noqa: E402
+import main_bank_system  # noqa: E402
+import migrations  # noqa: E402
+import sessions  # noqa: E402
+from bench_transfer import percentile  # noqa: E402
+from data_generator import PASSWORD  # noqa: E402
+from transfer_engine import BANK_ACCOUNT_ID, INDIVIDUAL, SQLITE_MAX_PARAMS  # noqa: E402
+
+SIZES = {'10k': 10 ** 4, '1M': 10 ** 6, '10M': 10 ** 7}
+WORKERS = (1, 4, 16)
+SAMPLE_SIZE = 100000  # Клиентов, из которых выбираются аргументы операций
+THRESHOLD = 0.2
+
+
+def build_database(path, accounts, seed):
+    """Создает БД с accounts клиентами и счетами через data_generator (пароль всех клиентов - PASSWORD)"""
+    database.configure_pool(path, size=1)
+    database.create_tables()
+    migrations.migrate()
+    data_generator.load(accounts, seed=seed)
+    database.close_pool()
+
+
+def sample_clients(accounts, seed):
+    """
+    Случайная выборка клиентов для аргументов операций.
+
+    Returns:
+        dict: email - почты, individuals - счета физических лиц, companies - счета юридических лиц.
+    """
+    ids = random.Random(seed).sample(range(1, accounts + 1), min(accounts, SAMPLE_SIZE))
+    sample = {'email': [], 'individuals': [], 'companies': []}
+    with database.db_read_connection() as (conn, cursor):
+        for start in range(0, len(ids), SQLITE_MAX_PARAMS):
+            chunk = ids[start:start + SQLITE_MAX_PARAMS]
+            cursor.execute(f"SELECT id, type, email FROM clients WHERE id IN ({', '.join('?' * len(chunk))})", chunk)
+            for client_id, client_type, email in cursor.fetchall():
+                sample['email'].append(email)
+                if client_id != BANK_ACCOUNT_ID:
+                    sample['individuals' if client_type == INDIVIDUAL else 'companies'].append(client_id)
+    return sample
+
+
+def login(email, password):
+    """Вход без интерактивного ввода: проверка пароля и открытие сессии"""
+    sessions.store.revoke(sessions.authenticate(email, password))
+
+
+def operations(accounts, sample):
+    """Операции набора: имя -> (функция, генератор аргументов от random.Random)"""
+    emails, individuals, companies = sample['email'], sample['individuals'], sample['companies']
+
+    def individual(rnd):
+        return rnd.choice(individuals)
+
+    return {
+        'login': (login, lambda rnd: (rnd.choice(emails), PASSWORD)),
+        'view_balance': (main_bank_system.view_balance, lambda rnd: (rnd.randint(1, accounts),)),
+        'deposit_money': (main_bank_system.deposit_money, lambda rnd: (rnd.randint(1, accounts), rnd.randint(1, 1000))),
+        'make_transfer': (main_bank_system.make_transfer,
+                          lambda rnd: (individual(rnd), individual(rnd), rnd.randint(1, 20000))),
+        'pay_salary': (main_bank_system.pay_salary,
+                       lambda rnd: (rnd.choice(companies), individual(rnd), rnd.randint(1, 10000))),
+        # money_cash без интерактивного ввода суммы
+        'money_cash': (main_bank_system.withdraw_money, lambda rnd: (individual(rnd), rnd.randint(1, 1000))),
+        'create_account_for_client': (Client.Client.create_account_for_client,
+                                      lambda rnd: (individual(rnd), INDIVIDUAL)),
+    }
+
+
+def run(operation, make_args, workers, count, seed):
+    """
+    Выполняет count операций в workers потоках.
+
+    Returns:
+        dict: Задержки в миллисекундах и пропускная способность в операциях в секунду.
+    """
+    per_worker = max(1, count // workers)
+    latencies = [[] for _ in range(workers)]
+
+    def worker(index):
+        rnd = random.Random(seed * 1000 + index)
+        args_list = [make_args(rnd) for _ in range(per_worker)]
+        samples = latencies[index]
+        for args in args_list:
+            started = time.perf_counter()
+            operation(*args)
+            samples.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(workers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    samples = sorted(sample for worker_samples in latencies for sample in worker_samples)
+    return {
+        'operations': len(samples),
+        'throughput': len(samples) / elapsed,
+        'p50_ms': percentile(samples, 0.5) * 1000,
+        'p90_ms': percentile(samples, 0.9) * 1000,
+        'p99_ms': percentile(samples, 0.99) * 1000,
+        'max_ms': samples[-1] * 1000,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Возвращает список регрессий относительно baseline: падение пропускной способности или рост p99"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current['throughput'] < previous['throughput'] * (1 - threshold):
+            regressions.append(f"{name}: пропускная способность {previous['throughput']:.0f} -> "
+                               f"{current['throughput']:.0f} оп/с")
+        if current['p99_ms'] > previous['p99_ms'] * (1 + threshold):
+            regressions.append(f"{name}: p99 {previous['p99_ms']:.3f} -> {current['p99_ms']:.3f} мс")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--accounts', choices=SIZES, default='10k', help='Размер синтетической БД')
+    parser.add_argument('--workers', type=int, nargs='+', default=WORKERS, help='Числа параллельных потоков')
+    parser.add_argument('--operations', type=int, default=2000, help='Операций на один замер')
+    parser.add_argument('--only', nargs='+', help='Замерять только эти операции')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='JSON-файл для результатов')
+    parser.add_argument('--baseline', help='JSON-файл предыдущего прогона для сравнения')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help='Допустимое ухудшение (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    accounts = SIZES[args.accounts]
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.db')
+        started = time.perf_counter()
+        build_database(path, accounts, args.seed)
+        print(f'БД на {args.accounts} счетов построена за {time.perf_counter() - started:.1f} с')
+
+        database.configure_pool(path, size=max(args.workers))
+        for name, (operation, make_args) in operations(accounts, sample_clients(accounts, args.seed)).items():
+            if args.only and name not in args.only:
+                continue
+            for workers in args.workers:
+                key = f'{name}/{workers}'
+                results[key] = result = run(operation, make_args, workers, args.operations, args.seed)
+                print(f"{key}: {result['throughput']:.0f} оп/с, p50 {result['p50_ms']:.3f} мс, "
+                      f"p90 {result['p90_ms']:.3f} мс, p99 {result['p99_ms']:.3f} мс, max {result['max_ms']:.3f} мс")
+        database.close_pool()
+
+    report = {
+        'meta': {
+            'accounts': accounts,
+            'operations': args.operations,
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            regressions = compare(results, json.load(file)['results'], args.threshold)
+        for regression in regressions:
+            print(f'Регрессия: {regression}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Пакетная загрузка переводов из файла без интерактивного ввода.
+
+Файл читается потоково цепочкой генераторов: чтение строк -> разбор и проверка -> разбиение на пачки ->
+проведение пачки в одной транзакции. В памяти одновременно находится не больше одной пачки, поэтому размер файла
+не ограничен. Результат каждой строки записывается в CSV-файл результатов.
+
+Поддерживаются CSV с заголовком sender_id,recipient_id,amount и JSONL с теми же ключами.
+
+Запуск:
+    python bulk_transfers.py transfers.csv results.csv --chunk-size 1000
+"""
+import argparse
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+import database
+import migrations
+import money
+import transfer_engine
+from database import db_connection
+
+CHUNK_SIZE = 1000
+RESULT_FIELDS = ('line', 'sender_id', 'recipient_id', 'amount', 'result')
+INVALID_LINE = 'Некорректная строка'
+
+
+def read_instructions(path, file_format=None):
+    """Построчно читает CSV или JSONL файл и возвращает пары (номер строки, словарь полей)"""
+    file_format = file_format or os.path.splitext(path)[1].lstrip('.').lower()
+    with open(path, newline='', encoding='utf-8') as file:
+        if file_format == 'csv':
+            for line, row in enumerate(csv.DictReader(file), start=2):
+                yield line, row
+        elif file_format in ('jsonl', 'json'):
+            for line, text in enumerate(file, start=1):
+                if not text.strip():
+                    continue
+                try:
+                    yield line, json.loads(text)
+                except json.JSONDecodeError:
+                    yield line, None
+        else:
+            raise ValueError(f'Неизвестный формат файла: {file_format}')
+
+
+def parse_instructions(rows):
+    """Проверяет строки и возвращает кортежи (номер строки, отправитель, получатель, сумма в копейках, ошибка)"""
+    for line, row in rows:
+        try:
+            sender_id = int(row['sender_id'])
+            recipient_id = int(row['recipient_id'])
+            amount = money.to_minor(row['amount'])
+        except (TypeError, KeyError, ValueError):
+            yield line, None, None, None, INVALID_LINE
+            continue
+
+        if amount <= 0:
+            yield line, sender_id, recipient_id, amount, transfer_engine.INVALID_AMOUNT
+        else:
+            yield line, sender_id, recipient_id, amount, None
+
+
+def chunked(iterable, size):
+    """Разбивает поток на списки длиной не больше size"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def apply_chunks(chunks):
+    """Проводит каждую пачку в одной транзакции по правилам make_transfer и возвращает результаты по строкам"""
+    for chunk in chunks:
+        results = []
+        with db_connection(immediate=True) as (conn, cursor):
+            for line, sender_id, recipient_id, amount, error in chunk:
+                if error is None:
+                    error = transfer_engine.apply_transfer(cursor, sender_id, recipient_id, amount)
+                results.append((line, sender_id, recipient_id, amount, error))
+        yield from results
+
+
+def run_bulk_transfers(input_path, results_path, chunk_size=CHUNK_SIZE, file_format=None):
+    """
+    Проводит все переводы из файла и записывает результаты.
+
+    Returns:
+        dict: Количество строк, успешных переводов, время работы и скорость в переводах в секунду.
+    """
+    started = time.perf_counter()
+    total = succeeded = 0
+
+    instructions = parse_instructions(read_instructions(input_path, file_format))
+    with open(results_path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(RESULT_FIELDS)
+        for line, sender_id, recipient_id, amount, message in apply_chunks(chunked(instructions, chunk_size)):
+            writer.writerow((line, sender_id, recipient_id, None if amount is None else money.from_minor(amount),
+                             message))
+            total += 1
+            succeeded += message == transfer_engine.SUCCESS
+
+    elapsed = time.perf_counter() - started
+    return {
+        'total': total,
+        'succeeded': succeeded,
+        'failed': total - succeeded,
+        'seconds': elapsed,
+        'transfers_per_second': total / elapsed if elapsed else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Пакетная загрузка переводов из CSV/JSONL файла')
+    parser.add_argument('input', help='Файл с переводами (CSV или JSONL)')
+    parser.add_argument('results', help='CSV-файл для результатов')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Переводов в одной транзакции')
+    parser.add_argument('--format', choices=('csv', 'jsonl'), help='Формат входного файла')
+    args = parser.parse_args()
+
+    database.create_tables()
+    migrations.migrate()
+    stats = run_bulk_transfers(args.input, args.results, args.chunk_size, args.format)
+    print(f"Обработано строк: {stats['total']}, успешно: {stats['succeeded']}, с ошибкой: {stats['failed']}")
+    print(f"Время: {stats['seconds']:.2f} с, скорость: {stats['transfers_per_second']:.0f} переводов/с")
+
+
+if __name__ == '__main__':
+    main()
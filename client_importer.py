@@ -0,0 +1,189 @@
+"""
+Импорт клиентов из CSV-файла без интерактивного ввода (например, клиентской базы банка-партнера).
+
+Столбцы файла: type (individual/company или 'Физическое лицо'/'Юридическое лицо'), full_name, company_name,
+director_name, email, phone, password. Каждая строка проверяется теми же правилами, что и регистрация
+(Client.registration_error); кроме того, отклоняются почты и телефоны, которые уже есть в БД или встретились в файле
+раньше. Клиенты и их счета вставляются executemany пачками по chunk_size строк, каждая пачка - одна транзакция.
+Отклоненные строки записываются в файл rejects (номер строки, почта, телефон, причина).
+
+Пароли хешируются SHA-256 (Client.hash_password). Один хеш короче микросекунды, поэтому по умолчанию хеширование
+идет в текущем процессе: передача строк в пул процессов стоит дороже самого хеша. hash_workers > 0 включает пул
+процессов - он окупается, только если хеш станет дорогим (например, PBKDF2).
+
+Запуск:
+    python client_importer.py partner_clients.csv --rejects rejects.csv --db bank.db
+"""
+import argparse
+import csv
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import Client
+import database
+import migrations
+from data_generator import chunked
+from database import db_connection
+from transfer_engine import INDIVIDUAL, LEGAL_ENTITY, SQLITE_MAX_PARAMS
+
+CHUNK_SIZE = 10000
+HASH_CHUNK_SIZE = 1000  # Паролей в одной задаче пула процессов
+FIELDS = ('type', 'full_name', 'company_name', 'director_name', 'email', 'phone', 'password')
+REJECT_FIELDS = ('line', 'email', 'phone', 'reason')
+# Тип клиента в файле -> тип клиента для регистрации
+TYPE_ALIASES = {'individual': 'individual', 'company': 'company', INDIVIDUAL: 'individual', LEGAL_ENTITY: 'company'}
+
+DUPLICATE_EMAIL = 'Почта уже зарегистрирована'
+DUPLICATE_PHONE = 'Телефон уже зарегистрирован'
+
+CLIENT_INSERT = ('INSERT INTO clients (id, type, full_name, director_name, email, phone, password, is_legal_entity, '
+                 'withdrawal_limit, transfer_fee_rate, transfer_limit) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)')
+ACCOUNT_INSERT = ('INSERT INTO accounts (client_id, owner_name, account_type, is_legal_entity, balance) '
+                  'VALUES (?, ?, ?, ?, 0)')
+
+
+def read_rows(path):
+    """Строки CSV-файла: (номер строки, словарь полей)"""
+    with open(path, encoding='utf-8-sig', newline='') as file:
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, {name: (row.get(name) or '').strip() for name in FIELDS}
+
+
+def validate(rows):
+    """Делит строки на годные [(номер, тип, поля)] и отклоненные [(номер, поля, причина)]"""
+    valid, rejected = [], []
+    for line, row in rows:
+        client_type = TYPE_ALIASES.get(row['type'], row['type'])
+        error = Client.registration_error(client_type, row['full_name'], row['company_name'], row['director_name'],
+                                          row['email'], row['phone'], row['password'])
+        if error is None:
+            valid.append((line, client_type, row))
+        else:
+            rejected.append((line, row, error))
+    return valid, rejected
+
+
+def existing_values(cursor, column, values):
+    """Какие из values уже есть в столбце clients.column"""
+    found = set()
+    values = list(values)
+    for start in range(0, len(values), SQLITE_MAX_PARAMS):
+        chunk = values[start:start + SQLITE_MAX_PARAMS]
+        cursor.execute(f"SELECT {column} FROM clients WHERE {column} IN ({', '.join('?' * len(chunk))})", chunk)
+        found.update(value for value, in cursor.fetchall())
+    return found
+
+
+def deduplicate(cursor, valid, seen_emails, seen_phones):
+    """Отклоняет строки с почтой или телефоном из БД или из предыдущих строк файла"""
+    emails = existing_values(cursor, 'email', {row['email'] for _, _, row in valid})
+    phones = existing_values(cursor, 'phone', {row['phone'] for _, _, row in valid})
+    unique, rejected = [], []
+    for line, client_type, row in valid:
+        if row['email'] in emails or row['email'] in seen_emails:
+            rejected.append((line, row, DUPLICATE_EMAIL))
+        elif row['phone'] in phones or row['phone'] in seen_phones:
+            rejected.append((line, row, DUPLICATE_PHONE))
+        else:
+            seen_emails.add(row['email'])
+            seen_phones.add(row['phone'])
+            unique.append((line, client_type, row))
+    return unique, rejected
+
+
+def client_rows(start_id, unique, hashes):
+    """Строки clients и accounts для вставки; владелец счета компании - директор, как в Client._create_account"""
+    clients, accounts = [], []
+    for client_id, (_, client_type, row), hashed_password in zip(range(start_id, start_id + len(unique)), unique,
+                                                                  hashes):
+        if client_type == 'individual':
+            clients.append((client_id, INDIVIDUAL, row['full_name'], None, row['email'], row['phone'], hashed_password,
+                            False, None, None, None))
+            accounts.append((client_id, row['full_name'], 'Лицевой', False))
+        else:
+            clients.append((client_id, LEGAL_ENTITY, row['company_name'], row['director_name'], row['email'],
+                            row['phone'], hashed_password, True, 0.0, 0.0, 0.0))
+            accounts.append((client_id, row['director_name'], 'Расчетный', True))
+    return clients, accounts
+
+
+def write_rejects(writer, rejected):
+    for line, row, reason in rejected:
+        writer.writerow((line, row['email'], row['phone'], reason))
+
+
+def import_clients(path, rejects_path, chunk_size=CHUNK_SIZE, hash_workers=0):
+    """
+    Импортирует клиентов из CSV-файла в БД текущего пула.
+
+    Args:
+        path (str): CSV-файл клиентов.
+        rejects_path (str): Куда записать отклоненные строки с причинами.
+        chunk_size (int): Строк в одной транзакции.
+        hash_workers (int): Процессов для хеширования паролей (0 - хешировать в текущем процессе).
+
+    Returns:
+        dict: imported, rejected, seconds и rows_per_second.
+    """
+    started = time.perf_counter()
+    imported = rejected_count = 0
+    seen_emails, seen_phones = set(), set()
+    pool = ProcessPoolExecutor(hash_workers) if hash_workers > 0 else None
+    try:
+        with open(rejects_path, 'w', encoding='utf-8', newline='') as rejects_file:
+            rejects = csv.writer(rejects_file)
+            rejects.writerow(REJECT_FIELDS)
+            for chunk in chunked(read_rows(path), chunk_size):
+                valid, rejected = validate(chunk)
+                passwords = [row['password'] for _, _, row in valid]
+                if pool is None:
+                    hashes = list(map(Client.hash_password, passwords))
+                else:
+                    hashes = list(pool.map(Client.hash_password, passwords, chunksize=HASH_CHUNK_SIZE))
+                hashes = dict(zip((line for line, _, _ in valid), hashes))
+
+                with db_connection(immediate=True) as (conn, cursor):
+                    unique, duplicates = deduplicate(cursor, valid, seen_emails, seen_phones)
+                    cursor.execute('SELECT COALESCE(MAX(id), 0) FROM clients')
+                    clients, accounts = client_rows(cursor.fetchone()[0] + 1, unique,
+                                                    [hashes[line] for line, _, _ in unique])
+                    cursor.executemany(CLIENT_INSERT, clients)
+                    cursor.executemany(ACCOUNT_INSERT, accounts)
+
+                write_rejects(rejects, rejected + duplicates)
+                imported += len(clients)
+                rejected_count += len(rejected) + len(duplicates)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    elapsed = time.perf_counter() - started
+    return {
+        'imported': imported,
+        'rejected': rejected_count,
+        'seconds': elapsed,
+        'rows_per_second': (imported + rejected_count) / elapsed if elapsed else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('path', help='CSV-файл клиентов')
+    parser.add_argument('--rejects', default='rejects.csv', help='Файл для отклоненных строк')
+    parser.add_argument('--db', default=database.DATABASE_PATH)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--hash-workers', type=int, default=0, help='Процессов для хеширования паролей')
+    args = parser.parse_args()
+
+    database.configure_pool(args.db, size=1)
+    database.create_tables()
+    migrations.migrate()
+    result = import_clients(args.path, args.rejects, args.chunk_size, args.hash_workers)
+    database.close_pool()
+    print(f"Импортировано {result['imported']}, отклонено {result['rejected']} за {result['seconds']:.1f} с "
+          f"({result['rows_per_second']:.0f} строк/с)")
+
+
+if __name__ == '__main__':
+    main()
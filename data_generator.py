@@ -0,0 +1,382 @@
+"""
+Генератор синтетических данных и быстрая загрузка в bank.db.
+
+Генерирует физических и юридических лиц так же, как их создает Client.register_client (ФИО и названия проходят
+is_valid_name, почта и телефон уникальны и в формате is_valid_email/is_valid_phone, пароль хэширован), их Лицевые
+и Расчетные счета и историю переводов. Получатели и отправители переводов выбираются равномерно или по закону Ципфа
+(немного "горячих" счетов получают большую часть переводов), комиссии считаются по правилам transfer_engine.
+
+Переводы согласованы с балансами: случайный баланс счета - исходный, он же записывается в контрольную точку журнала
+(balance_checkpoint), отправитель никогда не уходит в минус, а после загрузки балансы счетов равны исходным плюс
+переводы (комиссии и налоги получает счет банка). Поэтому выписки не показывают отрицательных балансов в прошлом,
+а сверка с журналом (reconciliation) проверяет все сгенерированные переводы и не находит расхождений.
+
+Загрузка идет через executemany крупными транзакциями; вторичные индексы удаляются перед загрузкой и создаются
+заново после нее. Результат полностью определяется seed (и end для меток времени).
+
+Запуск:
+    python data_generator.py --clients 1000000 --transactions 5000000 --distribution zipf --seed 1
+"""
+import argparse
+import hashlib
+import itertools
+import math
+import queue
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+import database
+import migrations
+import transfer_engine
+from database import db_connection
+
+SEED = 1
+PASSWORD = 'Password1'  # Пароль всех сгенерированных клиентов (для входа в нагрузочных тестах)
+COMPANY_SHARE = 0.1
+CHUNK_SIZE = 100000  # Строк в одной транзакции загрузки
+DAYS = 365
+DISTRIBUTIONS = ('uniform', 'zipf')
+SKEW = 1.1
+SAMPLE_BLOCK = 4096  # Счетов, выбираемых за один вызов random.choices
+PREFETCH_DEPTH = 2  # Пачек, которые генерируются заранее, пока загружается текущая
+SORT_THREADS = 4  # Потоков SQLite для сортировки при построении индексов
+
+MALE_FIRST_NAMES = ('Александр', 'Алексей', 'Андрей', 'Борис', 'Виктор', 'Дмитрий', 'Евгений', 'Иван', 'Игорь',
+                    'Максим', 'Михаил', 'Николай', 'Олег', 'Павел', 'Роман', 'Сергей')
+FEMALE_FIRST_NAMES = ('Александра', 'Анна', 'Валентина', 'Дарья', 'Екатерина', 'Елена', 'Ирина', 'Мария',
+                      'Наталья', 'Ольга', 'Светлана', 'Татьяна', 'Юлия')
+SURNAMES = ('Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Петров', 'Соколов', 'Михайлов', 'Новиков',
+            'Федоров', 'Морозов', 'Волков', 'Алексеев', 'Лебедев', 'Семенов', 'Егоров', 'Павлов', 'Козлов')
+PATRONYMICS = ('Александров', 'Алексеев', 'Андреев', 'Викторов', 'Дмитриев', 'Иванов', 'Михайлов', 'Николаев',
+               'Сергеев', 'Павлов')
+COMPANY_FORMS = ('ООО', 'АО', 'ПАО')
+COMPANY_WORDS = ('Ромашка', 'Вектор', 'Гранит', 'Альфа', 'Север', 'Восход', 'Звезда', 'Меридиан', 'Техно',
+                 'Строй', 'Спектр', 'Импульс', 'Орбита', 'Прогресс')
+EMAIL_DOMAINS = ('mail.ru', 'yandex.ru', 'rambler.ru', 'gmail.com')
+
+TRANSLIT = dict(zip('абвгдежзийклмнопрстуфхцчшщъыьэюя',
+                    ['a', 'b', 'v', 'g', 'd', 'e', 'zh', 'z', 'i', 'y', 'k', 'l', 'm', 'n', 'o', 'p', 'r', 's', 't',
+                     'u', 'f', 'kh', 'ts', 'ch', 'sh', 'shch', '', 'y', '', 'e', 'yu', 'ya']))
+
+CLIENT_COLUMNS = ('id', 'type', 'full_name', 'director_name', 'email', 'phone', 'password', 'is_legal_entity',
+                  'withdrawal_limit', 'transfer_fee_rate', 'transfer_limit')
+ACCOUNT_COLUMNS = ('id', 'client_id', 'account_type', 'owner_name', 'is_legal_entity', 'balance')
+TRANSACTION_COLUMNS = ('sender_id', 'recipient_id', 'amount', 'transfer_fee', 'timestamp')
+TABLES = ('clients', 'accounts', 'transactions')
+
+
+def translit(word):
+    """Латинская запись русского слова для адреса почты"""
+    return ''.join(TRANSLIT.get(letter, letter) for letter in word.lower())
+
+
+def phone_number(number):
+    """Уникальный телефон в формате '999 999 99 99' для номера клиента"""
+    number = 9000000000 + number
+    return f'{number // 10 ** 7:03d} {number // 10 ** 4 % 1000:03d} {number // 100 % 100:02d} {number % 100:02d}'
+
+
+def person_names():
+    """Все сочетания ФИО вместе с латинской основой для почты"""
+    names = []
+    for surname in SURNAMES:
+        for patronymic in PATRONYMICS:
+            for first_name in MALE_FIRST_NAMES:
+                names.append((f'{surname} {first_name} {patronymic}ич', f'{translit(surname)}.{translit(first_name)}'))
+            for first_name in FEMALE_FIRST_NAMES:
+                names.append((f'{surname}а {first_name} {patronymic}на', f'{translit(surname)}.{translit(first_name)}'))
+    return names
+
+
+def company_names():
+    """Все сочетания названий компаний вместе с латинской основой для почты"""
+    return [(f'{form} {word}', translit(word)) for form in COMPANY_FORMS for word in COMPANY_WORDS]
+
+
+def generate_clients(count, seed=SEED, company_share=COMPANY_SHARE, start_id=1):
+    """
+    Генерирует клиентов вместе с их счетами.
+
+    Клиент и его счет получают одинаковый id. Клиент с id BANK_ACCOUNT_ID - банк (юридическое лицо).
+
+    Yields:
+        tuple: (строка clients в порядке CLIENT_COLUMNS, строка accounts в порядке ACCOUNT_COLUMNS).
+    """
+    rnd = random.Random(seed)
+    random_value = rnd.random
+    password = hashlib.sha256(PASSWORD.encode()).hexdigest()
+    people, companies = person_names(), company_names()
+    min_balance = math.log(100 * 100)  # от 100 рублей
+    balance_range = math.log(10 ** 7 * 100) - min_balance  # до 10 млн рублей
+    for client_id in range(start_id, start_id + count):
+        balance = int(math.exp(min_balance + balance_range * random_value()))
+        domain = EMAIL_DOMAINS[int(random_value() * len(EMAIL_DOMAINS))]
+        if client_id == transfer_engine.BANK_ACCOUNT_ID or random_value() < company_share:
+            director_name = people[int(random_value() * len(people))][0]
+            if client_id == transfer_engine.BANK_ACCOUNT_ID:
+                company_name, login = 'АО Банк', 'bank'
+            else:
+                company_name, login = companies[int(random_value() * len(companies))]
+            yield ((client_id, transfer_engine.LEGAL_ENTITY, company_name, director_name, f'{login}{client_id}@{domain}',
+                    phone_number(client_id), password, True, 0.0, 0.0, 0.0),
+                   (client_id, client_id, 'Расчетный', director_name, True, balance))
+        else:
+            full_name, login = people[int(random_value() * len(people))]
+            email = f'{login}{client_id}@{domain}'
+            yield ((client_id, transfer_engine.INDIVIDUAL, full_name, None, email, phone_number(client_id), password,
+                    False, None, None, None),
+                   (client_id, client_id, 'Лицевой', full_name, False, balance))
+
+
+def account_sampler(rnd, count, distribution=DISTRIBUTIONS[0], skew=SKEW):
+    """Возвращает функцию sample(k), которая выбирает k индексов счетов 0..count-1 по распределению"""
+    indexes = range(count)
+    if distribution == 'uniform':
+        return lambda k: rnd.choices(indexes, k=k)
+
+    # Закон Ципфа: вес счета ранга r равен 1 / r^skew; ранги случайно перемешаны между счетами
+    cumulative = list(itertools.accumulate(1 / rank ** skew for rank in range(1, count + 1)))
+    ranks = list(indexes)
+    rnd.shuffle(ranks)
+    return lambda k: rnd.choices(ranks, cum_weights=cumulative, k=k)
+
+
+def transfer_fee(sender_type, recipient_type, amount):
+    """Комиссия или налог перевода по правилам transfer_engine (юридическое лицо платит физическому только зарплату)"""
+    fee, _ = transfer_engine.transfer_fee(sender_type, recipient_type, amount)
+    if fee is None:
+        fee, _ = transfer_engine.salary_tax(sender_type, recipient_type, amount)
+    return fee
+
+
+def generate_transactions(accounts, count, seed=SEED, distribution=DISTRIBUTIONS[0], skew=SKEW, days=DAYS,
+                          end=None, balances=None):
+    """
+    Генерирует историю переводов между счетами в порядке времени.
+
+    Args:
+        accounts (list): Пары (id счета, тип клиента).
+        count (int): Количество переводов.
+        distribution (str): 'uniform' или 'zipf' - как выбираются отправитель и получатель.
+        skew (float): Показатель закона Ципфа.
+        days (int): Длина истории в днях до end.
+        end (datetime): Конец истории в UTC (по умолчанию - начало текущего дня).
+        balances (dict): Балансы счетов в копейках (id счета -> баланс). Если заданы, перевод не больше того, что
+            есть у отправителя (сумма уменьшается вдвое, пока не хватит, а без денег переводит следующий счет), а
+            словарь обновляется по каждому переводу; комиссии зачисляются BANK_ACCOUNT_ID.
+
+    Yields:
+        tuple: Строка transactions в порядке TRANSACTION_COLUMNS (суммы в копейках).
+    """
+    if len(accounts) < 2 or count <= 0:
+        return
+    rnd = random.Random(seed + 1)
+    sample = account_sampler(rnd, len(accounts), distribution, skew)
+    end = end or datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    start = end.timestamp() - days * 86400
+    step = days * 86400 / count
+    median = math.log(1000 * 100)  # медиана суммы 1000 рублей
+    minute, prefix = None, None
+    for block in range(0, count, SAMPLE_BLOCK):
+        size = min(SAMPLE_BLOCK, count - block)
+        for number, sender, recipient in zip(range(block, block + size), sample(size), sample(size)):
+            if sender == recipient:
+                recipient = (recipient + 1) % len(accounts)
+            amount = max(100, int(math.exp(median + 1.5 * rnd.gauss())))
+            if balances is not None:
+                sender, recipient, amount = affordable(accounts, balances, sender, recipient, amount)
+            sender_id, sender_type = accounts[sender]
+            recipient_id, recipient_type = accounts[recipient]
+            fee = transfer_fee(sender_type, recipient_type, amount)
+            if balances is not None:
+                balances[sender_id] -= amount + fee
+                balances[recipient_id] += amount
+                if fee:
+                    balances[transfer_engine.BANK_ACCOUNT_ID] = balances.get(transfer_engine.BANK_ACCOUNT_ID, 0) + fee
+
+            # Переводы идут по времени, поэтому начало метки 'ГГГГ-ММ-ДД ЧЧ:ММ:' меняется редко
+            second = int(start + (number + rnd.random()) * step)
+            if second // 60 != minute:
+                minute = second // 60
+                prefix = time.strftime('%Y-%m-%d %H:%M:', time.gmtime(minute * 60))
+            yield sender_id, recipient_id, amount, fee, f'{prefix}{second % 60:02d}'
+
+
+def affordable(accounts, balances, sender, recipient, amount):
+    """
+    Подбирает перевод, на который у отправителя хватает денег вместе с комиссией.
+
+    Returns:
+        tuple: (индекс отправителя, индекс получателя, сумма в копейках).
+    """
+    for _ in range(len(accounts)):
+        sender_id, sender_type = accounts[sender]
+        recipient_type = accounts[recipient][1]
+        available = balances[sender_id]
+        while amount > 1 and amount + transfer_fee(sender_type, recipient_type, amount) > available:
+            amount //= 2
+        if amount + transfer_fee(sender_type, recipient_type, amount) <= available:
+            return sender, recipient, amount
+        # У отправителя нет денег: переводит следующий счет
+        sender = (sender + 1) % len(accounts)
+        if sender == recipient:
+            recipient = (recipient + 1) % len(accounts)
+    raise ValueError('На сгенерированных счетах не осталось денег для переводов')
+
+
+def chunked(rows, size):
+    """Разбивает поток строк на списки длиной не больше size"""
+    iterator = iter(rows)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def drop_indexes(cursor):
+    """Удаляет вторичные индексы загружаемых таблиц и возвращает их CREATE INDEX для восстановления"""
+    placeholders = ', '.join('?' * len(TABLES))
+    cursor.execute(f"SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL "
+                   f"AND tbl_name IN ({placeholders})", TABLES)
+    indexes = cursor.fetchall()
+    for name, _ in indexes:
+        cursor.execute(f'DROP INDEX {name}')
+    return [sql for _, sql in indexes]
+
+
+def insert_sql(table, columns):
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+
+CHECKPOINT_SQL = 'INSERT OR REPLACE INTO balance_checkpoint (account_id, balance) VALUES (?, ?)'
+BALANCE_SQL = 'UPDATE accounts SET balance = balance + ?, version = version + 1 WHERE id = ?'
+
+
+def generate_batches(clients, transactions, seed, company_share, distribution, skew, days, end, start_id, chunk_size):
+    """
+    Готовит пачки для загрузки: каждая пачка - список (SQL, строки), загружаемый одной транзакцией.
+
+    Исходные балансы новых счетов записываются в balance_checkpoint: все сгенерированные переводы идут в журнале
+    после нее. Последние пачки добавляют к балансам счетов результат переводов.
+    """
+    accounts, openings = [], {}
+    for chunk in chunked(generate_clients(clients, seed, company_share, start_id), chunk_size):
+        accounts_rows = [account for _, account in chunk]
+        yield [(insert_sql('clients', CLIENT_COLUMNS), [client for client, _ in chunk]),
+               (insert_sql('accounts', ACCOUNT_COLUMNS), accounts_rows),
+               (CHECKPOINT_SQL, [(account[0], account[5]) for account in accounts_rows])]
+        accounts.extend((client[0], client[1]) for client, _ in chunk)
+        openings.update((account[0], account[5]) for account in accounts_rows)
+
+    balances = dict(openings)
+    rows = generate_transactions(accounts, transactions, seed, distribution, skew, days, end, balances)
+    for chunk in chunked(rows, chunk_size):
+        yield [(insert_sql('transactions', TRANSACTION_COLUMNS), chunk)]
+
+    deltas = ((balance - openings.get(account_id, 0), account_id) for account_id, balance in balances.items())
+    for chunk in chunked((row for row in deltas if row[0]), chunk_size):
+        yield [(BALANCE_SQL, chunk)]
+
+
+def prefetch(iterable, depth=PREFETCH_DEPTH):
+    """
+    Выполняет генератор в отдельном потоке, заранее готовя до depth элементов.
+
+    sqlite3 отпускает GIL на время выполнения запроса, поэтому следующая пачка генерируется, пока загружается текущая.
+    """
+    items = queue.Queue(depth)
+
+    def produce():
+        try:
+            for item in iterable:
+                items.put((item, None))
+        except Exception as error:
+            items.put((None, error))
+        items.put((None, None))
+
+    threading.Thread(target=produce, name='data-generator', daemon=True).start()
+    while True:
+        item, error = items.get()
+        if error is not None:
+            raise error
+        if item is None:
+            return
+        yield item
+
+
+def load(clients, transactions=0, seed=SEED, company_share=COMPANY_SHARE, distribution=DISTRIBUTIONS[0], skew=SKEW,
+         days=DAYS, end=None, chunk_size=CHUNK_SIZE):
+    """
+    Генерирует и загружает клиентов, счета и переводы в БД текущего пула.
+
+    Новые id продолжают уже существующие. Вторичные индексы на время загрузки удаляются и затем строятся заново
+    в SORT_THREADS потоков. Балансы после загрузки согласованы с журналом и контрольной точкой.
+
+    Returns:
+        dict: Количество строк по таблицам, время работы и скорость в строках в секунду.
+    """
+    started = time.perf_counter()
+    with db_connection() as (conn, cursor):
+        cursor.execute('SELECT MAX(COALESCE((SELECT MAX(id) FROM clients), 0), '
+                       'COALESCE((SELECT MAX(id) FROM accounts), 0))')
+        start_id = cursor.fetchone()[0] + 1
+        indexes = drop_indexes(cursor)
+
+    batches = generate_batches(clients, transactions, seed, company_share, distribution, skew, days, end, start_id,
+                               chunk_size)
+    try:
+        for batch in prefetch(batches):
+            with db_connection() as (conn, cursor):
+                for sql, rows in batch:
+                    cursor.executemany(sql, rows)
+    finally:
+        with db_connection() as (conn, cursor):
+            cursor.execute(f'PRAGMA threads = {SORT_THREADS}')
+            try:
+                for sql in indexes:
+                    cursor.execute(sql)
+                cursor.execute('ANALYZE')
+            finally:
+                cursor.execute('PRAGMA threads = 0')
+
+    elapsed = time.perf_counter() - started
+    total = 2 * clients + transactions
+    return {
+        'clients': clients,
+        'accounts': clients,
+        'transactions': transactions,
+        'seconds': elapsed,
+        'rows_per_second': total / elapsed if elapsed else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Генерация и загрузка синтетических клиентов, счетов и переводов')
+    parser.add_argument('--db', default=database.DATABASE_PATH, help='Файл БД')
+    parser.add_argument('--clients', type=int, default=100000)
+    parser.add_argument('--transactions', type=int, default=0)
+    parser.add_argument('--company-share', type=float, default=COMPANY_SHARE, help='Доля юридических лиц')
+    parser.add_argument('--distribution', choices=DISTRIBUTIONS, default=DISTRIBUTIONS[0])
+    parser.add_argument('--skew', type=float, default=SKEW, help='Показатель закона Ципфа')
+    parser.add_argument('--days', type=int, default=DAYS, help='Длина истории переводов в днях')
+    parser.add_argument('--end', type=datetime.fromisoformat, help='Конец истории ГГГГ-ММ-ДД (UTC)')
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Строк в одной транзакции')
+    args = parser.parse_args()
+
+    end = args.end.replace(tzinfo=timezone.utc) if args.end else None
+    database.configure_pool(args.db)
+    database.create_tables()
+    migrations.migrate()
+    stats = load(args.clients, args.transactions, args.seed, args.company_share, args.distribution, args.skew,
+                 args.days, end, args.chunk_size)
+    database.close_pool()
+    print(f"Загружено клиентов: {stats['clients']}, счетов: {stats['accounts']}, переводов: {stats['transactions']}")
+    print(f"Время: {stats['seconds']:.2f} с, скорость: {stats['rows_per_second']:.0f} строк/с")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,265 @@
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote
 
+import instrumentation
 
-def connect_to_db():
-    """Функция открытия соединения с БД"""
-    conn = sqlite3.connect('bank.db')
-    cursor = conn.cursor()
-    return conn, cursor
+DATABASE_PATH = 'bank.db'
+POOL_SIZE = 5
+READ_POOL_SIZE = 8
 
+# PRAGMA, которые выполняются только при открытии соединения на запись (меняют файл БД)
+WRITE_ONLY_PRAGMAS = ('journal_mode',)
 
-def close_db_connection(conn):
-    """Функция закрытия соединения с БД"""
-    conn.commit()
-    conn.close()
+
+def storage_profile(journal_mode='WAL', synchronous='NORMAL', busy_timeout=5000, mmap_size=256 * 1024 * 1024,
+                    cache_size=-64 * 1024, temp_store='MEMORY'):
+    """
+    Профиль хранения - набор PRAGMA для соединений пула.
+
+    Args:
+        journal_mode (str): Режим журнала. В режиме WAL чтение не блокируется записью.
+        synchronous (str): Уровень синхронизации с диском (NORMAL в режиме WAL не теряет целостность БД).
+        busy_timeout (int): Сколько миллисекунд ждать снятия блокировки другой транзакции.
+        mmap_size (int): Размер отображаемой в память части файла БД в байтах.
+        cache_size (int): Размер кэша страниц (отрицательное значение - в килобайтах).
+        temp_store (str): Где хранить временные таблицы и индексы.
+
+    Returns:
+        dict: Словарь PRAGMA для ConnectionPool.
+    """
+    return {
+        'journal_mode': journal_mode,
+        'synchronous': synchronous,
+        'busy_timeout': busy_timeout,
+        'mmap_size': mmap_size,
+        'cache_size': cache_size,
+        'temp_store': temp_store,
+    }
+
+
+# PRAGMA, которые выполняются для каждого нового соединения пула
+DEFAULT_PRAGMAS = storage_profile()
+
+
+class ConnectionPool:
+    """
+    Потокобезопасный пул соединений с БД.
+
+    Соединения создаются лениво, но не больше size штук. Для каждого нового соединения выполняются PRAGMA
+    из словаря pragmas. Если все соединения заняты, acquire ждет освобождения не дольше timeout секунд.
+    С read_only=True соединения открываются только на чтение (URI mode=ro).
+    """
+
+    def __init__(self, database=DATABASE_PATH, size=POOL_SIZE, pragmas=None, timeout=30.0, read_only=False):
+        if size < 1:
+            raise ValueError('Размер пула должен быть не меньше 1')
+        self.database = database
+        self.size = size
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self.timeout = timeout
+        self.read_only = read_only
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._connections = []
+        self._local = threading.local()
+
+    def _connect(self):
+        """Создает новое соединение и применяет к нему PRAGMA"""
+        if self.read_only:
+            conn = sqlite3.connect(f'file:{quote(self.database)}?mode=ro', timeout=self.timeout,
+                                   check_same_thread=False, uri=True)
+        else:
+            conn = sqlite3.connect(self.database, timeout=self.timeout, check_same_thread=False)
+        for name, value in self.pragmas.items():
+            if not (self.read_only and name in WRITE_ONLY_PRAGMAS):
+                conn.execute(f'PRAGMA {name} = {value}')
+        if instrumentation.enabled:
+            instrumentation.connection_opened()
+        return conn
+
+    def acquire(self):
+        """Берет соединение из пула, при необходимости создавая новое (закрепленное за потоком - в первую очередь)"""
+        local = self._local
+        pinned = getattr(local, 'conn', None)
+        if pinned is not None and not local.busy:
+            local.busy = True
+            return pinned
+
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                conn = self._connect()
+                self._created += 1
+                self._connections.append(conn)
+                return conn
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError('Нет свободных соединений с БД') from None
+
+    def release(self, conn):
+        """Возвращает соединение в пул, откатывая незавершенную транзакцию"""
+        if conn.in_transaction:
+            conn.rollback()
+        local = self._local
+        if conn is getattr(local, 'conn', None):
+            local.busy = False
+            return
+        self._idle.put(conn)
+
+    def pin(self):
+        """
+        Закрепляет соединение за текущим потоком: acquire в этом потоке берет его без очереди пула.
+
+        Закрепленное соединение занимает место в пуле до unpin, поэтому закреплять стоит меньше size соединений.
+        Если закрепленное соединение уже выдано (вложенный acquire), выдается обычное соединение из пула.
+        """
+        local = self._local
+        if getattr(local, 'conn', None) is None:
+            conn = self.acquire()
+            local.conn, local.busy = conn, False
+
+    def unpin(self):
+        """Возвращает закрепленное за текущим потоком соединение в пул"""
+        local = self._local
+        conn = getattr(local, 'conn', None)
+        if conn is not None:
+            local.conn = None
+            self.release(conn)
+
+    @contextmanager
+    def connection(self, immediate=False):
+        """
+        Выдает соединение на время одной логической операции.
+
+        При успешном выходе из блока изменения фиксируются, при исключении - откатываются. В любом случае
+        соединение возвращается в пул. С immediate=True транзакция открывается через BEGIN IMMEDIATE, то есть
+        блокировка на запись берется сразу, до первого чтения.
+        """
+        conn = self.acquire()
+        observed = instrumentation.enabled
+        if observed:
+            total_changes = instrumentation.attach(conn)
+        try:
+            if immediate:
+                conn.execute('BEGIN IMMEDIATE')
+            yield conn
+            conn.commit()
+            # Функции забираются до release: после него соединение может взять другой поток со своими функциями
+            hooks = take_commit_hooks(conn)
+        except BaseException:
+            conn.rollback()
+            discard_commit_hooks(conn)
+            raise
+        finally:
+            if observed:
+                instrumentation.detach(conn, total_changes)
+            self.release(conn)
+        for callback in hooks:
+            callback()
+
+    def close(self):
+        """Закрывает все соединения пула"""
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+            self._created = 0
+            self._idle = queue.LifoQueue()
+            self._local = threading.local()
+
+
+_commit_hooks = {}
+
+
+def on_commit(conn, callback):
+    """Регистрирует функцию, которая будет вызвана после успешного COMMIT текущей транзакции соединения"""
+    _commit_hooks.setdefault(conn, []).append(callback)
+
+
+def take_commit_hooks(conn):
+    """Забирает функции, зарегистрированные для зафиксированной транзакции соединения, чтобы вызвать их"""
+    return _commit_hooks.pop(conn, ())
+
+
+def discard_commit_hooks(conn):
+    """Забывает функции, зарегистрированные для откатанной транзакции соединения"""
+    _commit_hooks.pop(conn, None)
+
+
+_pool = None
+_read_pool = None
+_pool_lock = threading.Lock()
+
+
+def configure_pool(database=DATABASE_PATH, size=POOL_SIZE, pragmas=None, timeout=30.0, read_size=READ_POOL_SIZE):
+    """Пересоздает общий пул соединений (и пул соединений только на чтение) с новыми настройками"""
+    global _pool, _read_pool
+    with _pool_lock:
+        for pool in (_read_pool, _pool):
+            if pool is not None:
+                pool.close()
+        _pool = ConnectionPool(database, size, pragmas, timeout)
+        _read_pool = ConnectionPool(database, read_size, pragmas, timeout, read_only=True)
+        return _pool
+
+
+def close_pool():
+    """Закрывает все соединения общих пулов"""
+    with _pool_lock:
+        # Пул на запись закрывается последним: только соединение на запись может перенести и удалить файл WAL
+        for pool in (_read_pool, _pool):
+            if pool is not None:
+                pool.close()
+
+
+def get_pool():
+    """Возвращает общий пул соединений, создавая его при первом обращении"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def get_read_pool():
+    """Возвращает общий пул соединений только на чтение к той же БД"""
+    global _read_pool
+    if _read_pool is None:
+        pool = get_pool()
+        with _pool_lock:
+            if _read_pool is None:
+                _read_pool = ConnectionPool(pool.database, READ_POOL_SIZE, pool.pragmas, pool.timeout, read_only=True)
+    return _read_pool
+
+
+@contextmanager
+def db_connection(immediate=False):
+    """Контекстный менеджер: соединение из общего пула и курсор к нему"""
+    with get_pool().connection(immediate) as conn:
+        yield conn, conn.cursor()
+
+
+@contextmanager
+def db_read_connection():
+    """
+    Контекстный менеджер: соединение только на чтение и курсор к нему.
+
+    Используется для просмотра баланса, входа и отчетов. В режиме WAL такие чтения не ждут транзакций на запись и
+    не мешают им.
+    """
+    with get_read_pool().connection() as conn:
+        yield conn, conn.cursor()
 
 
 def create_tables():
@@ -37,20 +285,22 @@ def create_tables():
             - account_type: Тип счета (Лицевой или Расчетный).
             - owner_name: Имя владельца счета (ФИО или название компании).
             - is_legal_entity: Флаг, указывающий, является ли владелец юридическим лицом.
-            - balance: Текущий баланс счета.
+            - balance: Текущий баланс счета (после миграции 5 - целое число копеек, см. money).
 
         - transactions: Таблица для хранения информации о транзакциях между счетами.
             - id: Уникальный идентификатор транзакции.
             - sender_id: Идентификатор счета отправителя.
             - recipient_id: Идентификатор счета получателя.
-            - amount: Сумма транзакции.
-            - transfer_fee: Комиссия за транзакцию.
+            - amount: Сумма транзакции (в копейках после миграции 5).
+            - transfer_fee: Комиссия за транзакцию (в копейках после миграции 5).
             - timestamp: Метка времени создания транзакции.
         """
-    # Создаем подключение к базе данных
-    conn = sqlite3.connect('bank.db')
-    cursor = conn.cursor()
+    with db_connection() as (conn, cursor):
+        _create_tables(cursor)
+
 
+def _create_tables(cursor):
+    """Выполняет CREATE TABLE для основных таблиц"""
     # Создаем таблицу клиентов
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS clients (
@@ -94,7 +344,3 @@ def create_tables():
                 FOREIGN KEY (recipient_id) REFERENCES accounts (id)
             )
         ''')
-    # Сохраняем изменения
-    conn.commit()
-    # Закрываем соединение
-    conn.close()
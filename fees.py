@@ -0,0 +1,71 @@
+"""
+Накопление комиссий банка.
+
+Переводы не обновляют баланс счета банка, а добавляют записи в fee_ledger (см. transfer_engine.record_fee).
+settle_fees переносит накопленные комиссии на счет банка одним UPDATE и удаляет перенесенные записи. Точный баланс
+счета банка - это баланс из accounts плюс еще не перенесенные комиссии (bank_balance).
+"""
+import threading
+
+from database import db_connection
+from transfer_engine import BANK_ACCOUNT_ID
+
+SETTLE_INTERVAL = 60  # Период переноса комиссий на счет банка, секунд
+
+
+def pending_fees(cursor):
+    """Сумма комиссий, еще не перенесенных на счет банка"""
+    cursor.execute('SELECT COALESCE(SUM(amount), 0) FROM fee_ledger')
+    return cursor.fetchone()[0]
+
+
+def bank_balance(cursor):
+    """Точный баланс счета банка: перенесенные и еще не перенесенные комиссии"""
+    cursor.execute('SELECT balance FROM accounts WHERE id = ?', (BANK_ACCOUNT_ID,))
+    return cursor.fetchone()[0] + pending_fees(cursor)
+
+
+def settle_fees():
+    """
+    Переносит накопленные комиссии на счет банка.
+
+    Returns:
+        float: Перенесенная сумма (0, если переносить нечего или счета банка нет).
+    """
+    with db_connection(immediate=True) as (conn, cursor):
+        return settle(cursor)
+
+
+def settle(cursor):
+    """Переносит комиссии fee_ledger на счет банка в текущей транзакции курсора; возвращает перенесенную сумму"""
+    cursor.execute('SELECT MAX(id), COALESCE(SUM(amount), 0) FROM fee_ledger')
+    last_id, amount = cursor.fetchone()
+    if last_id is None:
+        return 0
+
+    cursor.execute('UPDATE accounts SET balance = balance + ?, version = version + 1 WHERE id = ?',
+                   (amount, BANK_ACCOUNT_ID))
+    if cursor.rowcount == 0:
+        return 0
+
+    cursor.execute('DELETE FROM fee_ledger WHERE id <= ?', (last_id,))
+    return amount
+
+
+class FeeSettler(threading.Thread):
+    """Фоновый поток, который раз в interval секунд переносит комиссии на счет банка"""
+
+    def __init__(self, interval=SETTLE_INTERVAL):
+        super().__init__(name='fee-settler', daemon=True)
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            settle_fees()
+
+    def stop(self):
+        """Останавливает поток и переносит оставшиеся комиссии"""
+        self._stopped.set()
+        self.join()
+        settle_fees()
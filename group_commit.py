@@ -0,0 +1,137 @@
+"""
+Групповая фиксация операций записи.
+
+Операции из любых потоков ставятся в очередь одному потоку-писателю. Писатель набирает пачку - пока не наберется
+max_batch операций или не пройдет max_latency секунд с первой операции пачки - и проводит всю пачку в одной
+транзакции BEGIN IMMEDIATE с одним COMMIT. Каждая операция выполняется внутри своего SAVEPOINT: если она упала
+с исключением, откатываются только ее изменения, а остальные операции пачки фиксируются. Вызывающий код получает
+concurrent.futures.Future с результатом своей операции, который выставляется после COMMIT.
+
+Пример:
+    writer = GroupCommitWriter()
+    writer.start()
+    future = writer.make_transfer(1, 3, 100)
+    print(future.result())
+    writer.stop()
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import money
+import transfer_engine
+from database import get_pool
+
+MAX_BATCH = 256
+MAX_LATENCY = 0.002  # секунд
+
+
+class GroupCommitWriter:
+    """Поток-писатель, который фиксирует операции пачками"""
+
+    def __init__(self, max_batch=MAX_BATCH, max_latency=MAX_LATENCY, pool=None):
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.pool = pool
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def start(self):
+        """Запускает поток-писатель"""
+        self._thread = threading.Thread(target=self._run, name='group-commit-writer', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Дописывает уже поставленные операции и останавливает поток"""
+        self._queue.put(None)
+        self._thread.join()
+
+    def submit(self, operation, *args):
+        """
+        Ставит операцию в очередь.
+
+        Args:
+            operation: Функция operation(cursor, *args), которая выполняет операцию на курсоре писателя и
+                не фиксирует транзакцию сама (например, transfer_engine.apply_transfer).
+
+        Returns:
+            Future: Результат операции после фиксации пачки.
+        """
+        future = Future()
+        self._queue.put((future, operation, args))
+        return future
+
+    def make_transfer(self, sender_id, recipient_id, amount):
+        """Перевод между клиентами (сумма в рублях)"""
+        return self.submit(transfer_engine.apply_transfer, sender_id, recipient_id, money.to_minor(amount))
+
+    def pay_salary(self, sender_id, recipient_id, salary_amount):
+        """Выплата зарплаты (сумма в рублях)"""
+        return self.submit(transfer_engine.apply_salary, sender_id, recipient_id, money.to_minor(salary_amount))
+
+    def deposit_money(self, account_id, amount):
+        """Пополнение счета (сумма в рублях)"""
+        return self.submit(transfer_engine.apply_deposit, account_id, money.to_minor(amount))
+
+    def withdraw_money(self, account_id, amount):
+        """Снятие наличных (сумма в рублях)"""
+        return self.submit(transfer_engine.apply_withdrawal, account_id, money.to_minor(amount))
+
+    def _next_batch(self):
+        """Ждет первую операцию и добирает пачку до max_batch или до истечения max_latency"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_latency
+        while batch[-1] is not None and len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        running = True
+        while running:
+            batch = self._next_batch()
+            if batch[-1] is None:
+                running = False
+                batch.pop()
+            if batch:
+                self._apply(batch)
+
+    def _apply(self, batch):
+        """Проводит пачку в одной транзакции и выставляет результаты"""
+        results = []
+        try:
+            with (self.pool or get_pool()).connection(immediate=True) as conn:
+                cursor = conn.cursor()
+                for future, operation, args in batch:
+                    if not future.set_running_or_notify_cancel():
+                        results.append(None)
+                        continue
+                    cursor.execute('SAVEPOINT operation')
+                    try:
+                        results.append((True, operation(cursor, *args)))
+                    except Exception as error:
+                        cursor.execute('ROLLBACK TO operation')
+                        results.append((False, error))
+                    cursor.execute('RELEASE operation')
+        except Exception as error:
+            # Не удалось зафиксировать пачку (или даже получить соединение): ни одна операция не проведена
+            for future, _, _ in batch:
+                if future.done():
+                    continue
+                if future.running() or future.set_running_or_notify_cancel():
+                    future.set_exception(error)
+            return
+
+        for (future, _, _), result in zip(batch, results):
+            if result is None:
+                continue
+            succeeded, value = result
+            if succeeded:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
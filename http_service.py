@@ -0,0 +1,347 @@
+"""
+HTTP/JSON-сервис для операций банка на стандартной библиотеке.
+
+Запросы обрабатываются ограниченным пулом потоков (workers). Соединения HTTP/1.1 остаются открытыми (keep-alive)
+до KEEP_ALIVE_TIMEOUT секунд простоя. Если все потоки заняты и очередь соединений (backlog) заполнена, новое
+соединение сразу получает 503. Операции используют общий пул соединений с БД (database.configure_pool).
+
+Все тела запросов и ответов - JSON. Кроме регистрации и входа, запросы требуют заголовок
+Authorization: Bearer <токен из /login>. Баланс, переводы, зарплата и снятие проверяют, что счет принадлежит
+клиенту сессии; пополнить, как и в меню main_bank_system, можно любой счет: пополнение только зачисляет внесенные
+наличные и не списывает деньги ни с какого счета. Суммы всех операций должны быть конечными и больше нуля,
+иначе ответ 400.
+
+    POST /register  {"type": "individual"|"company", "email", "phone", "password", "full_name" |
+                     "company_name", "director_name"}          -> 201 {"client_id", "message"}
+                                                               (409, если почта или телефон уже заняты)
+    POST /login     {"login": почта или телефон, "password"}   -> {"token"}
+    POST /logout
+    POST /accounts                                             -> {"message"} (новый счет клиента сессии)
+    GET  /accounts/<id>/balance                                -> {"account_id", "balance"}
+    POST /deposit   {"account_id", "amount"}                   -> {"message"}
+    POST /transfer  {"sender_id", "recipient_id", "amount"}    -> {"message"}
+    POST /salary    {"sender_id", "recipient_id", "amount"}    -> {"message"}
+    POST /withdraw  {"account_id", "amount"}                   -> {"message"}
+
+Запуск:
+    python http_service.py --db bank.db --port 8080 --workers 16
+"""
+import argparse
+import json
+import math
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import Client
+import database
+import main_bank_system
+import migrations
+import sessions
+import transfer_engine
+from client_importer import DUPLICATE_EMAIL, DUPLICATE_PHONE
+
+WORKERS = 16
+BACKLOG = 64  # Соединений, ожидающих свободного потока
+KEEP_ALIVE_TIMEOUT = 5.0  # секунд
+MAX_BODY = 64 * 1024  # байт
+
+BALANCE_PATH = re.compile(r'^/accounts/(\d+)/balance$')
+
+
+class HTTPError(Exception):
+    """Ошибка запроса: код ответа и сообщение"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def field(body, name, kind=str):
+    """Обязательное поле тела запроса, приведенное к kind; строковое поле должно быть строкой JSON"""
+    if name not in body:
+        raise HTTPError(400, f'Не указано поле {name}')
+    if kind is str:
+        if not isinstance(body[name], str):
+            raise HTTPError(400, f'Некорректное поле {name}')
+        return body[name]
+    try:
+        return kind(body[name])
+    except (TypeError, ValueError):
+        raise HTTPError(400, f'Некорректное поле {name}') from None
+
+
+def optional_field(body, name):
+    """Необязательное строковое поле тела запроса (по умолчанию пустая строка)"""
+    value = body.get(name, '')
+    if not isinstance(value, str):
+        raise HTTPError(400, f'Некорректное поле {name}')
+    return value
+
+
+def amount_field(body, name='amount'):
+    """Сумма операции в рублях: конечное число больше нуля"""
+    amount = field(body, name, float)
+    if not math.isfinite(amount) or amount <= 0:
+        raise HTTPError(400, transfer_engine.INVALID_AMOUNT)
+    return amount
+
+
+def operation_result(message):
+    """
+    Ответ на денежную операцию: отказ в доступе к чужому счету - 403, счет так и не удалось изменить из-за
+    одновременных операций - 409, остальное - 200 с сообщением
+    """
+    if message == transfer_engine.ACCESS_DENIED:
+        raise HTTPError(403, message)
+    if message == transfer_engine.CONFLICT:
+        raise HTTPError(409, message)
+    return 200, {'message': message}
+
+
+def register(body, principal):
+    try:
+        client_id, message = Client.Client.register(
+            field(body, 'type'), field(body, 'email'), field(body, 'phone'), field(body, 'password'),
+            optional_field(body, 'full_name'), optional_field(body, 'company_name'),
+            optional_field(body, 'director_name'))
+    except sqlite3.IntegrityError as error:
+        # Уникальные индексы почты и телефона (миграция 1) отклоняют занятые значения
+        if 'clients.email' in str(error):
+            raise HTTPError(409, DUPLICATE_EMAIL) from None
+        if 'clients.phone' in str(error):
+            raise HTTPError(409, DUPLICATE_PHONE) from None
+        raise
+    if client_id is None:
+        raise HTTPError(400, message)
+    return 201, {'client_id': client_id, 'message': message}
+
+
+def login(body, principal):
+    token = sessions.authenticate(field(body, 'login'), field(body, 'password'))
+    if token is None:
+        raise HTTPError(401, 'Неверный логин или пароль')
+    return 200, {'token': token}
+
+
+def create_account(body, principal, token):
+    message = Client.Client.create_account_for_client(principal.client_id, principal.client_type)
+    sessions.refresh(token)
+    return 200, {'message': message}
+
+
+def balance(account_id, principal):
+    if not principal.owns(account_id):
+        raise HTTPError(403, transfer_engine.ACCESS_DENIED)
+    return 200, {'account_id': account_id, 'balance': main_bank_system.view_balance(account_id)}
+
+
+def deposit(body, principal):
+    return operation_result(main_bank_system.deposit_money(field(body, 'account_id', int),
+                                                           amount_field(body)))
+
+
+def transfer(body, principal):
+    return operation_result(main_bank_system.make_transfer(field(body, 'sender_id', int),
+                                                           field(body, 'recipient_id', int),
+                                                           amount_field(body), principal))
+
+
+def salary(body, principal):
+    return operation_result(main_bank_system.pay_salary(field(body, 'sender_id', int),
+                                                        field(body, 'recipient_id', int),
+                                                        amount_field(body), principal))
+
+
+def withdraw(body, principal):
+    return operation_result(main_bank_system.withdraw_money(field(body, 'account_id', int),
+                                                            amount_field(body), principal))
+
+
+# Путь POST-запроса -> (обработчик, нужна ли сессия)
+POST_ROUTES = {
+    '/register': (register, False),
+    '/login': (login, False),
+    '/deposit': (deposit, True),
+    '/transfer': (transfer, True),
+    '/salary': (salary, True),
+    '/withdraw': (withdraw, True),
+}
+
+
+class BankRequestHandler(BaseHTTPRequestHandler):
+    """Обработчик запросов: разбор JSON, проверка сессии и вызов операции"""
+
+    protocol_version = 'HTTP/1.1'
+    timeout = KEEP_ALIVE_TIMEOUT
+    # Заголовки и тело ответа пишутся отдельно: без TCP_NODELAY keep-alive ответ ждет отложенного ACK (~40 мс)
+    disable_nagle_algorithm = True
+    server_version = 'BankHTTP/1.0'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_body(self):
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # Границы тела неизвестны: соединение дальше не читается
+            self.close_connection = True
+            raise HTTPError(400, 'Некорректный заголовок Content-Length')
+        if length > MAX_BODY:
+            self.close_connection = True
+            raise HTTPError(413, 'Слишком большой запрос')
+        if not length:
+            return {}
+        try:
+            body = json.loads(self.rfile.read(length))
+        except ValueError:
+            raise HTTPError(400, 'Тело запроса должно быть JSON') from None
+        if not isinstance(body, dict):
+            raise HTTPError(400, 'Тело запроса должно быть JSON-объектом')
+        return body
+
+    def session(self):
+        """Токен и principal из заголовка Authorization"""
+        scheme, _, token = self.headers.get('Authorization', '').partition(' ')
+        principal = sessions.store.get(token) if scheme == 'Bearer' and token else None
+        if principal is None:
+            raise HTTPError(401, 'Требуется вход')
+        return token, principal
+
+    def respond(self, handler):
+        try:
+            status, payload = handler()
+        except HTTPError as error:
+            status, payload = error.status, {'message': error.message}
+        except Exception:
+            self.server.handle_error(self.request, self.client_address)
+            status, payload = 500, {'message': 'Внутренняя ошибка сервера'}
+        self.send_json(status, payload)
+
+    def do_GET(self):
+        def handle():
+            match = BALANCE_PATH.match(self.path)
+            if match is None:
+                raise HTTPError(404, 'Неизвестный адрес')
+            token, principal = self.session()
+            return balance(int(match.group(1)), principal)
+
+        self.respond(handle)
+
+    def do_POST(self):
+        def handle():
+            body = self.read_body()
+            if self.path == '/logout':
+                token, principal = self.session()
+                sessions.store.revoke(token)
+                return 200, {'message': 'Выход выполнен'}
+            if self.path == '/accounts':
+                token, principal = self.session()
+                return create_account(body, principal, token)
+            route = POST_ROUTES.get(self.path)
+            if route is None:
+                raise HTTPError(404, 'Неизвестный адрес')
+            handler, needs_session = route
+            principal = self.session()[1] if needs_session else None
+            return handler(body, principal)
+
+        self.respond(handle)
+
+
+class BankHTTPServer(HTTPServer):
+    """
+    HTTP-сервер с ограниченным пулом потоков.
+
+    Каждое принятое соединение обслуживается одним потоком пула до закрытия (keep-alive). Не больше backlog
+    соединений ждут свободного потока, остальные сразу получают 503 и закрываются.
+    """
+
+    def __init__(self, address, workers=WORKERS, backlog=BACKLOG, verbose=False):
+        super().__init__(address, BankRequestHandler, bind_and_activate=False)
+        # Очередь listen() по умолчанию - 5 соединений, при одновременном подключении многих клиентов ядро их сбрасывает
+        self.request_queue_size = workers + backlog
+        self.verbose = verbose
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='http-worker')
+        self._slots = threading.BoundedSemaphore(workers + backlog)
+        try:
+            self.server_bind()
+            self.server_activate()
+        except BaseException:
+            self.server_close()
+            raise
+
+    def process_request(self, request, client_address):
+        if not self._slots.acquire(blocking=False):
+            self.reject(request)
+            return
+        self._executor.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def reject(self, request):
+        """Отвечает 503 на соединение, для которого нет места в очереди"""
+        data = json.dumps({'message': 'Сервер перегружен'}, ensure_ascii=False).encode('utf-8')
+        try:
+            request.sendall(b'HTTP/1.1 503 Service Unavailable\r\nContent-Type: application/json; charset=utf-8\r\n'
+                            b'Connection: close\r\nContent-Length: ' + str(len(data)).encode() + b'\r\n\r\n' + data)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._executor.shutdown(wait=True)
+
+
+def serve(db_path, host='127.0.0.1', port=8080, workers=WORKERS, backlog=BACKLOG, verbose=False):
+    """Настраивает пул соединений с БД по числу потоков и запускает сервер до прерывания"""
+    database.configure_pool(db_path, size=workers, read_size=workers)
+    database.create_tables()
+    migrations.migrate()
+    server = BankHTTPServer((host, port), workers, backlog, verbose)
+    print(f'Сервис банка слушает http://{host}:{server.server_address[1]}', flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        database.close_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--db', default=database.DATABASE_PATH)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=WORKERS, help='Потоков обработки запросов')
+    parser.add_argument('--backlog', type=int, default=BACKLOG, help='Соединений в очереди к потокам')
+    parser.add_argument('--verbose', action='store_true', help='Печатать журнал запросов')
+    args = parser.parse_args()
+    serve(args.db, args.host, args.port, args.workers, args.backlog, args.verbose)
+
+
+if __name__ == '__main__':
+    main()
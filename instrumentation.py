@@ -0,0 +1,354 @@
+"""
+Измерение операций банка: число SQL-запросов, открытых соединений, измененных строк и гистограммы задержек.
+
+Публичные операции помечаются декоратором @operation('имя'). Пока измерение выключено, декоратор только проверяет
+флаг enabled и вызывает функцию. После enable():
+    - каждое соединение, выданное пулом (database.ConnectionPool.connection), получает trace callback, который
+      считает выполненные запросы, а по разнице conn.total_changes считаются измененные строки;
+    - пул сообщает о каждом новом соединении (connection_opened);
+    - время операции записывается в гистограмму с логарифмическими корзинами (как в HdrHistogram: относительная
+      погрешность не больше 1/64).
+Конфликты оптимистичной записи (optimistic.retry: счет изменила другая операция между чтением и записью)
+считаются функцией conflict(). Счетчики вложенной операции (money_cash -> withdraw_money) добавляются и к внешней.
+Запросы вне операций (например, поток group_commit) учитываются как операция OTHER. Время интерактивных login и money_cash включает
+ожидание ввода, поэтому для задержки без ввода смотрите authenticate и withdraw_money.
+
+Снимок счетчиков - snapshot(); текстовый формат Prometheus - prometheus_text() и write_prometheus(path).
+Из окружения: BANK_INSTRUMENTATION=1 включает измерение, BANK_METRICS_FILE - файл, в который раз в
+BANK_METRICS_INTERVAL секунд записывается дамп (см. configure_from_env).
+"""
+import functools
+import os
+import threading
+import time
+
+SUB_BUCKET_BITS = 7
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS  # Значения меньше SUB_BUCKETS микросекунд хранятся точно
+HALF_BUCKETS = SUB_BUCKETS // 2
+
+OTHER = 'other'
+DUMP_INTERVAL = 10.0  # секунд
+PROMETHEUS_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                      1.0, 2.5, 5.0, 10.0)  # секунд
+
+enabled = False
+
+
+class Histogram:
+    """Гистограмма задержек в микросекундах с логарифмически-линейными корзинами"""
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    @staticmethod
+    def bucket(value):
+        """Номер корзины для значения в микросекундах"""
+        if value < SUB_BUCKETS:
+            return value
+        shift = value.bit_length() - SUB_BUCKET_BITS
+        return SUB_BUCKETS + (shift - 1) * HALF_BUCKETS + (value >> shift) - HALF_BUCKETS
+
+    @staticmethod
+    def bucket_upper(index):
+        """Наибольшее значение, попадающее в корзину"""
+        if index < SUB_BUCKETS:
+            return index
+        shift, mantissa = divmod(index - SUB_BUCKETS, HALF_BUCKETS)
+        return ((mantissa + HALF_BUCKETS + 1) << (shift + 1)) - 1
+
+    def record(self, value):
+        value = max(0, int(value))
+        index = self.bucket(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, fraction):
+        """Значение, не меньше которого fraction всех записей (в микросекундах)"""
+        if not self.count:
+            return 0
+        rank = max(1, round(fraction * self.count))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self.bucket_upper(index), self.max)
+        return self.max
+
+    def cumulative(self, bounds):
+        """Накопленные количества записей не больше каждой границы (в микросекундах)"""
+        result = []
+        for bound in bounds:
+            result.append(sum(count for index, count in self.counts.items() if self.bucket_upper(index) <= bound))
+        return result
+
+
+class OperationStats:
+    """Накопленные счетчики одной операции"""
+
+    __slots__ = ('calls', 'errors', 'statements', 'connections', 'rows', 'conflicts', 'latency')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.statements = 0
+        self.connections = 0
+        self.rows = 0
+        self.conflicts = 0
+        self.latency = Histogram()
+
+
+class Frame:
+    """Счетчики выполняющейся операции"""
+
+    __slots__ = ('statements', 'connections', 'rows', 'conflicts')
+
+    def __init__(self):
+        self.statements = 0
+        self.connections = 0
+        self.rows = 0
+        self.conflicts = 0
+
+
+_local = threading.local()
+_lock = threading.Lock()
+_operations = {}
+_other = Frame()
+_dumper = None
+
+
+def _frames():
+    frames = getattr(_local, 'frames', None)
+    if frames is None:
+        frames = _local.frames = []
+    return frames
+
+
+def _current():
+    """Счетчики операции текущего потока или OTHER"""
+    frames = _frames()
+    return frames[-1] if frames else _other
+
+
+def _observe(name, func, args, kwargs):
+    frames = _frames()
+    frame = Frame()
+    frames.append(frame)
+    failed = False
+    started = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        frames.pop()
+        if frames:
+            parent = frames[-1]
+            parent.statements += frame.statements
+            parent.connections += frame.connections
+            parent.rows += frame.rows
+            parent.conflicts += frame.conflicts
+        _record(name, frame, elapsed, failed)
+
+
+def _record(name, frame, elapsed, failed):
+    with _lock:
+        stats = _operations.get(name)
+        if stats is None:
+            stats = _operations[name] = OperationStats()
+        stats.calls += 1
+        stats.errors += failed
+        stats.statements += frame.statements
+        stats.connections += frame.connections
+        stats.rows += frame.rows
+        stats.conflicts += frame.conflicts
+        stats.latency.record(elapsed * 1000000)
+
+
+def operation(name):
+    """Декоратор публичной операции: при включенном измерении собирает ее счетчики и задержку"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            return _observe(name, func, args, kwargs)
+        return wrapper
+    return decorator
+
+
+def _trace(statement):
+    _current().statements += 1
+
+
+def attach(conn):
+    """Начинает наблюдение за соединением, выданным пулом; возвращает значение для detach"""
+    conn.set_trace_callback(_trace)
+    return conn.total_changes
+
+
+def detach(conn, total_changes):
+    """Заканчивает наблюдение за соединением и учитывает измененные строки"""
+    conn.set_trace_callback(None)
+    _current().rows += conn.total_changes - total_changes
+
+
+def connection_opened():
+    """Учитывает новое соединение с БД"""
+    _current().connections += 1
+
+
+def conflict():
+    """Учитывает конфликт оптимистичной записи (повтор операции)"""
+    _current().conflicts += 1
+
+
+def enable():
+    """Включает измерение"""
+    global enabled
+    enabled = True
+
+
+def disable():
+    """Выключает измерение и останавливает периодический дамп"""
+    global enabled, _dumper
+    enabled = False
+    if _dumper is not None:
+        _dumper.stop()
+        _dumper = None
+
+
+def reset():
+    """Сбрасывает все накопленные счетчики"""
+    with _lock:
+        _operations.clear()
+        _operations[OTHER] = OperationStats()
+        _other.statements = _other.connections = _other.rows = _other.conflicts = 0
+
+
+def _collect_other():
+    """Переносит счетчики запросов вне операций в OperationStats OTHER (вызывается под _lock)"""
+    stats = _operations.setdefault(OTHER, OperationStats())
+    stats.statements += _other.statements
+    stats.connections += _other.connections
+    stats.rows += _other.rows
+    stats.conflicts += _other.conflicts
+    _other.statements = _other.connections = _other.rows = _other.conflicts = 0
+
+
+def snapshot():
+    """
+    Снимок счетчиков по операциям.
+
+    Returns:
+        dict: имя операции -> calls, errors, statements, connections, rows, conflicts, statements_per_call и задержки
+        p50_ms, p90_ms, p99_ms, max_ms, mean_ms.
+    """
+    result = {}
+    with _lock:
+        _collect_other()
+        for name, stats in _operations.items():
+            latency = stats.latency
+            result[name] = {
+                'calls': stats.calls,
+                'errors': stats.errors,
+                'statements': stats.statements,
+                'connections': stats.connections,
+                'rows': stats.rows,
+                'conflicts': stats.conflicts,
+                'statements_per_call': stats.statements / stats.calls if stats.calls else 0.0,
+                'p50_ms': latency.percentile(0.5) / 1000,
+                'p90_ms': latency.percentile(0.9) / 1000,
+                'p99_ms': latency.percentile(0.99) / 1000,
+                'max_ms': latency.max / 1000,
+                'mean_ms': latency.total / latency.count / 1000 if latency.count else 0.0,
+            }
+    return result
+
+
+def prometheus_text():
+    """Счетчики в текстовом формате Prometheus"""
+    counters = (
+        ('bank_operation_calls_total', 'Вызовы операции', 'calls'),
+        ('bank_operation_errors_total', 'Операции, завершившиеся исключением', 'errors'),
+        ('bank_operation_statements_total', 'SQL-запросы операции', 'statements'),
+        ('bank_operation_connections_total', 'Соединения с БД, открытые во время операции', 'connections'),
+        ('bank_operation_rows_total', 'Строки, измененные операцией', 'rows'),
+        ('bank_operation_conflicts_total', 'Конфликты оптимистичной записи (повторы) операции', 'conflicts'),
+    )
+    lines = []
+    with _lock:
+        _collect_other()
+        operations = sorted(_operations.items())
+        for metric, help_text, attribute in counters:
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} counter')
+            for name, stats in operations:
+                lines.append(f'{metric}{{operation="{name}"}} {getattr(stats, attribute)}')
+
+        metric = 'bank_operation_latency_seconds'
+        lines.append(f'# HELP {metric} Время выполнения операции')
+        lines.append(f'# TYPE {metric} histogram')
+        bounds = [bound * 1000000 for bound in PROMETHEUS_BUCKETS]
+        for name, stats in operations:
+            latency = stats.latency
+            if not latency.count:
+                continue
+            for bound, count in zip(PROMETHEUS_BUCKETS, latency.cumulative(bounds)):
+                lines.append(f'{metric}_bucket{{operation="{name}",le="{bound}"}} {count}')
+            lines.append(f'{metric}_bucket{{operation="{name}",le="+Inf"}} {latency.count}')
+            lines.append(f'{metric}_sum{{operation="{name}"}} {latency.total / 1000000}')
+            lines.append(f'{metric}_count{{operation="{name}"}} {latency.count}')
+    return '\n'.join(lines) + '\n'
+
+
+def write_prometheus(path):
+    """Атомарно записывает дамп в формате Prometheus (например, для textfile collector node_exporter)"""
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w', encoding='utf-8') as file:
+        file.write(prometheus_text())
+    os.replace(temporary, path)
+
+
+class PrometheusDumper(threading.Thread):
+    """Фоновый поток, который раз в interval секунд записывает дамп в файл"""
+
+    def __init__(self, path, interval=DUMP_INTERVAL):
+        super().__init__(name='metrics-dumper', daemon=True)
+        self.path = path
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            write_prometheus(self.path)
+
+    def stop(self):
+        """Останавливает поток и записывает последний дамп"""
+        self._stopped.set()
+        self.join()
+        write_prometheus(self.path)
+
+
+def configure_from_env():
+    """Включает измерение и периодический дамп по переменным окружения BANK_INSTRUMENTATION и BANK_METRICS_FILE"""
+    global _dumper
+    if os.environ.get('BANK_INSTRUMENTATION') != '1':
+        return
+    enable()
+    path = os.environ.get('BANK_METRICS_FILE')
+    if path and _dumper is None:
+        _dumper = PrometheusDumper(path, float(os.environ.get('BANK_METRICS_INTERVAL', DUMP_INTERVAL)))
+        _dumper.start()
+
+
+reset()
@@ -0,0 +1,178 @@
+"""
+Журнал движения денег и восстановление балансов по нему.
+
+Журнал - таблица transactions, в которую только дописывают (миграция 9 запрещает UPDATE и DELETE). Каждая строка -
+одно движение денег, ее id - монотонно растущий номер в журнале:
+    - перевод и выплата зарплаты: sender_id и recipient_id, комиссия или налог в transfer_fee;
+    - пополнение счета: sender_id NULL;
+    - снятие наличных: recipient_id NULL.
+Комиссии и налоги всех строк зачисляются счету банка (BANK_ACCOUNT_ID) через fee_ledger (см. fees).
+
+accounts.balance - проекция журнала. balance_checkpoint хранит балансы счетов на строку журнала
+balance_checkpoint_seq: checkpoint периодически сворачивает в них строки после этой границы и передвигает ее.
+Баланс счета восстанавливается как баланс контрольной точки плюс строки журнала после нее, поэтому rebuild читает
+только хвост журнала, а не всю историю.
+
+Запуск:
+    python journal.py checkpoint --db bank.db
+    python journal.py rebuild 17 42 --db bank.db
+"""
+import argparse
+import threading
+from collections import defaultdict
+
+import database
+from balance_cache import invalidate_on_commit
+from database import db_connection
+from fees import pending_fees
+from transfer_engine import BANK_ACCOUNT_ID
+
+CHECKPOINT_INTERVAL = 300  # Период свертки журнала в контрольную точку, секунд
+
+
+def checkpoint_sequence(cursor):
+    """Номер последней строки журнала, учтенной в balance_checkpoint"""
+    cursor.execute('SELECT COALESCE((SELECT transaction_id FROM balance_checkpoint_seq WHERE id = 1), 0)')
+    return cursor.fetchone()[0]
+
+
+def tail_flows(cursor, since, until):
+    """
+    Суммирует движение денег по счетам для строк журнала с id в (since, until].
+
+    Returns:
+        tuple: (словарь счет -> изменение баланса в копейках, сумма комиссий и налогов).
+    """
+    flows = defaultdict(int)
+    cursor.execute('SELECT sender_id, SUM(amount + COALESCE(transfer_fee, 0)) FROM transactions '
+                   'WHERE id > ? AND id <= ? AND sender_id IS NOT NULL GROUP BY sender_id', (since, until))
+    for account_id, amount in cursor.fetchall():
+        flows[account_id] -= amount
+    cursor.execute('SELECT recipient_id, SUM(amount) FROM transactions '
+                   'WHERE id > ? AND id <= ? AND recipient_id IS NOT NULL GROUP BY recipient_id', (since, until))
+    for account_id, amount in cursor.fetchall():
+        flows[account_id] += amount
+    cursor.execute('SELECT COALESCE(SUM(transfer_fee), 0) FROM transactions WHERE id > ? AND id <= ?',
+                   (since, until))
+    return flows, cursor.fetchone()[0]
+
+
+def expected_balance(cursor, account_id):
+    """
+    Баланс счета по журналу: контрольная точка плюс строки журнала после нее.
+
+    Строки счета выбираются по индексам sender_id и recipient_id, поэтому стоимость не зависит от длины журнала.
+    Для счета банка это баланс вместе с еще не перенесенными комиссиями (fees.bank_balance).
+    """
+    since = checkpoint_sequence(cursor)
+    cursor.execute('''
+        SELECT COALESCE((SELECT balance FROM balance_checkpoint WHERE account_id = ?), 0)
+            + (SELECT COALESCE(SUM(amount), 0) FROM transactions WHERE recipient_id = ? AND id > ?)
+            - (SELECT COALESCE(SUM(amount + COALESCE(transfer_fee, 0)), 0) FROM transactions
+               WHERE sender_id = ? AND id > ?)
+    ''', (account_id, account_id, since, account_id, since))
+    balance = cursor.fetchone()[0]
+    if account_id == BANK_ACCOUNT_ID:
+        cursor.execute('SELECT COALESCE(SUM(transfer_fee), 0) FROM transactions WHERE id > ?', (since,))
+        balance += cursor.fetchone()[0]
+    return balance
+
+
+def checkpoint():
+    """
+    Сворачивает строки журнала после контрольной точки в balance_checkpoint.
+
+    Returns:
+        int: Сколько строк журнала свернуто.
+    """
+    with db_connection(immediate=True) as (conn, cursor):
+        since = checkpoint_sequence(cursor)
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM transactions')
+        until = cursor.fetchone()[0]
+        if until <= since:
+            return 0
+
+        flows, fees = tail_flows(cursor, since, until)
+        flows[BANK_ACCOUNT_ID] += fees
+        cursor.executemany('INSERT INTO balance_checkpoint (account_id, balance) VALUES (?, ?) '
+                           'ON CONFLICT(account_id) DO UPDATE SET balance = balance + excluded.balance',
+                           [(account_id, amount) for account_id, amount in flows.items() if amount])
+        cursor.execute('INSERT OR REPLACE INTO balance_checkpoint_seq (id, transaction_id) VALUES (1, ?)', (until,))
+        return until - since
+
+
+def rebuild(account_ids=None):
+    """
+    Восстанавливает accounts.balance по контрольной точке и хвосту журнала.
+
+    Args:
+        account_ids (list): Счета для восстановления (None - все счета).
+
+    Returns:
+        int: Сколько балансов исправлено.
+    """
+    with db_connection(immediate=True) as (conn, cursor):
+        if account_ids is None:
+            since = checkpoint_sequence(cursor)
+            cursor.execute('SELECT COALESCE(MAX(id), 0) FROM transactions')
+            flows, fees = tail_flows(cursor, since, cursor.fetchone()[0])
+            flows[BANK_ACCOUNT_ID] += fees
+            cursor.execute('SELECT a.id, a.balance, COALESCE(c.balance, 0) FROM accounts a '
+                           'LEFT JOIN balance_checkpoint c ON c.account_id = a.id')
+            rows = [(account_id, actual, expected + flows.get(account_id, 0))
+                    for account_id, actual, expected in cursor.fetchall()]
+        else:
+            rows = []
+            for account_id in account_ids:
+                cursor.execute('SELECT balance FROM accounts WHERE id = ?', (account_id,))
+                row = cursor.fetchone()
+                if row is not None:
+                    rows.append((account_id, row[0], expected_balance(cursor, account_id)))
+
+        # Комиссии из fee_ledger еще не перенесены на счет банка и в accounts.balance не входят
+        pending = pending_fees(cursor)
+        corrections = []
+        for account_id, actual, expected in rows:
+            if account_id == BANK_ACCOUNT_ID:
+                expected -= pending
+            if actual != expected:
+                corrections.append((expected, account_id))
+        cursor.executemany('UPDATE accounts SET balance = ?, version = version + 1 WHERE id = ?', corrections)
+        invalidate_on_commit(cursor, *(account_id for _, account_id in corrections))
+        return len(corrections)
+
+
+class JournalCheckpointer(threading.Thread):
+    """Фоновый поток, который раз в interval секунд сворачивает журнал в контрольную точку"""
+
+    def __init__(self, interval=CHECKPOINT_INTERVAL):
+        super().__init__(name='journal-checkpointer', daemon=True)
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            checkpoint()
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('command', choices=('checkpoint', 'rebuild'))
+    parser.add_argument('account_ids', type=int, nargs='*', help='Счета для rebuild (по умолчанию все)')
+    parser.add_argument('--db', default=database.DATABASE_PATH)
+    args = parser.parse_args()
+
+    database.configure_pool(args.db, size=1)
+    if args.command == 'checkpoint':
+        print(f'Свернуто строк журнала: {checkpoint()}')
+    else:
+        print(f'Исправлено балансов: {rebuild(args.account_ids or None)}')
+    database.close_pool()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,127 +1,76 @@
+import balance_cache
 import database
 import Client
+import fees
 import hashlib
-from database import connect_to_db, close_db_connection
+import instrumentation
+import journal
+import migrations
+import money
+import sessions
+import transfer_engine
+from database import db_connection, db_read_connection
 
 
-def get_sender_recipient_info(account_id):
-    """Функция для получения информации об отправителе и получателе"""
-    conn, cursor = connect_to_db()  # Открытие соединения
-
-    # Получаем информацию о счете
-    cursor.execute('SELECT * FROM accounts WHERE id = ?', (account_id,))
-    account_info = cursor.fetchone()
-
-    if account_info is None:
-        close_db_connection(conn)  # Закрытие соединения
-        return None, None, None
-
-    sender_id = account_info[0]
-    sender_balance = account_info[5]
-
-    # Получение информации о клиенте
-    cursor.execute('SELECT type FROM clients WHERE id = ?', (sender_id,))
-    sender_type = cursor.fetchone()[0]  # Тип клиента
+@instrumentation.operation('deposit_money')
+def deposit_money(client_id, amount):
+    """Функция пополнения счета: счет читается и пополняется в одной транзакции на запись, поэтому без конфликтов"""
+    with db_connection(immediate=True) as (conn, cursor):
+        return transfer_engine.apply_deposit(cursor, client_id, money.to_minor(amount))
 
-    close_db_connection(conn)  # Закрытие соединения
-    return sender_id, sender_balance, sender_type
 
+def sender_type_of(principal, sender_id):
+    """
+    Проверяет, что счет отправителя принадлежит клиенту сессии.
 
-def deposit_money(client_id, amount):
-    """Функция пополнения счета"""
-    conn, cursor = connect_to_db()  # Открытие соединения
-
-    # Выводим данные
-    cursor.execute('SELECT * FROM accounts WHERE id = ?', (client_id,))
-    account_info = cursor.fetchone()
-
-    if account_info is None:
-        conn.close()
-        return "Клиент не найден"
-
-    column_names = [desc[0] for desc in cursor.description]  # Извлечение названий из запроса
-    account_dict = dict(zip(column_names, account_info))  # Словарь с информацией о счете
-
-    balance = account_dict['balance']  # Получение текущего баланса
-    new_balance = balance + amount  # Вычисление нового баланса
-    owner_name = account_dict['owner_name']
-
-    # Обновление баланса в БД
-    cursor.execute('UPDATE accounts SET balance = ? WHERE id = ?', (new_balance, client_id))
-    conn.commit()
-    close_db_connection(conn)  # Закрытие соединения
-
-    return f"Счет успешно пополнен для {owner_name}. Новый баланс: {new_balance}"
-
-
-def update_account_balance(cursor, account_id, new_balance):
-    """Обновляет баланс для указанного счета"""
-    cursor.execute('UPDATE accounts SET balance = ? WHERE id = ?', (new_balance, account_id))
-
-
-def pay_salary(sender_id, recipient_id, salary_amount):
-    """Функция выплаты зарплаты"""
-    conn, cursor = connect_to_db()  # Открытие соединения
-
-    # Получаем информацию об отправителе и получателе
-    sender_id, sender_balance, sender_type = get_sender_recipient_info(sender_id)
-    recipient_id, recipient_balance, recipient_type = get_sender_recipient_info(recipient_id)
-
-    if sender_id is None or recipient_id is None:
-        close_db_connection(conn)  # Закрытие соединения
-        return "Клиент не найден"
-
-    sender_client_type = sender_type
-    recipient_client_type = recipient_type
-
-    if sender_client_type == 'Физическое лицо' and recipient_client_type == 'Физическое лицо':
-        close_db_connection(conn)  # Закрытие соединения
-        return "Перевод зарплаты запрещен"
-
-    if sender_client_type == 'Физическое лицо' and recipient_client_type == 'Юридическое лицо':
-        close_db_connection(conn)  # Закрытие соединения
-        return "Перевод зарплаты запрещен"
-
-    if sender_client_type == 'Юридическое лицо' and recipient_client_type == 'Юридическое лицо':
-        close_db_connection(conn)  # Закрытие соединения
-        return "Перевод зарплаты запрещен"
-
-    elif sender_client_type == 'Юридическое лицо':
-        transfer_fee = salary_amount * 0.42  # Налог 42% на сумму перевода
-        total_amount = salary_amount + transfer_fee
-        if sender_balance >= total_amount:
-            new_sender_balance = sender_balance - total_amount
-            new_recipient_balance = recipient_balance + salary_amount
-
-            # Проверяем наличие достаточных средств для перевода с учетом комиссии
-            if sender_balance < salary_amount:
-                close_db_connection(conn)  # Закрытие соединения
-                return "Недостаточно средств для перевода с учетом комиссии"
-
-            # Зачисляем налог на счет банка
-            bank_account_id = 2
-            cursor.execute('SELECT balance FROM accounts WHERE id = ?', (bank_account_id,))
-            bank_balance = cursor.fetchone()[0]
-            new_bank_balance = bank_balance + transfer_fee
-            cursor.execute('UPDATE accounts SET balance = ? WHERE id = ?', (new_bank_balance, bank_account_id))
-
-            # Обновляем балансы
-            update_account_balance(cursor, sender_id, new_sender_balance)
-            update_account_balance(cursor, recipient_id, new_recipient_balance)
-
-            # Записываем транзакцию
-            cursor.execute(
-                'INSERT INTO transactions (sender_id, recipient_id, amount, transfer_fee) VALUES (?, ?, ?, ?)',
-                (sender_id, recipient_id, salary_amount, transfer_fee))
-            conn.commit()
-            close_db_connection(conn)  # Закрытие соединения
-            return "Перевод успешно выполнен"
-        else:
-            close_db_connection(conn)  # Закрытие соединения
-            return "Недостаточно средств для перевода с учетом налога"
+    Returns:
+        tuple: (тип клиента или None без сессии, сообщение об ошибке или None).
+    """
+    if principal is None:
+        return None, None
+    if not principal.owns(sender_id):
+        return None, transfer_engine.ACCESS_DENIED
+    return principal.client_type, None
+
+
+@instrumentation.operation('pay_salary')
+def pay_salary(sender_id, recipient_id, salary_amount, principal=None):
+    """Функция выплаты зарплаты (principal - клиент сессии, см. sessions)"""
+    sender_type, error = sender_type_of(principal, sender_id)
+    if error is not None:
+        return error
+    with db_connection(immediate=True) as (conn, cursor):
+        return transfer_engine.apply_salary(cursor, sender_id, recipient_id, money.to_minor(salary_amount),
+                                            sender_type)
+
+
+@instrumentation.operation('pay_salary_batch')
+def pay_salary_batch(sender_id, payments, principal=None):
+    """
+    Выплата зарплаты списку сотрудников одной транзакцией.
 
+    Args:
+        sender_id (int): Счет юридического лица.
+        payments (list): Список пар (счет сотрудника, сумма зарплаты).
+        principal (sessions.Principal): Клиент сессии. Если передан, ведомость проводится только с его счета.
 
-def make_transfer(sender_id, recipient_id, amount):
+    Returns:
+        list: Отчет по строкам ведомости - (счет сотрудника, сумма, сообщение). Ведомость проводится целиком или не
+        проводится совсем.
+    """
+    _, error = sender_type_of(principal, sender_id)
+    if error is not None:
+        return [(recipient_id, money.from_minor(money.to_minor(amount)), error) for recipient_id, amount in payments]
+    with db_connection(immediate=True) as (conn, cursor):
+        paid, report = transfer_engine.apply_salary_batch(
+            cursor, sender_id, [(recipient_id, money.to_minor(amount)) for recipient_id, amount in payments])
+        if not paid:
+            conn.rollback()
+        return [(recipient_id, money.from_minor(amount), message) for recipient_id, amount, message in report]
+
+
+@instrumentation.operation('make_transfer')
+def make_transfer(sender_id, recipient_id, amount, principal=None):
     """
     Функция для осуществления денежных переводов между клиентами.
 
@@ -129,6 +78,8 @@ def make_transfer(sender_id, recipient_id, amount):
         sender_id (int): Идентификатор отправителя.
         recipient_id (int): Идентификатор получателя.
         amount (float): Сумма перевода.
+        principal (sessions.Principal): Клиент сессии. Если передан, перевод разрешен только с его счета, а тип
+            отправителя берется из сессии без запроса к БД.
 
     Returns:
         str: Сообщение о результате операции.
@@ -148,201 +99,127 @@ def make_transfer(sender_id, recipient_id, amount):
         - Если отправитель юридическое лицо, а получатель физическое лицо, то операция отклоняется.
 
         В случае успешного перевода, балансы отправителя и получателя обновляются, а также записывается соответствующая
-        транзакция. Комиссия или налог зачисляются на счет банка.
+        транзакция. Комиссия или налог зачисляются на счет банка. Все изменения выполняются в одной транзакции
+        BEGIN IMMEDIATE (см. transfer_engine).
 
         В случае ошибок (например, недостаточно средств или другие ошибки во время операции), функция вернет
         соответствующее сообщение об ошибке.
 
     """
-    conn, cursor = connect_to_db()  # Открытие соединения
-
-    # Получаем информацию об отправителе и получателе
-    sender_id, sender_balance, sender_type = get_sender_recipient_info(sender_id)
-    recipient_id, recipient_balance, recipient_type = get_sender_recipient_info(recipient_id)
-
-    # Проверка если нет ID в БД
-    if sender_id is None or recipient_id is None:
-        return "Клиент не найден"
-
-    # Проверка, кто отправитель и получатель
-    cursor.execute('SELECT type FROM clients WHERE id = ?', (sender_id,))
-    sender_client_type = cursor.fetchone()[0]
-    cursor.execute('SELECT type FROM clients WHERE id = ?', (recipient_id,))
-    recipient_client_type = cursor.fetchone()[0]
-
-    if sender_client_type == 'Юридическое лицо' and recipient_client_type == 'Физическое лицо':
-        close_db_connection(conn)  # Закрытие соединения
-        return "Перевод запрещен. Нельзя переводить с расчетного счета физическим лицам."
-
-    if sender_client_type == 'Физическое лицо' and recipient_client_type == 'Физическое лицо':
-
-        # Проверка чтобы нельзя было переводить самому себе на тот же счет.
-        if sender_id == recipient_id:
-            close_db_connection(conn)
-            return "Нельзя переводить самому себе."
-
-        transfer_fee = 0
-        if amount > 100000:
-            transfer_fee = amount * 0.01
-
-        # Вычисляем общую сумму, которая будет списана со счета отправителя
-        total_amount = amount + transfer_fee
-
-        # Проверяем наличие достаточных средств для перевода с учетом комиссии
-        if sender_balance < amount:
-            close_db_connection(conn)  # Закрытие соединения
-            return "Недостаточно средств для перевода с учетом комиссии"
-
-        # Обновляем балансы
-        new_sender_balance = sender_balance - total_amount
-        new_recipient_balance = recipient_balance + amount
-
-        cursor.execute('UPDATE accounts SET balance = ? WHERE id = ?', (new_sender_balance, sender_id))
-        cursor.execute('UPDATE accounts SET balance = ? WHERE id = ?', (new_recipient_balance, recipient_id))
-        cursor.execute('INSERT INTO transactions (sender_id, recipient_id, amount, transfer_fee) VALUES (?, ?, ?, ?)',
-                       (sender_id, recipient_id, amount, transfer_fee))
-
-        # Зачисляем комиссию на счет банка
-        bank_account_id = 2
-        cursor.execute('SELECT balance FROM accounts WHERE id = ?', (bank_account_id,))
-        bank_balance = cursor.fetchone()[0]
-        new_bank_balance = bank_balance + transfer_fee
-        cursor.execute('UPDATE accounts SET balance = ? WHERE id = ?', (new_bank_balance, bank_account_id))
-
-        conn.commit()
-        close_db_connection(conn)  # Закрытие соединения
-        return "Перевод успешно выполнен"
-
-    if (sender_client_type == 'Юридическое лицо' and recipient_client_type == 'Юридическое лицо' or
-            sender_client_type == 'Физическое лицо' and recipient_client_type == 'Юридическое лицо'):
-
-        # Проверка чтобы нельзя было переводить самому себе.
-        if sender_id == recipient_id:
-            close_db_connection(conn)
-            return "Нельзя переводить самому себе."
-
-        transfer_fee = amount * 0.2  # Налог 20% на сумму перевода
-        total_amount = amount + transfer_fee
-
-        # Проверяем наличие достаточных средств для перевода с учетом налога
-        if sender_balance >= total_amount:
-            new_sender_balance = sender_balance - total_amount
-            new_recipient_balance = recipient_balance + amount
-
-            # Обновляем балансы
-            cursor.execute('UPDATE accounts SET balance = ? WHERE id = ?', (new_sender_balance, sender_id))
-            cursor.execute('UPDATE accounts SET balance = ? WHERE id = ?', (new_recipient_balance, recipient_id))
-
-            # Зачисляем налог на счет банка
-            bank_account_id = 2
-            cursor.execute('SELECT balance FROM accounts WHERE id = ?', (bank_account_id,))
-            bank_balance = cursor.fetchone()[0]
-            new_bank_balance = bank_balance + transfer_fee
-            cursor.execute('UPDATE accounts SET balance = ? WHERE id = ?', (new_bank_balance, bank_account_id))
-
-            # Записываем транзакцию
-            cursor.execute(
-                'INSERT INTO transactions (sender_id, recipient_id, amount, transfer_fee) VALUES (?, ?, ?, ?)',
-                (sender_id, recipient_id, amount, transfer_fee))
-
-            conn.commit()  # Записываем
-            close_db_connection(conn)  # Закрытие соединения
-            return "Перевод успешно выполнен"
-        else:
-            close_db_connection(conn)  # Закрытие соединения
-            return "Недостаточно средств для перевода с учетом налога"
+    sender_type, error = sender_type_of(principal, sender_id)
+    if error is not None:
+        return error
+    with db_connection(immediate=True) as (conn, cursor):
+        return transfer_engine.apply_transfer(cursor, sender_id, recipient_id, money.to_minor(amount), sender_type)
 
 
+@instrumentation.operation('view_balance')
 def view_balance(account_id):
     """Просмотр баланса"""
-    conn, cursor = connect_to_db()  # Открытие соединения
-
-    # Выводим информацию из БД
-    cursor.execute('SELECT balance FROM accounts WHERE id = ?', (account_id,))
-    balance = cursor.fetchone()[0]
-
-    close_db_connection(conn)  # Закрытие соединения
-    return balance
+    account_id = int(account_id)
+    balance = balance_cache.cache.get(account_id)
+    if balance is not None:
+        return money.from_minor(balance)
+
+    generation = balance_cache.cache.generation()
+    with db_read_connection() as (conn, cursor):
+        # Счет банка учитывает еще не перенесенные комиссии
+        if account_id == transfer_engine.BANK_ACCOUNT_ID:
+            balance = fees.bank_balance(cursor)
+        else:
+            # Выводим информацию из БД
+            cursor.execute('SELECT balance FROM accounts WHERE id = ?', (account_id,))
+            balance = cursor.fetchone()[0]
+
+    balance_cache.cache.put(account_id, balance, generation)
+    return money.from_minor(balance)
+
+
+def select_account(account_ids):
+    """Счет клиента для операции: единственный или выбранный из account_ids; None, если счетов нет"""
+    if not account_ids:
+        print("У вас нет счетов.")
+        return None
+    if len(account_ids) == 1:
+        return account_ids[0]
+    print("Ваши счета:", ', '.join(map(str, account_ids)))
+    while True:
+        try:
+            account_id = int(input("Выберите счет: "))
+        except ValueError:
+            account_id = None
+        if account_id in account_ids:
+            return account_id
+        print("Некорректный счет.")
 
 
-def perform_transfer(sender_id):
+def perform_transfer(sender_id, principal=None):
     """Функция перевода средств"""
     recipient_id = int(input("Введите ID получателя: "))
     transfer_amount = float(input("Введите сумму перевода: "))
 
-    transfer_result = make_transfer(sender_id, recipient_id, transfer_amount)
+    transfer_result = make_transfer(sender_id, recipient_id, transfer_amount, principal)
     print(transfer_result)
 
 
-def money_cash(account_id):
-    """Функция снятия денег"""
-    conn, cursor = connect_to_db()  # Открытие соединения
-
-    # Получение информации у кого снимаем деньги
-    cursor.execute('SELECT * FROM accounts WHERE id = ?', (account_id,))
-    account_info = cursor.fetchone()
-
-    if account_info is None:
-        close_db_connection(conn)  # Закрытие соединения
-        return "Клиент не найден"
+@instrumentation.operation('money_cash')
+def money_cash(account_id, principal=None):
+    """Функция снятия денег (principal - клиент сессии: тип счета и клиента берутся из сессии)"""
+    if principal is not None:
+        if not principal.owns(account_id):
+            return transfer_engine.ACCESS_DENIED
+        account_type, client_type = principal.accounts[int(account_id)], principal.client_type
+    else:
+        with db_read_connection() as (conn, cursor):
+            # Получение информации у кого снимаем деньги
+            account_info = transfer_engine.load_account(cursor, account_id)
 
-    account_type = account_info[2]  # Тип счета
-    client_id = account_info[1]  # ID клиента
+        if account_info is None:
+            return "Клиент не найден"
+        account_type, client_type = account_info[2], account_info[5]  # Тип счета и тип клиента
 
     print("Тип счета:", account_type)
     if account_type == 'Расчетный':
-        close_db_connection(conn)  # Закрытие соединения
         return 'Нельзя снимать деньги с расчетного счета.'
 
-    balance = account_info[5]  # Текущий баланс
-
-    # Получение информации о клиенте
-    cursor.execute('SELECT type FROM clients WHERE id = ?', (client_id,))
-    client_type = cursor.fetchone()[0]  # Тип клиента
-
     print("Тип клиента:", client_type)
 
     try:
         amount_to_withdraw = float(input("Введите сумму для снятия."))
     except ValueError:
-        close_db_connection(conn)  # Закрытие соединения
         return 'Некорректная сумма'
 
-    if amount_to_withdraw <= 0:
-        close_db_connection(conn)  # Закрытие соединения
-        return 'Некорректная сумма'
+    return withdraw_money(account_id, amount_to_withdraw, principal)
 
-    if client_type == 'Физическое лицо' and amount_to_withdraw > 1000000:
-        close_db_connection(conn)  # Закрытие соединения
-        return 'Физическим лицам запрещено снимать более 1 миллиона. Вам нужно явиться в банк.'
 
-    if balance >= amount_to_withdraw:
-        new_balance = balance - amount_to_withdraw
+@instrumentation.operation('withdraw_money')
+def withdraw_money(account_id, amount, principal=None):
+    """Снятие наличных без интерактивного ввода"""
+    try:
+        amount_minor = money.to_minor(amount)
+    except ValueError:
+        return transfer_engine.INVALID_AMOUNT
 
-        # Обновляем баланс
-        cursor.execute('UPDATE accounts SET balance = ? WHERE client_id = ?', (new_balance, account_id))
-        conn.commit()
-        close_db_connection(conn)  # Закрытие соединения
-        return f"Сумма {amount_to_withdraw} успешно снята. Новый баланс: {new_balance}"
-    else:
-        close_db_connection(conn)  # Закрытие соединения
-        return 'Недостаточно средств на счете.'
+    account_type = client_type = None
+    if principal is not None:
+        if not principal.owns(account_id):
+            return transfer_engine.ACCESS_DENIED
+        account_type, client_type = principal.accounts[int(account_id)], principal.client_type
+
+    with db_connection(immediate=True) as (conn, cursor):
+        return transfer_engine.apply_withdrawal(cursor, account_id, amount_minor, account_type, client_type)
 
 
+@instrumentation.operation('login')
 def login():
-    """Функция для входа в личный кабинет"""
+    """Функция для входа в личный кабинет. Возвращает токен сессии (см. sessions)"""
     while True:
         email_or_phone = input("Введите почту или телефон: ")
 
-        conn, cursor = connect_to_db()  # Открытие соединения
-
-        cursor.execute('SELECT id, type, full_name, password FROM clients WHERE (email = ? OR phone = ?)'
-                       , (email_or_phone, email_or_phone))
-
-        user_data = cursor.fetchone()  # Записываем
+        with db_read_connection() as (conn, cursor):
+            user_data = sessions.find_client(cursor, email_or_phone)
 
         if user_data is None:
-            close_db_connection(conn)  # Закрытие соединения
             print('Пользователь с такой почтой или телефоном не найден.')
             continue  # Пользователь не найден, продолжаем цикл.
 
@@ -354,16 +231,20 @@ def login():
 
         # Проверка введенного пароля
         if hashed_password != stored_password:
-            close_db_connection(conn)
             print("Не правильный пароль. Попробуйте снова.")
             continue  # Не правильный пароль, продолжаем цикл
 
-        close_db_connection(conn)
-        return user_id, user_type, user_full_name
+        return sessions.open_session(user_id, user_type, user_full_name)
 
 
 def main():
+    instrumentation.configure_from_env()
     database.create_tables()
+    migrations.migrate()
+    fee_settler = fees.FeeSettler()
+    fee_settler.start()
+    checkpointer = journal.JournalCheckpointer()
+    checkpointer.start()
     while True:
         print("1. Регистрация физического лица.")
         print("2. Регистрация юридического лица.")
@@ -382,9 +263,12 @@ def main():
             result = deposit_money(client_id, deposit_amount)
             print(result)
         elif choice == '4':
-            user_id = login()
-            if user_id is not None:
-                user_id, user_type, user_full_name = user_id
+            token = login()
+            principal = sessions.store.get(token)
+            if principal is not None:
+                user_id, user_type, user_full_name = principal.client_id, principal.client_type, principal.full_name
+                # Операции меню идут по счетам клиента, а не по его id
+                account_ids = sorted(principal.accounts)
                 print("Вход выполнен. Здравствуйте, дорогой: ", user_full_name)
                 if user_type == 'Физическое лицо':
                     print("1. Создать счёт.")
@@ -396,12 +280,15 @@ def main():
                     user_choice = input("Выберите пункт: ")
                     if user_choice == '1':
                         result = Client.Client.create_account_for_client(user_id, user_type)
+                        sessions.refresh(token)
                         print(result)
                     elif user_choice == '2':
-                        user_balance = view_balance(user_id)
-                        print(f"Баланс вашего счета: {user_balance}")
+                        for account_id in account_ids:
+                            print(f"Баланс счета {account_id}: {view_balance(account_id)}")
                     elif user_choice == '3':
-                        perform_transfer(user_id)
+                        account_id = select_account(account_ids)
+                        if account_id is not None:
+                            perform_transfer(account_id, principal)
                         continue
                     elif user_choice == '4':
                         new_name = input('Введите новое имя: ')
@@ -410,18 +297,25 @@ def main():
                         new_password = input("Введите новый пароль: ")
                         result = Client.Client.update_client_info_individual(user_id, new_name, new_phone, new_email,
                                                                              new_password)
+                        sessions.refresh(token)
                         print(result)
                     elif user_choice == '5':
-                        account_id = int(input('Введите ID клиента:'))
-                        result = money_cash(account_id)
-                        print(result)
+                        account_id = select_account(account_ids)
+                        if account_id is not None:
+                            print(money_cash(account_id, principal))
                     elif user_choice == '0':
                         print("Выход из личного кабинета.")
+                        sessions.store.revoke(token)
                         break
                     else:
                         print("Некорректный выбор.")
                 elif user_type == 'Юридическое лицо':
                     while True:
+                        principal = sessions.store.get(token)
+                        if principal is None:
+                            print("Сессия истекла. Войдите снова.")
+                            break
+                        account_ids = sorted(principal.accounts)
                         print("1. Создать счёт.")
                         print("2. Просмотр баланса.")
                         print("3. Выплатить ЗП сотрудникам.")
@@ -431,15 +325,16 @@ def main():
                         user_choice = input("Выберите пункт : ")
                         if user_choice == '1':
                             result = Client.Client.create_account_for_client(user_id, user_type)
+                            sessions.refresh(token)
                             print(result)
                         elif user_choice == '2':
-                            company_balance = view_balance(user_id)
-                            print(f"Баланс компании: {company_balance}")
+                            for account_id in account_ids:
+                                print(f"Баланс счета компании {account_id}: {view_balance(account_id)}")
                         elif user_choice == '3':
                             sender = input('Введите ID отправителя: ')
                             recipient = input('Введите ID получателя: ')
                             salary = int(input('Введите сумму зарплаты: '))
-                            result = pay_salary(sender, recipient, salary)
+                            result = pay_salary(sender, recipient, salary, principal)
                             print(result)
                         elif user_choice == '4':
                             new_name = input('Введите новое название компании: ')
@@ -449,11 +344,15 @@ def main():
                             new_password = input("Введите новый пароль: ")
                             result = Client.Client.update_client_info_company(user_id, new_name, new_director_name,
                                                                               new_phone, new_email, new_password)
+                            sessions.refresh(token)
                             print(result)
                         elif user_choice == '5':
-                            perform_transfer(user_id)
+                            account_id = select_account(account_ids)
+                            if account_id is not None:
+                                perform_transfer(account_id, principal)
                         elif user_choice == '0':
                             print("Выход из личного кабинета.")
+                            sessions.store.revoke(token)
                             break
                         else:
                             print("Некорректный выбор.")
@@ -461,6 +360,9 @@ def main():
                 print("Ошибка входа. Проверьте почту/телефон и пароль.")
         elif choice == '0':
             print("Программа завершена.")
+            fee_settler.stop()
+            checkpointer.stop()
+            instrumentation.disable()
             break
         else:
             print("Некорректный выбор")
@@ -0,0 +1,405 @@
+"""
+Движок операций с балансами в памяти и отложенной записью в БД.
+
+Счета загружаются из accounts и clients в словарь {id счета: Account}, и операции make_transfer, pay_salary,
+deposit_money и withdraw_money проверяются и проводятся в памяти по тем же правилам, что и transfer_engine.
+Каждая проведенная операция сначала дописывается в журнал операций (файлы-сегменты в каталоге log_dir), затем
+меняет балансы в памяти.
+
+Долговечность:
+    - журнал сбрасывается на диск (fsync) пачками: после fsync_batch операций или раз в sync_interval секунд,
+      поэтому при сбое питания могут потеряться только операции последней несброшенной пачки;
+    - раз в flush_interval секунд накопленные операции переносятся в bank.db одной транзакцией: балансы меняются
+      относительными UPDATE, все операции (и пополнения, и снятия) записываются в transactions, комиссии - одной
+      записью в fee_ledger, а номер последней перенесенной операции - в ledger_checkpoint. После этого старые
+      сегменты журнала удаляются;
+    - при запуске счета читаются из БД, и поверх них повторяются операции журнала с номером больше ledger_checkpoint.
+
+Счета, открытые после запуска (например, при регистрации), читаются из БД при первом обращении к ним.
+
+Пока движок запущен, он должен быть единственным, кто меняет балансы в bank.db.
+
+Функции модуля повторяют имена и аргументы main_bank_system и работают с движком, запущенным через start():
+    memory_ledger.start()
+    print(memory_ledger.make_transfer(1, 3, 100))
+    memory_ledger.stop()
+"""
+import os
+import threading
+import time
+from collections import defaultdict
+
+import balance_cache
+import fees
+import money
+import transfer_engine
+from database import db_connection, db_read_connection
+
+LOG_DIR = 'ledger_log'
+FSYNC_BATCH = 256  # операций между fsync журнала
+SYNC_INTERVAL = 0.01  # секунд: не дольше столько операция остается несброшенной на диск
+FLUSH_INTERVAL = 1.0  # секунд между переносами операций в БД
+
+ACCOUNT_SQL = ('SELECT a.id, c.type, a.account_type, a.owner_name, a.balance '
+               'FROM accounts a LEFT JOIN clients c ON c.id = a.client_id')
+
+# Виды записей журнала
+TRANSFER = 't'  # перевод или зарплата: отправитель, получатель, сумма, комиссия
+DEPOSIT = 'd'  # пополнение: счет, сумма
+WITHDRAWAL = 'w'  # снятие наличных: счет, сумма
+
+
+class Account:
+    """Счет в памяти вместе с типом клиента"""
+
+    __slots__ = ('id', 'client_type', 'account_type', 'owner_name', 'balance')
+
+    def __init__(self, account_id, client_type, account_type, owner_name, balance):
+        self.id = account_id
+        self.client_type = client_type
+        self.account_type = account_type
+        self.owner_name = owner_name
+        self.balance = balance
+
+
+def format_record(record):
+    """Строка журнала: номер, вид, счет, счет получателя, сумма, комиссия, время - через табуляцию"""
+    return '\t'.join(map(str, record)) + '\n'
+
+
+def parse_record(line):
+    """Разбирает строку журнала; возвращает None для недописанной строки"""
+    fields = line.rstrip('\n').split('\t')
+    if not line.endswith('\n') or len(fields) != 7:
+        return None
+    seq, kind, account_id, recipient_id, amount, fee, ts = fields
+    return int(seq), kind, int(account_id), int(recipient_id), int(amount), int(fee), ts
+
+
+class MemoryLedger:
+    """Балансы счетов в памяти с журналом операций и отложенной записью в БД"""
+
+    def __init__(self, log_dir=LOG_DIR, fsync_batch=FSYNC_BATCH, sync_interval=SYNC_INTERVAL,
+                 flush_interval=FLUSH_INTERVAL):
+        self.log_dir = log_dir
+        self.fsync_batch = fsync_batch
+        self.sync_interval = sync_interval
+        self.flush_interval = flush_interval
+        self.accounts = {}
+        self._seq = 0
+        self._pending = []  # записи журнала, еще не перенесенные в БД
+        self._unsynced = 0
+        self._segment = None
+        self._closed_segments = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Загружает счета из БД, повторяет хвост журнала и запускает фоновый поток записи"""
+        os.makedirs(self.log_dir, exist_ok=True)
+        checkpoint = self._load()
+        self._replay(checkpoint)
+        self._open_segment()
+        self._thread = threading.Thread(target=self._run, name='memory-ledger', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Переносит все операции в БД, останавливает фоновый поток и удаляет журнал"""
+        self._stopped.set()
+        self._thread.join()
+        self.flush()
+        with self._lock:
+            self._segment.close()
+            os.remove(self._segment.name)
+
+    def _load(self):
+        """Читает счета из БД и возвращает номер последней перенесенной операции журнала"""
+        with db_read_connection() as (conn, cursor):
+            cursor.execute(ACCOUNT_SQL)
+            self.accounts = {row[0]: Account(*row) for row in cursor.fetchall()}
+            # Счет банка учитывает еще не перенесенные комиссии
+            bank = self.accounts.get(transfer_engine.BANK_ACCOUNT_ID)
+            if bank is not None:
+                bank.balance += fees.pending_fees(cursor)
+            cursor.execute('SELECT seq FROM ledger_checkpoint WHERE id = 1')
+            checkpoint = cursor.fetchone()[0]
+        self._seq = checkpoint
+        return checkpoint
+
+    def _account(self, account_id):
+        """
+        Счет в памяти; счет, открытый после запуска, читается из БД (вызывается под self._lock).
+
+        Returns:
+            Account: Счет или None, если его нет и в БД.
+        """
+        account = self.accounts.get(account_id)
+        if account is not None:
+            return account
+        with db_read_connection() as (conn, cursor):
+            cursor.execute(ACCOUNT_SQL + ' WHERE a.id = ?', (account_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            account = self.accounts[account_id] = Account(*row)
+            if account_id == transfer_engine.BANK_ACCOUNT_ID:
+                account.balance += fees.pending_fees(cursor)
+        return account
+
+    def _segments(self):
+        """Сегменты журнала в порядке записи"""
+        return sorted(os.path.join(self.log_dir, name) for name in os.listdir(self.log_dir) if name.endswith('.log'))
+
+    def _replay(self, checkpoint):
+        """Повторяет операции журнала, еще не перенесенные в БД"""
+        for path in self._segments():
+            with open(path, encoding='utf-8') as segment:
+                for line in segment:
+                    record = parse_record(line)
+                    if record is None:
+                        break  # Недописанная при сбое строка - конец журнала
+                    if record[0] <= checkpoint:
+                        continue
+                    self._apply_record(record)
+                    self._pending.append(record)
+                    self._seq = record[0]
+            self._closed_segments.append(path)
+
+    def _open_segment(self):
+        """Открывает новый сегмент журнала, названный номером его первой операции"""
+        path = os.path.join(self.log_dir, f'{self._seq + 1:020d}.log')
+        if path in self._closed_segments:
+            # Сегмент без целых записей (сбой сразу после открытия) перезаписывается
+            self._closed_segments.remove(path)
+        self._segment = open(path, 'w', encoding='utf-8')
+
+    def _apply_record(self, record):
+        """Меняет балансы в памяти по записи журнала"""
+        _, kind, account_id, recipient_id, amount, fee, _ = record
+        if kind == TRANSFER:
+            self.accounts[account_id].balance -= amount + fee
+            self.accounts[recipient_id].balance += amount
+            bank = self.accounts.get(transfer_engine.BANK_ACCOUNT_ID)
+            if fee and bank is not None:
+                bank.balance += fee
+        elif kind == DEPOSIT:
+            self.accounts[account_id].balance += amount
+        else:
+            self.accounts[account_id].balance -= amount
+
+    def _append(self, kind, account_id, recipient_id, amount, fee=0):
+        """Записывает операцию в журнал и проводит ее в памяти (вызывается под self._lock)"""
+        self._seq += 1
+        ts = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+        record = (self._seq, kind, account_id, recipient_id, amount, fee, ts)
+        self._segment.write(format_record(record))
+        self._apply_record(record)
+        self._pending.append(record)
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_batch:
+            self._sync()
+
+    def _sync(self):
+        """Сбрасывает журнал на диск (вызывается под self._lock)"""
+        self._segment.flush()
+        os.fsync(self._segment.fileno())
+        self._unsynced = 0
+
+    def _run(self):
+        next_flush = time.monotonic() + self.flush_interval
+        while not self._stopped.wait(self.sync_interval):
+            with self._lock:
+                if self._unsynced:
+                    self._sync()
+            if time.monotonic() >= next_flush:
+                self.flush()
+                next_flush = time.monotonic() + self.flush_interval
+
+    def flush(self):
+        """
+        Переносит накопленные операции в БД одной транзакцией.
+
+        Returns:
+            int: Количество перенесенных операций.
+        """
+        with self._flush_lock:
+            with self._lock:
+                self._sync()
+                pending, self._pending = self._pending, []
+                if self._segment.tell():
+                    # Новые операции пишутся в новый сегмент, старые удаляются после фиксации в БД
+                    self._segment.close()
+                    self._closed_segments.append(self._segment.name)
+                    self._open_segment()
+
+            if pending:
+                try:
+                    self._persist(pending)
+                except BaseException:
+                    with self._lock:
+                        self._pending = pending + self._pending
+                    raise
+
+            for path in self._closed_segments:
+                os.remove(path)
+            self._closed_segments = []
+            return len(pending)
+
+    def _persist(self, records):
+        """Записывает операции журнала в БД вместе с номером последней из них"""
+        deltas = defaultdict(int)
+        entries = []
+        total_fee = 0
+        for _, kind, account_id, recipient_id, amount, fee, ts in records:
+            if kind == TRANSFER:
+                deltas[account_id] -= amount + fee
+                deltas[recipient_id] += amount
+                entries.append((account_id, recipient_id, amount, fee, ts))
+                total_fee += fee
+            elif kind == DEPOSIT:
+                deltas[account_id] += amount
+                entries.append((None, account_id, amount, 0, ts))
+            else:
+                deltas[account_id] -= amount
+                entries.append((account_id, None, amount, 0, ts))
+
+        with db_connection(immediate=True) as (conn, cursor):
+            cursor.executemany('UPDATE accounts SET balance = balance + ?, version = version + 1 WHERE id = ?',
+                               [(delta, account_id) for account_id, delta in deltas.items() if delta])
+            cursor.executemany('INSERT INTO transactions (sender_id, recipient_id, amount, transfer_fee, timestamp) '
+                               'VALUES (?, ?, ?, ?, ?)', entries)
+            if total_fee:
+                transfer_engine.record_fee(cursor, total_fee)
+            balance_cache.invalidate_on_commit(cursor, *deltas)
+            cursor.execute('UPDATE ledger_checkpoint SET seq = ? WHERE id = 1', (records[-1][0],))
+
+    def transfer(self, sender_id, recipient_id, amount):
+        """Перевод amount копеек по правилам make_transfer"""
+        if amount <= 0:
+            return transfer_engine.INVALID_AMOUNT
+        sender_id, recipient_id = int(sender_id), int(recipient_id)
+        with self._lock:
+            sender, recipient = self._account(sender_id), self._account(recipient_id)
+            if sender is None or recipient is None or sender.client_type is None or recipient.client_type is None:
+                return transfer_engine.NOT_FOUND
+
+            fee, message = transfer_engine.transfer_fee(sender.client_type, recipient.client_type, amount)
+            if fee is None:
+                return message
+
+            if sender_id == recipient_id:
+                return transfer_engine.SELF_TRANSFER
+
+            if sender.balance < amount + fee:
+                return message
+            self._append(TRANSFER, sender_id, recipient_id, amount, fee)
+        return transfer_engine.SUCCESS
+
+    def salary(self, sender_id, recipient_id, salary_amount):
+        """Выплата зарплаты salary_amount копеек по правилам pay_salary"""
+        if salary_amount <= 0:
+            return transfer_engine.INVALID_AMOUNT
+        sender_id, recipient_id = int(sender_id), int(recipient_id)
+        with self._lock:
+            sender, recipient = self._account(sender_id), self._account(recipient_id)
+            if sender is None or recipient is None or sender.client_type is None or recipient.client_type is None:
+                return transfer_engine.NOT_FOUND
+
+            tax, message = transfer_engine.salary_tax(sender.client_type, recipient.client_type, salary_amount)
+            if tax is None:
+                return message
+
+            if sender.balance < salary_amount + tax:
+                return message
+            self._append(TRANSFER, sender_id, recipient_id, salary_amount, tax)
+        return transfer_engine.SUCCESS
+
+    def deposit(self, account_id, amount):
+        """Пополнение счета на amount копеек по правилам deposit_money"""
+        if amount <= 0:
+            return transfer_engine.INVALID_AMOUNT
+        account_id = int(account_id)
+        with self._lock:
+            account = self._account(account_id)
+            if account is None:
+                return transfer_engine.NOT_FOUND
+            self._append(DEPOSIT, account_id, 0, amount)
+            return transfer_engine.deposit_message(account.owner_name, account.balance)
+
+    def withdrawal(self, account_id, amount):
+        """Снятие amount копеек наличными по правилам money_cash"""
+        account_id = int(account_id)
+        with self._lock:
+            account = self._account(account_id)
+            if account is None:
+                return transfer_engine.NOT_FOUND
+
+            message = transfer_engine.withdrawal_error(account.account_type, account.client_type, amount)
+            if message is not None:
+                return message
+
+            if account.balance < amount:
+                return transfer_engine.NO_FUNDS
+            self._append(WITHDRAWAL, account_id, 0, amount)
+            return transfer_engine.withdrawal_message(amount, account.balance)
+
+    def balance(self, account_id):
+        """Баланс счета в копейках или None, если счета нет"""
+        with self._lock:
+            account = self._account(int(account_id))
+            return None if account is None else account.balance
+
+
+ledger = None
+
+
+def start(log_dir=LOG_DIR, **options):
+    """Запускает движок модуля; options - параметры MemoryLedger"""
+    global ledger
+    ledger = MemoryLedger(log_dir, **options).start()
+    return ledger
+
+
+def stop():
+    """Переносит операции в БД и останавливает движок модуля"""
+    global ledger
+    ledger.stop()
+    ledger = None
+
+
+def deposit_money(client_id, amount):
+    """Пополнение счета (сумма в рублях)"""
+    return ledger.deposit(client_id, money.to_minor(amount))
+
+
+def pay_salary(sender_id, recipient_id, salary_amount, principal=None):
+    """Выплата зарплаты (сумма в рублях)"""
+    if principal is not None and not principal.owns(sender_id):
+        return transfer_engine.ACCESS_DENIED
+    return ledger.salary(sender_id, recipient_id, money.to_minor(salary_amount))
+
+
+def make_transfer(sender_id, recipient_id, amount, principal=None):
+    """Перевод между клиентами (сумма в рублях)"""
+    if principal is not None and not principal.owns(sender_id):
+        return transfer_engine.ACCESS_DENIED
+    return ledger.transfer(sender_id, recipient_id, money.to_minor(amount))
+
+
+def withdraw_money(account_id, amount, principal=None):
+    """Снятие наличных (сумма в рублях)"""
+    try:
+        amount_minor = money.to_minor(amount)
+    except ValueError:
+        return transfer_engine.INVALID_AMOUNT
+    if principal is not None and not principal.owns(account_id):
+        return transfer_engine.ACCESS_DENIED
+    return ledger.withdrawal(account_id, amount_minor)
+
+
+def view_balance(account_id):
+    """Просмотр баланса (в рублях)"""
+    return money.from_minor(ledger.balance(account_id))
@@ -0,0 +1,208 @@
+"""
+Версионные миграции схемы БД.
+
+Текущая версия схемы хранится в таблице schema_version. Каждая миграция - функция, которая получает курсор и
+изменяет схему; миграции применяются по порядку, каждая в своей транзакции вместе с записью новой версии.
+Новые миграции добавляются в конец списка MIGRATIONS с очередным номером.
+"""
+from database import get_pool
+
+
+def add_client_login_indexes(cursor):
+    """Уникальные индексы по почте и телефону клиента для входа в личный кабинет"""
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_clients_email ON clients (email)')
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_clients_phone ON clients (phone)')
+
+
+def add_account_client_index(cursor):
+    """Индекс для поиска счетов клиента по типу счета"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_accounts_client_type ON accounts (client_id, account_type)')
+
+
+def add_transaction_history_indexes(cursor):
+    """Индексы для выборки истории операций счета по времени"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_sender_ts ON transactions (sender_id, timestamp)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_recipient_ts '
+                   'ON transactions (recipient_id, timestamp)')
+
+
+def add_fee_ledger(cursor):
+    """Журнал начисленных, но еще не зачисленных на счет банка комиссий"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS fee_ledger (
+            id INTEGER PRIMARY KEY,
+            transaction_id INTEGER,
+            amount REAL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (transaction_id) REFERENCES transactions (id)
+        )
+    ''')
+
+
+def convert_money_to_kopecks(cursor):
+    """Перевод балансов и сумм из REAL (рубли) в INTEGER (копейки)"""
+    # SQLite не умеет менять тип столбца, поэтому таблицы пересоздаются с копированием данных
+    cursor.execute('''
+        CREATE TABLE accounts_new (
+            id INTEGER PRIMARY KEY,
+            client_id INTEGER,
+            account_type TEXT,
+            owner_name TEXT,
+            is_legal_entity BOOLEAN,
+            balance INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (client_id) REFERENCES clients (id)
+        )
+    ''')
+    cursor.execute('INSERT INTO accounts_new SELECT id, client_id, account_type, owner_name, is_legal_entity, '
+                   'CAST(ROUND(COALESCE(balance, 0) * 100) AS INTEGER) FROM accounts')
+    cursor.execute('DROP TABLE accounts')
+    cursor.execute('ALTER TABLE accounts_new RENAME TO accounts')
+    add_account_client_index(cursor)
+
+    cursor.execute('''
+        CREATE TABLE transactions_new (
+            id INTEGER PRIMARY KEY,
+            sender_id INTEGER,
+            recipient_id INTEGER,
+            amount INTEGER,
+            transfer_fee INTEGER,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (sender_id) REFERENCES accounts (id),
+            FOREIGN KEY (recipient_id) REFERENCES accounts (id)
+        )
+    ''')
+    cursor.execute('INSERT INTO transactions_new SELECT id, sender_id, recipient_id, '
+                   'CAST(ROUND(amount * 100) AS INTEGER), CAST(ROUND(COALESCE(transfer_fee, 0) * 100) AS INTEGER), '
+                   'timestamp FROM transactions')
+    cursor.execute('DROP TABLE transactions')
+    cursor.execute('ALTER TABLE transactions_new RENAME TO transactions')
+    add_transaction_history_indexes(cursor)
+
+    cursor.execute('''
+        CREATE TABLE fee_ledger_new (
+            id INTEGER PRIMARY KEY,
+            transaction_id INTEGER,
+            amount INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (transaction_id) REFERENCES transactions (id)
+        )
+    ''')
+    cursor.execute('INSERT INTO fee_ledger_new SELECT id, transaction_id, CAST(ROUND(amount * 100) AS INTEGER), '
+                   'created_at FROM fee_ledger')
+    cursor.execute('DROP TABLE fee_ledger')
+    cursor.execute('ALTER TABLE fee_ledger_new RENAME TO fee_ledger')
+
+
+def add_balance_snapshots(cursor):
+    """Ежедневные снимки балансов счетов и индекс операций по времени для их построения"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS balance_snapshots (
+            account_id INTEGER,
+            day TEXT,
+            balance INTEGER NOT NULL,
+            PRIMARY KEY (account_id, day),
+            FOREIGN KEY (account_id) REFERENCES accounts (id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_ts ON transactions (timestamp)')
+
+
+def add_ledger_checkpoint(cursor):
+    """Номер последней операции журнала memory_ledger, перенесенной в БД"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ledger_checkpoint (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            seq INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute('INSERT OR IGNORE INTO ledger_checkpoint (id, seq) VALUES (1, 0)')
+
+
+def add_balance_checkpoint(cursor):
+    """Исходные балансы для сверки с журналом: балансы счетов на момент миграции и последняя транзакция до нее"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS balance_checkpoint (
+            account_id INTEGER PRIMARY KEY,
+            balance INTEGER NOT NULL,
+            FOREIGN KEY (account_id) REFERENCES accounts (id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS balance_checkpoint_seq (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            transaction_id INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute('INSERT OR REPLACE INTO balance_checkpoint (account_id, balance) SELECT id, balance FROM accounts')
+    # Комиссии, еще не перенесенные на счет банка (id 2), уже входят в его баланс
+    cursor.execute('UPDATE balance_checkpoint SET balance = balance + '
+                   '(SELECT COALESCE(SUM(amount), 0) FROM fee_ledger) WHERE account_id = 2')
+    cursor.execute('INSERT OR REPLACE INTO balance_checkpoint_seq (id, transaction_id) '
+                   'SELECT 1, COALESCE(MAX(id), 0) FROM transactions')
+
+
+def make_transactions_append_only(cursor):
+    """Журнал transactions только дополняется: id строки - ее номер в журнале, изменять и удалять строки нельзя"""
+    for event in ('UPDATE', 'DELETE'):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS transactions_append_only_{event.lower()} BEFORE {event} ON transactions
+            BEGIN
+                SELECT RAISE(ABORT, 'Журнал transactions только дополняется');
+            END
+        ''')
+
+
+def add_account_versions(cursor):
+    """
+    Версия счета для compare-and-swap: растет при каждом изменении баланса.
+
+    Каждый UPDATE баланса сам увеличивает version в том же запросе (без триггера, который делал бы второй UPDATE).
+    """
+    cursor.execute('ALTER TABLE accounts ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+
+
+MIGRATIONS = [
+    (1, add_client_login_indexes),
+    (2, add_account_client_index),
+    (3, add_transaction_history_indexes),
+    (4, add_fee_ledger),
+    (5, convert_money_to_kopecks),
+    (6, add_balance_snapshots),
+    (7, add_ledger_checkpoint),
+    (8, add_balance_checkpoint),
+    (9, make_transactions_append_only),
+    (10, add_account_versions),
+]
+
+
+def current_version(cursor):
+    """Возвращает номер последней примененной миграции (0, если миграций еще не было)"""
+    cursor.execute('CREATE TABLE IF NOT EXISTS schema_version (version INTEGER PRIMARY KEY, description TEXT, '
+                   'applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)')
+    cursor.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version')
+    return cursor.fetchone()[0]
+
+
+def migrate(target=None, pool=None):
+    """
+    Применяет все еще не примененные миграции до версии target (по умолчанию - до последней).
+
+    pool - пул соединений мигрируемой БД (по умолчанию общий пул, см. database.get_pool).
+
+    Returns:
+        list: Номера примененных миграций.
+    """
+    pool = pool or get_pool()
+    applied = []
+    for version, migration in MIGRATIONS:
+        if target is not None and version > target:
+            break
+        with pool.connection(immediate=True) as conn:
+            cursor = conn.cursor()
+            if version <= current_version(cursor):
+                continue
+            migration(cursor)
+            cursor.execute('INSERT INTO schema_version (version, description) VALUES (?, ?)',
+                           (version, migration.__doc__))
+            applied.append(version)
+    return applied
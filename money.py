@@ -0,0 +1,85 @@
+"""
+Денежные суммы в копейках.
+
+Балансы и суммы в БД хранятся целым числом копеек (int64). Пользователь вводит и видит рубли, перевод между
+рублями и копейками выполняют to_minor и from_minor. Комиссии и налоги задаются в базисных пунктах (1% = 100)
+и считаются целочисленно с округлением половины копейки вверх.
+
+Функции расчета комиссий используют только арифметику и сравнения, поэтому одинаково работают и с одной суммой,
+и с массивом NumPy int64 - так комиссии для целой пачки считаются одним векторным вызовом.
+"""
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+try:
+    import numpy as np
+except ImportError:  # NumPy нужен только для векторных расчетов
+    np = None
+
+KOPECKS_IN_RUBLE = 100
+BASIS_POINTS = 10000  # 100%
+
+INDIVIDUAL_FEE_THRESHOLD = 100000 * KOPECKS_IN_RUBLE  # Переводы между физ. лицами свыше этой суммы с комиссией
+INDIVIDUAL_FEE_BP = 100  # Комиссия 1% для переводов между физическими лицами
+LEGAL_TAX_BP = 2000  # Налог 20% на переводы юридическим лицам
+SALARY_TAX_BP = 4200  # Налог 42% на выплату зарплаты
+WITHDRAWAL_LIMIT_INDIVIDUAL = 1000000 * KOPECKS_IN_RUBLE  # Лимит снятия наличных для физических лиц
+
+
+def to_minor(amount):
+    """
+    Переводит сумму в рублях (число или строку) в целое число копеек.
+
+    Raises:
+        ValueError: Если сумма не является числом.
+    """
+    try:
+        rubles = Decimal(str(amount).strip())
+    except InvalidOperation:
+        raise ValueError(f'Некорректная сумма: {amount!r}') from None
+    if not rubles.is_finite():
+        raise ValueError(f'Некорректная сумма: {amount!r}')
+    return int((rubles * KOPECKS_IN_RUBLE).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_minor(minor):
+    """Переводит копейки в рубли для вывода пользователю"""
+    return minor / KOPECKS_IN_RUBLE
+
+
+def percent(amount, rate_bp):
+    """Процент от суммы в копейках с округлением половины копейки вверх (сумма или массив int64)"""
+    return (amount * rate_bp + BASIS_POINTS // 2) // BASIS_POINTS
+
+
+def individual_fee(amount):
+    """Комиссия за перевод между физическими лицами: 1% для сумм свыше 100 000 рублей"""
+    return (amount > INDIVIDUAL_FEE_THRESHOLD) * percent(amount, INDIVIDUAL_FEE_BP)
+
+
+def legal_tax(amount):
+    """Налог 20% на перевод юридическому лицу"""
+    return percent(amount, LEGAL_TAX_BP)
+
+
+def salary_tax(amount):
+    """Налог 42% на выплату зарплаты"""
+    return percent(amount, SALARY_TAX_BP)
+
+
+def as_array(amounts):
+    """Преобразует последовательность сумм в копейках в массив int64 (если NumPy установлен) или список"""
+    if np is not None:
+        return np.asarray(amounts, dtype=np.int64)
+    return list(amounts)
+
+
+def apply_batch(fee_function, amounts):
+    """
+    Считает комиссию fee_function для каждой суммы пачки.
+
+    С NumPy выполняется один векторный вызов над массивом int64, без NumPy - поэлементно. Возвращает список int.
+    """
+    amounts = as_array(amounts)
+    if np is not None:
+        return fee_function(amounts).tolist()
+    return [int(fee_function(amount)) for amount in amounts]
@@ -0,0 +1,48 @@
+"""
+Оптимистичная запись балансов: compare-and-swap по версии счета с ограниченным числом повторов.
+
+У каждого счета есть версия (accounts.version), которая растет при каждом изменении баланса. Нужна вызывающему
+коду, который читает счет вне транзакции на запись (например, показывает баланс и ждет подтверждения), считает
+новый баланс и записывает его через transfer_engine.compare_and_swap (apply_deposit с account) только если
+версия не изменилась. Если счет успела изменить другая операция, попытка ничего не меняет и возвращает
+transfer_engine.CONFLICT; retry повторяет ее с экспоненциальной задержкой со случайным разбросом (full jitter),
+чтобы одновременные писатели не сталкивались снова в тот же момент. Каждый конфликт учитывается в
+instrumentation (счетчик conflicts операции).
+
+Операции main_bank_system повторы не используют: пополнение читает счет и пишет compare-and-swap в одной транзакции
+BEGIN IMMEDIATE, а переводы, зарплата и снятие меняют баланс относительным UPDATE с проверкой остатка в том же
+запросе. Конфликтов и потерянных обновлений у них нет; версию каждый такой UPDATE увеличивает сам.
+"""
+import random
+import time
+
+import instrumentation
+from transfer_engine import CONFLICT
+
+RETRIES = 10
+BACKOFF = 0.001  # секунд, задержка перед первым повтором
+MAX_BACKOFF = 0.05  # секунд
+
+
+def retry(attempt, retries=RETRIES, backoff=BACKOFF, max_backoff=MAX_BACKOFF):
+    """
+    Выполняет attempt(), пока она возвращает CONFLICT, но не больше retries повторов.
+
+    Args:
+        attempt: Функция без аргументов - одна попытка операции (чтение и compare-and-swap).
+        retries (int): Наибольшее число повторов после первой попытки.
+        backoff (float): Задержка перед первым повтором в секундах; каждая следующая вдвое больше.
+        max_backoff (float): Наибольшая задержка в секундах.
+
+    Returns:
+        Результат attempt() или CONFLICT, если счет так и не удалось изменить.
+    """
+    for number in range(retries + 1):
+        result = attempt()
+        if result != CONFLICT:
+            return result
+        if instrumentation.enabled:
+            instrumentation.conflict()
+        if number < retries:
+            time.sleep(random.uniform(0, min(max_backoff, backoff * 2 ** number)))
+    return CONFLICT
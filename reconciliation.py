@@ -0,0 +1,248 @@
+"""
+Сверка балансов счетов с журналом transactions.
+
+Ожидаемый баланс счета - исходный баланс из balance_checkpoint (0 для счетов, открытых позже) плюс входящие и минус
+исходящие с комиссией суммы транзакций с id больше balance_checkpoint_seq. Счет банка (BANK_ACCOUNT_ID) получает
+еще все комиссии и налоги, а его фактический баланс - accounts.balance плюс не перенесенные комиссии fee_ledger
+(см. fees.bank_balance). Расхождение (drift) = фактический баланс - ожидаемый.
+
+Журнал читается потоком по диапазону id кусками по chunk_size строк. Если установлен NumPy, кусок превращается
+в массив int64 и суммируется по счетам через np.bincount (веса считаются в float64, что точно, пока сумма одного
+счета в куске меньше 2**53 копеек); без NumPy каждый кусок суммирует сам SQLite (GROUP BY). Память - O(число
+счетов) на суммы и O(chunk_size) на кусок, от длины журнала не зависит. С workers > 1 диапазон id делится между
+процессами, каждый открывает свое соединение только на чтение, родитель складывает суммы.
+
+Балансы и граница журнала читаются в одной транзакции чтения, поэтому сверка согласована и при идущих переводах.
+
+Запуск:
+    python reconciliation.py --db bank.db --workers 4 --output drift.csv
+"""
+import argparse
+import csv
+import heapq
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import database
+import money
+from transfer_engine import BANK_ACCOUNT_ID
+
+try:
+    import numpy as np
+except ImportError:  # Без NumPy куски суммирует SQLite
+    np = None
+
+CHUNK_SIZE = 100000
+REPORT_LIMIT = 20  # Сколько наибольших расхождений включать в отчет
+DRIFT_FIELDS = ('account_id', 'expected', 'actual', 'drift')
+
+
+def id_ranges(first, last, parts):
+    """Делит полуинтервал id (first, last] на parts полуинтервалов"""
+    step = max(1, -(-(last - first) // parts))
+    return [(start, min(start + step, last)) for start in range(first, last, step)]
+
+
+def aggregate_chunk_numpy(rows, flows):
+    """Добавляет кусок журнала к массиву flows; возвращает сумму комиссий куска"""
+    data = np.array(rows, dtype=np.int64)
+    senders, recipients, amounts, fees = data[:, 0], data[:, 1], data[:, 2], data[:, 3]
+    size = len(flows)
+    flows += np.rint(np.bincount(recipients, weights=amounts, minlength=size)).astype(np.int64)
+    flows -= np.rint(np.bincount(senders, weights=amounts + fees, minlength=size)).astype(np.int64)
+    return int(fees.sum())
+
+
+def aggregate_numpy(cursor, first, last, size, chunk_size):
+    flows = np.zeros(size, dtype=np.int64)
+    fees = rows_count = 0
+    cursor.execute('SELECT COALESCE(sender_id, 0), COALESCE(recipient_id, 0), amount, COALESCE(transfer_fee, 0) '
+                   'FROM transactions WHERE id > ? AND id <= ?', (first, last))
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        fees += aggregate_chunk_numpy(rows, flows)
+        rows_count += len(rows)
+    return flows, fees, rows_count
+
+
+def aggregate_sql(cursor, first, last, size, chunk_size):
+    flows = {}
+    fees = rows_count = 0
+    for start, end in id_ranges(first, last, max(1, -(-(last - first) // chunk_size))):
+        cursor.execute('SELECT sender_id, SUM(amount + COALESCE(transfer_fee, 0)) FROM transactions '
+                       'WHERE id > ? AND id <= ? GROUP BY sender_id', (start, end))
+        for account_id, amount in cursor.fetchall():
+            flows[account_id] = flows.get(account_id, 0) - amount
+        cursor.execute('SELECT recipient_id, SUM(amount), COUNT(*) FROM transactions '
+                       'WHERE id > ? AND id <= ? GROUP BY recipient_id', (start, end))
+        for account_id, amount, count in cursor.fetchall():
+            flows[account_id] = flows.get(account_id, 0) + amount
+            rows_count += count
+        cursor.execute('SELECT COALESCE(SUM(transfer_fee), 0) FROM transactions WHERE id > ? AND id <= ?',
+                       (start, end))
+        fees += cursor.fetchone()[0]
+    return flows, fees, rows_count
+
+
+def aggregate(cursor, first, last, size, chunk_size=CHUNK_SIZE):
+    """
+    Суммирует движение денег по счетам для транзакций с id в (first, last].
+
+    Returns:
+        tuple: (суммы по счетам - массив NumPy длины size или словарь, сумма комиссий, число транзакций).
+    """
+    if np is not None:
+        return aggregate_numpy(cursor, first, last, size, chunk_size)
+    return aggregate_sql(cursor, first, last, size, chunk_size)
+
+
+def aggregate_range(database_path, first, last, size, chunk_size):
+    """aggregate в отдельном процессе через собственное соединение только на чтение"""
+    pool = database.ConnectionPool(database_path, size=1, read_only=True)
+    try:
+        with pool.connection() as conn:
+            return aggregate(conn.cursor(), first, last, size, chunk_size)
+    finally:
+        pool.close()
+
+
+def merge(total, part):
+    """Складывает суммы по счетам двух частей журнала"""
+    if np is not None:
+        total += part
+        return total
+    for account_id, amount in part.items():
+        total[account_id] = total.get(account_id, 0) + amount
+    return total
+
+
+def flow_of(flows, account_id):
+    if np is not None:
+        return int(flows[account_id])
+    return flows.get(account_id, 0)
+
+
+def reconcile(workers=1, chunk_size=CHUNK_SIZE, output=None, limit=REPORT_LIMIT):
+    """
+    Сверяет балансы всех счетов с журналом в БД текущего пула.
+
+    Args:
+        workers (int): Процессов для чтения журнала (1 - в текущем процессе).
+        chunk_size (int): Строк журнала в одном куске.
+        output (str): CSV-файл для всех расхождений (account_id, expected, actual, drift в рублях).
+        limit (int): Сколько наибольших по модулю расхождений вернуть в отчете.
+
+    Returns:
+        dict: accounts, transactions, drifted (счетов с расхождением), total_drift и bank_drift (в рублях),
+        largest - список (account_id, expected, actual, drift) в рублях, seconds.
+    """
+    started = time.perf_counter()
+    pool = database.get_read_pool()
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        # Граница журнала, балансы и комиссии читаются из одного снимка БД
+        cursor.execute('BEGIN')
+        cursor.execute('SELECT COALESCE((SELECT transaction_id FROM balance_checkpoint_seq WHERE id = 1), 0), '
+                       'COALESCE((SELECT MAX(id) FROM transactions), 0)')
+        first, last = cursor.fetchone()
+        cursor.execute('SELECT MAX(COALESCE((SELECT MAX(id) FROM accounts), 0), '
+                       'COALESCE((SELECT MAX(sender_id) FROM transactions), 0), '
+                       'COALESCE((SELECT MAX(recipient_id) FROM transactions), 0))')
+        size = cursor.fetchone()[0] + 1
+
+        ranges = id_ranges(first, last, workers) if last > first else []
+        if workers > 1 and len(ranges) > 1:
+            with ProcessPoolExecutor(len(ranges)) as executor:
+                parts = list(executor.map(aggregate_range, [pool.database] * len(ranges),
+                                          [start for start, _ in ranges], [end for _, end in ranges],
+                                          [size] * len(ranges), [chunk_size] * len(ranges)))
+        else:
+            parts = [aggregate(cursor, first, last, size, chunk_size)]
+        flows, fees, transactions = parts[0]
+        for part_flows, part_fees, part_transactions in parts[1:]:
+            flows = merge(flows, part_flows)
+            fees += part_fees
+            transactions += part_transactions
+
+        cursor.execute('SELECT COALESCE(SUM(amount), 0) FROM fee_ledger')
+        pending_fees = cursor.fetchone()[0]
+        report = compare(cursor, flows, fees, pending_fees, chunk_size, output, limit)
+        conn.rollback()
+
+    report['transactions'] = transactions
+    report['seconds'] = time.perf_counter() - started
+    return report
+
+
+def compare(cursor, flows, fees, pending_fees, chunk_size, output, limit):
+    """Сравнивает фактические балансы с ожидаемыми, читая счета кусками"""
+    accounts = drifted = total_drift = bank_drift = 0
+    largest = []
+    writer = None
+    file = open(output, 'w', encoding='utf-8', newline='') if output else None
+    try:
+        if file is not None:
+            writer = csv.writer(file)
+            writer.writerow(DRIFT_FIELDS)
+        cursor.execute('SELECT a.id, a.balance, COALESCE(c.balance, 0) FROM accounts a '
+                       'LEFT JOIN balance_checkpoint c ON c.account_id = a.id ORDER BY a.id')
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            accounts += len(rows)
+            for account_id, actual, expected in rows:
+                expected += flow_of(flows, account_id)
+                if account_id == BANK_ACCOUNT_ID:
+                    expected += fees
+                    actual += pending_fees
+                drift = actual - expected
+                if not drift:
+                    continue
+                drifted += 1
+                total_drift += drift
+                if account_id == BANK_ACCOUNT_ID:
+                    bank_drift = drift
+                entry = (account_id, money.from_minor(expected), money.from_minor(actual), money.from_minor(drift))
+                if writer is not None:
+                    writer.writerow(entry)
+                if len(largest) < limit:
+                    heapq.heappush(largest, (abs(drift), entry))
+                elif limit:
+                    heapq.heappushpop(largest, (abs(drift), entry))
+    finally:
+        if file is not None:
+            file.close()
+
+    return {
+        'accounts': accounts,
+        'drifted': drifted,
+        'total_drift': money.from_minor(total_drift),
+        'bank_drift': money.from_minor(bank_drift),
+        'largest': [entry for _, entry in sorted(largest, reverse=True)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--db', default=database.DATABASE_PATH)
+    parser.add_argument('--workers', type=int, default=1, help='Процессов для чтения журнала')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--output', help='CSV-файл для всех расхождений')
+    args = parser.parse_args()
+
+    database.configure_pool(args.db, size=1, read_size=1)
+    report = reconcile(args.workers, args.chunk_size, args.output)
+    database.close_pool()
+    print(f"Счетов {report['accounts']}, транзакций {report['transactions']} за {report['seconds']:.1f} с "
+          f"({'NumPy' if np is not None else 'SQLite'})")
+    print(f"Счетов с расхождением: {report['drifted']}, сумма расхождений {report['total_drift']}, "
+          f"счет банка {report['bank_drift']}")
+    for account_id, expected, actual, drift in report['largest']:
+        print(f'  счет {account_id}: ожидается {expected}, на счете {actual}, расхождение {drift}')
+
+
+if __name__ == '__main__':
+    main()
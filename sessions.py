@@ -0,0 +1,147 @@
+"""
+Сессии клиентов.
+
+Успешный вход выдает случайный токен, привязанный к компактному описанию клиента (Principal): id, тип, счета
+с их типами и лимит снятия. Денежные операции main_bank_system принимают principal= и берут тип клиента и
+проверку владения счетом из памяти, не запрашивая clients и accounts на каждое действие.
+
+Сессия живет SESSION_TTL секунд с момента входа. Данные сессии не обновляются сами: после изменения счетов или
+данных клиента вызывается refresh(token).
+"""
+import hashlib
+import secrets
+import threading
+import time
+
+import instrumentation
+import transfer_engine
+from database import db_read_connection
+
+SESSION_TTL = 15 * 60  # секунд
+
+
+class Principal:
+    """Клиент сессии"""
+
+    __slots__ = ('client_id', 'client_type', 'full_name', 'accounts', 'withdrawal_limit', 'expires_at')
+
+    def __init__(self, client_id, client_type, full_name, accounts):
+        self.client_id = client_id
+        self.client_type = client_type
+        self.full_name = full_name
+        self.accounts = accounts  # id счета -> тип счета
+        self.withdrawal_limit = transfer_engine.withdrawal_limit(client_type)
+        self.expires_at = None
+
+    def owns(self, account_id):
+        """Проверяет, что счет принадлежит клиенту"""
+        return int(account_id) in self.accounts
+
+
+class SessionStore:
+    """Потокобезопасное хранилище сессий: токен -> Principal"""
+
+    def __init__(self, ttl=SESSION_TTL):
+        self.ttl = ttl
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def create(self, principal):
+        """Открывает сессию и возвращает ее токен"""
+        token = secrets.token_urlsafe(32)
+        principal.expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            self._sessions[token] = principal
+        return token
+
+    def get(self, token):
+        """Возвращает клиента сессии или None, если токен неизвестен или сессия истекла"""
+        with self._lock:
+            principal = self._sessions.get(token)
+            if principal is not None and principal.expires_at < time.monotonic():
+                del self._sessions[token]
+                principal = None
+            return principal
+
+    def replace(self, token, principal):
+        """Заменяет данные клиента действующей сессии, не продлевая ее"""
+        with self._lock:
+            current = self._sessions.get(token)
+            if current is None:
+                return False
+            principal.expires_at = current.expires_at
+            self._sessions[token] = principal
+            return True
+
+    def revoke(self, token):
+        """Закрывает сессию"""
+        with self._lock:
+            self._sessions.pop(token, None)
+
+    def purge(self):
+        """Удаляет истекшие сессии и возвращает их количество"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [token for token, principal in self._sessions.items() if principal.expires_at < now]
+            for token in expired:
+                del self._sessions[token]
+        return len(expired)
+
+
+store = SessionStore()
+
+
+def find_client(cursor, email_or_phone):
+    """Ищет клиента по почте или телефону (по индексам idx_clients_email и idx_clients_phone)"""
+    cursor.execute('SELECT id, type, full_name, password FROM clients WHERE (email = ? OR phone = ?)'
+                   , (email_or_phone, email_or_phone))
+    return cursor.fetchone()
+
+
+def load_principal(cursor, client_id, client_type, full_name):
+    """Собирает Principal клиента: читает его счета одним запросом"""
+    cursor.execute('SELECT id, account_type FROM accounts WHERE client_id = ?', (client_id,))
+    return Principal(client_id, client_type, full_name, dict(cursor.fetchall()))
+
+
+def open_session(client_id, client_type, full_name):
+    """Открывает сессию для клиента, уже прошедшего проверку пароля, и возвращает токен"""
+    with db_read_connection() as (conn, cursor):
+        principal = load_principal(cursor, client_id, client_type, full_name)
+    return store.create(principal)
+
+
+@instrumentation.operation('authenticate')
+def authenticate(email_or_phone, password):
+    """
+    Проверяет почту или телефон и пароль без интерактивного ввода.
+
+    Returns:
+        str: Токен новой сессии или None, если клиент не найден или пароль неверный.
+    """
+    with db_read_connection() as (conn, cursor):
+        user_data = find_client(cursor, email_or_phone)
+        if user_data is None:
+            return None
+        client_id, client_type, full_name, stored_password = user_data
+        if hashlib.sha256(password.encode()).hexdigest() != stored_password:
+            return None
+        principal = load_principal(cursor, client_id, client_type, full_name)
+    return store.create(principal)
+
+
+def refresh(token):
+    """
+    Перечитывает данные клиента сессии (например, после открытия нового счета).
+
+    Returns:
+        Principal: Обновленный клиент или None, если сессия истекла.
+    """
+    principal = store.get(token)
+    if principal is None:
+        return None
+    with db_read_connection() as (conn, cursor):
+        cursor.execute('SELECT type, full_name FROM clients WHERE id = ?', (principal.client_id,))
+        client_type, full_name = cursor.fetchone()
+        principal = load_principal(cursor, principal.client_id, client_type, full_name)
+    return principal if store.replace(token, principal) else None
@@ -0,0 +1,632 @@
+"""
+Горизонтальное разбиение (шардирование) клиентов, счетов и транзакций по нескольким файлам SQLite.
+
+Хранилище - каталог с файлами shard_0.db ... shard_{N-1}.db и справочником directory.db. Шард - обычная БД банка
+(database._create_tables и migrations). Клиент и все его счета живут в одном шарде: client_id % N. Справочник хранит
+шард каждого клиента и счета (client_directory, account_directory) и выдает id новым клиентам и счетам, поэтому id
+уникальны во всех шардах. Шард счета не меняется, поэтому маршрут кэшируется в памяти процесса.
+
+Операции одного счета (пополнение, снятие, баланс) и переводы внутри шарда выполняются функциями transfer_engine
+на соединении своего шарда и блокируют на запись только его файл, поэтому записи в разные шарды идут параллельно.
+
+Перевод и зарплата между шардами проходят локальный двухфазный коммит с журналом восстановления:
+    1. prepare получателя: строка CREDIT в prepared_transfers его шарда;
+    2. prepare отправителя: списание суммы с комиссией (если хватает средств) и строка DEBIT - средства
+       зарезервированы. Если средств нет, prepare получателя откатывается;
+    3. решение: xid перевода записывается в twophase_log справочника - с этого момента перевод совершен;
+    4. commit в шарде отправителя: строка transactions и комиссия в fee_ledger; в шарде получателя: зачисление и
+       строка transactions с комиссией 0 (комиссию учитывает шард отправителя). Строки prepared_transfers удаляются;
+    5. xid удаляется из twophase_log.
+Если шаг 4 или 5 не удался, перевод все равно успешен: решение записано, и recover доведет его до конца.
+Каждый шаг - транзакция одного файла, блокировки двух шардов одновременно не держатся. recover() доводит
+прерванные переводы: строки prepared_transfers с xid из twophase_log фиксируются, остальные откатываются
+(presumed abort). Перевод между шардами от prepare до удаления решения держит разделяемую блокировку файла
+recovery.lock в каталоге хранилища, а recover - исключительную: он ждет переводов, идущих в любом процессе, и не
+пускает новые, поэтому не откатывает перевод, решение о котором еще не записано. commit в шарде без строк
+prepared_transfers - ошибка, а не успех: перевод, который откатили, не может вернуть SUCCESS.
+
+Комиссии копятся в fee_ledger шарда отправителя: журнал каждого шарда сходится с балансами его счетов (см.
+reconciliation), а баланс счета банка - его баланс плюс fee_ledger всех шардов. settle_fees() переносит их на
+счет банка: в шарде банка - как fees.settle_fees, из остальных шардов - тем же двухфазным коммитом. prepare
+шарда-источника (FEES) забирает записи fee_ledger, commit шарда банка (SETTLE) зачисляет сумму и пишет строку
+transactions без отправителя, поэтому журналы обоих шардов по-прежнему сходятся с балансами.
+
+Функции модуля повторяют имена и аргументы main_bank_system и работают с хранилищем, открытым через start():
+    sharding.start('bank_shards')
+    print(sharding.make_transfer(1, 3, 100))
+    sharding.stop()
+
+Перенос существующей bank.db в 4 шарда:
+    python sharding.py reshard bank.db bank_shards --shards 4
+
+Перенос комиссий всех шардов на счет банка:
+    python sharding.py settle-fees bank_shards
+"""
+import argparse
+import os
+import time
+import uuid
+from contextlib import contextmanager
+
+import Client
+import database
+import fees
+import migrations
+import money
+import transfer_engine
+from balance_cache import invalidate_on_commit
+from client_importer import DUPLICATE_EMAIL, DUPLICATE_PHONE
+from data_generator import ACCOUNT_COLUMNS, CLIENT_COLUMNS, TRANSACTION_COLUMNS, chunked, insert_sql
+from database import ConnectionPool
+from transfer_engine import BANK_ACCOUNT_ID
+
+DIRECTORY_FILE = 'directory.db'
+LOCK_FILE = 'recovery.lock'
+LOCK_TIMEOUT = 30000  # миллисекунд ожидания блокировки восстановления
+SHARDS = 4
+POOL_SIZE = 4
+CHUNK_SIZE = 10000  # Строк в одной транзакции переноса
+JOURNAL_COLUMNS = ('id',) + TRANSACTION_COLUMNS
+
+# Роли шарда в переводе между шардами
+DEBIT = 'debit'
+CREDIT = 'credit'
+# Роли шардов в переносе комиссий одного шарда на счет банка в другом
+FEES = 'fees'
+SETTLE = 'settle'
+
+
+def shard_path(path, shard):
+    return os.path.join(path, f'shard_{shard}.db')
+
+
+def create_directory(cursor):
+    """Таблицы справочника: число шардов, шарды клиентов и счетов, журнал решений двухфазного коммита"""
+    cursor.execute('CREATE TABLE IF NOT EXISTS shard_config (id INTEGER PRIMARY KEY CHECK (id = 1), '
+                   'shards INTEGER NOT NULL)')
+    cursor.execute('CREATE TABLE IF NOT EXISTS client_directory (id INTEGER PRIMARY KEY, shard INTEGER NOT NULL, '
+                   'email TEXT, phone TEXT)')
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_client_directory_email ON client_directory (email)')
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_client_directory_phone ON client_directory (phone)')
+    cursor.execute('CREATE TABLE IF NOT EXISTS account_directory (id INTEGER PRIMARY KEY, client_id INTEGER, '
+                   'shard INTEGER NOT NULL)')
+    cursor.execute('CREATE TABLE IF NOT EXISTS twophase_log (xid TEXT PRIMARY KEY, '
+                   'decided_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)')
+
+
+def create_prepared_transfers(cursor):
+    """Подготовленные (prepare), но еще не зафиксированные части переводов между шардами"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS prepared_transfers (
+            xid TEXT NOT NULL,
+            role TEXT NOT NULL,
+            account_id INTEGER NOT NULL,
+            counterparty_id INTEGER NOT NULL,
+            amount INTEGER NOT NULL,
+            fee INTEGER NOT NULL,
+            PRIMARY KEY (xid, role)
+        )
+    ''')
+
+
+def prepare(cursor, xid, role, account_id, counterparty_id, amount, fee):
+    """
+    Первая фаза в шарде: получатель только запоминает перевод, отправитель еще и резервирует сумму с комиссией.
+
+    Returns:
+        bool: False, если у отправителя недостаточно средств (ничего не изменено).
+    """
+    if role == DEBIT:
+        cursor.execute('UPDATE accounts SET balance = balance - ?, version = version + 1 WHERE id = ? AND balance >= ?',
+                       (amount + fee, account_id, amount + fee))
+        if cursor.rowcount == 0:
+            return False
+        invalidate_on_commit(cursor, account_id)
+    cursor.execute('INSERT INTO prepared_transfers (xid, role, account_id, counterparty_id, amount, fee) '
+                   'VALUES (?, ?, ?, ?, ?, ?)', (xid, role, account_id, counterparty_id, amount, fee))
+    return True
+
+
+def prepare_fees(cursor, xid, bank_shard):
+    """
+    Первая фаза переноса комиссий: забирает все записи fee_ledger шарда и запоминает их сумму.
+
+    Returns:
+        int: Сумма комиссий в копейках (0, если переносить нечего - ничего не изменено).
+    """
+    cursor.execute('SELECT MAX(id), COALESCE(SUM(amount), 0) FROM fee_ledger')
+    last_id, amount = cursor.fetchone()
+    if last_id is None:
+        return 0
+    cursor.execute('DELETE FROM fee_ledger WHERE id <= ?', (last_id,))
+    cursor.execute('INSERT INTO prepared_transfers (xid, role, account_id, counterparty_id, amount, fee) '
+                   'VALUES (?, ?, ?, ?, ?, 0)', (xid, FEES, BANK_ACCOUNT_ID, bank_shard, amount))
+    invalidate_on_commit(cursor, BANK_ACCOUNT_ID)
+    return amount
+
+
+def finish(cursor, xid, commit):
+    """
+    Вторая фаза в шарде: фиксирует или откатывает части перевода xid. Повторный откат ничего не делает.
+
+    Raises:
+        RuntimeError: commit=True, а частей перевода в шарде нет (перевод уже откатан или завершен).
+    """
+    cursor.execute('DELETE FROM prepared_transfers WHERE xid = ? '
+                   'RETURNING role, account_id, counterparty_id, amount, fee', (xid,))
+    rows = cursor.fetchall()
+    if commit and not rows:
+        raise RuntimeError(f'Перевод {xid} не подготовлен в шарде')
+    for role, account_id, counterparty_id, amount, fee in rows:
+        if role == DEBIT and commit:
+            cursor.execute('INSERT INTO transactions (sender_id, recipient_id, amount, transfer_fee) '
+                           'VALUES (?, ?, ?, ?)', (account_id, counterparty_id, amount, fee))
+            if fee:
+                transfer_engine.record_fee(cursor, fee, cursor.lastrowid)
+        elif role == DEBIT:
+            cursor.execute('UPDATE accounts SET balance = balance + ?, version = version + 1 WHERE id = ?',
+                           (amount + fee, account_id))
+            invalidate_on_commit(cursor, account_id)
+        elif role == FEES:
+            if not commit:
+                transfer_engine.record_fee(cursor, amount)
+        elif commit:
+            cursor.execute('UPDATE accounts SET balance = balance + ?, version = version + 1 WHERE id = ?',
+                           (amount, account_id))
+            # Комиссии другого шарда поступают на счет банка как зачисление без отправителя
+            cursor.execute('INSERT INTO transactions (sender_id, recipient_id, amount, transfer_fee) '
+                           'VALUES (?, ?, ?, 0)', (None if role == SETTLE else counterparty_id, account_id, amount))
+            invalidate_on_commit(cursor, account_id)
+
+
+class ShardedBank:
+    """Шарды, справочник и маршрутизация операций по ним"""
+
+    def __init__(self, path, shards=None, pool_size=POOL_SIZE, pragmas=None):
+        """
+        Открывает хранилище в каталоге path, создавая его при первом обращении.
+
+        Args:
+            path (str): Каталог шардов и справочника.
+            shards (int): Число шардов нового хранилища (у существующего берется из справочника).
+            pool_size (int): Соединений на запись в пуле каждого шарда.
+            pragmas (dict): PRAGMA соединений (см. database.storage_profile).
+        """
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.directory = ConnectionPool(os.path.join(path, DIRECTORY_FILE), pool_size, pragmas)
+        with self.directory.connection(immediate=True) as conn:
+            cursor = conn.cursor()
+            create_directory(cursor)
+            cursor.execute('INSERT OR IGNORE INTO shard_config (id, shards) VALUES (1, ?)', (shards or SHARDS,))
+            cursor.execute('SELECT shards FROM shard_config WHERE id = 1')
+            self.shards = cursor.fetchone()[0]
+        if shards is not None and shards != self.shards:
+            self.directory.close()
+            raise ValueError(f'Хранилище {path} уже разбито на {self.shards} шардов')
+
+        # Файл только для блокировок: в режиме DELETE чтение держит SHARED, а BEGIN EXCLUSIVE ждет всех читателей
+        self.locks = ConnectionPool(os.path.join(path, LOCK_FILE), pool_size,
+                                    {'journal_mode': 'DELETE', 'busy_timeout': LOCK_TIMEOUT})
+        with self.locks.connection() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS recovery_lock (id INTEGER PRIMARY KEY)')
+
+        self.pools = [ConnectionPool(shard_path(path, shard), pool_size, pragmas) for shard in range(self.shards)]
+        for pool in self.pools:
+            with pool.connection() as conn:
+                database._create_tables(conn.cursor())
+                create_prepared_transfers(conn.cursor())
+            migrations.migrate(pool=pool)
+        self.read_pools = [ConnectionPool(pool.database, pool_size, pool.pragmas, read_only=True)
+                           for pool in self.pools]
+        self._routes = {}
+
+    def close(self):
+        """Закрывает соединения шардов и справочника"""
+        for pool in self.read_pools + self.pools + [self.directory, self.locks]:
+            pool.close()
+
+    @contextmanager
+    def recovery_lock(self, exclusive=False):
+        """Блокировка восстановления: разделяемая - у переводов между шардами, исключительная - у recover"""
+        with self.locks.connection() as conn:
+            if exclusive:
+                conn.execute('BEGIN EXCLUSIVE')
+            else:
+                conn.execute('BEGIN')
+                conn.execute('SELECT COUNT(*) FROM recovery_lock').fetchone()
+            yield
+
+    @contextmanager
+    def connection(self, shard, immediate=False):
+        """Соединение на запись с шардом и курсор к нему"""
+        with self.pools[shard].connection(immediate) as conn:
+            yield conn, conn.cursor()
+
+    @contextmanager
+    def read_connection(self, shard):
+        """Соединение только на чтение с шардом и курсор к нему"""
+        with self.read_pools[shard].connection() as conn:
+            yield conn, conn.cursor()
+
+    def shard_of(self, account_id):
+        """Шард счета или None, если счета нет"""
+        account_id = int(account_id)
+        shard = self._routes.get(account_id)
+        if shard is None:
+            with self.directory.connection() as conn:
+                row = conn.execute('SELECT shard FROM account_directory WHERE id = ?', (account_id,)).fetchone()
+            if row is None:
+                return None
+            shard = self._routes[account_id] = row[0]
+        return shard
+
+    def register(self, client_type, email, phone, password, full_name='', company_name='', director_name=''):
+        """
+        Регистрация клиента по правилам Client.register: id клиента и счета выдает справочник, шард - id % N.
+
+        Returns:
+            tuple: (ID нового клиента или None, сообщение).
+        """
+        error = Client.registration_error(client_type, full_name, company_name, director_name, email, phone,
+                                          password)
+        if error is not None:
+            return None, error
+
+        hashed_password = Client.hash_password(password)
+        with self.directory.connection(immediate=True) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT email = ? FROM client_directory WHERE email = ? OR phone = ? LIMIT 1',
+                           (email, email, phone))
+            duplicate = cursor.fetchone()
+            if duplicate is not None:
+                return None, DUPLICATE_EMAIL if duplicate[0] else DUPLICATE_PHONE
+            cursor.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM client_directory')
+            client_id = cursor.fetchone()[0]
+            shard = client_id % self.shards
+            cursor.execute('INSERT INTO client_directory (id, shard, email, phone) VALUES (?, ?, ?, ?)',
+                           (client_id, shard, email, phone))
+            cursor.execute('INSERT INTO account_directory (client_id, shard) VALUES (?, ?)', (client_id, shard))
+            account_id = cursor.lastrowid
+
+            # Справочник фиксируется после шарда: при сбое между ними id остаются занятыми, но не выдаются дважды
+            with self.connection(shard) as (shard_conn, shard_cursor):
+                if client_type == 'individual':
+                    shard_cursor.execute(insert_sql('clients', CLIENT_COLUMNS), (
+                        client_id, transfer_engine.INDIVIDUAL, full_name, None, email, phone, hashed_password,
+                        False, None, None, None))
+                    shard_cursor.execute(insert_sql('accounts', ACCOUNT_COLUMNS),
+                                         (account_id, client_id, 'Лицевой', full_name, False, 0))
+                else:
+                    shard_cursor.execute(insert_sql('clients', CLIENT_COLUMNS), (
+                        client_id, transfer_engine.LEGAL_ENTITY, company_name, director_name, email, phone,
+                        hashed_password, True, 0.0, 0.0, 0.0))
+                    shard_cursor.execute(insert_sql('accounts', ACCOUNT_COLUMNS),
+                                         (account_id, client_id, 'Расчетный', director_name, True, 0))
+        self._routes[account_id] = shard
+        return client_id, "Регистрация успешно завершена!"
+
+    def deposit(self, account_id, amount):
+        """Пополнение счета на amount копеек в его шарде"""
+        shard = self.shard_of(account_id)
+        if shard is None:
+            return transfer_engine.NOT_FOUND
+        with self.connection(shard, immediate=True) as (conn, cursor):
+            return transfer_engine.apply_deposit(cursor, account_id, amount)
+
+    def withdrawal(self, account_id, amount, account_type=None, client_type=None):
+        """Снятие amount копеек наличными в шарде счета"""
+        shard = self.shard_of(account_id)
+        if shard is None:
+            return transfer_engine.NOT_FOUND
+        with self.connection(shard, immediate=True) as (conn, cursor):
+            return transfer_engine.apply_withdrawal(cursor, account_id, amount, account_type, client_type)
+
+    def balance(self, account_id):
+        """Баланс счета в копейках или None, если счета нет; у счета банка - вместе с комиссиями всех шардов"""
+        shard = self.shard_of(account_id)
+        if shard is None:
+            return None
+        with self.read_connection(shard) as (conn, cursor):
+            cursor.execute('SELECT balance FROM accounts WHERE id = ?', (int(account_id),))
+            balance = cursor.fetchone()[0]
+        if int(account_id) == BANK_ACCOUNT_ID:
+            for other in range(self.shards):
+                with self.read_connection(other) as (conn, cursor):
+                    balance += fees.pending_fees(cursor)
+        return balance
+
+    def transfer(self, sender_id, recipient_id, amount, sender_type=None):
+        """Перевод amount копеек по правилам make_transfer"""
+        return self._move(sender_id, recipient_id, amount, sender_type, transfer_engine.apply_transfer,
+                          transfer_engine.transfer_fee)
+
+    def salary(self, sender_id, recipient_id, salary_amount, sender_type=None):
+        """Выплата зарплаты salary_amount копеек по правилам pay_salary"""
+        return self._move(sender_id, recipient_id, salary_amount, sender_type, transfer_engine.apply_salary,
+                          transfer_engine.salary_tax)
+
+    def _move(self, sender_id, recipient_id, amount, sender_type, apply, fee_rule):
+        """Перевод внутри шарда через apply или между шардами через двухфазный коммит с комиссией по fee_rule"""
+        if amount <= 0:
+            return transfer_engine.INVALID_AMOUNT
+        sender_id, recipient_id = int(sender_id), int(recipient_id)
+        sender_shard, recipient_shard = self.shard_of(sender_id), self.shard_of(recipient_id)
+        if sender_shard is None or recipient_shard is None:
+            return transfer_engine.NOT_FOUND
+        if sender_shard == recipient_shard:
+            with self.connection(sender_shard, immediate=True) as (conn, cursor):
+                return apply(cursor, sender_id, recipient_id, amount, sender_type)
+
+        if sender_type is None:
+            with self.read_connection(sender_shard) as (conn, cursor):
+                sender_type = transfer_engine.load_client_type(cursor, sender_id)
+        with self.read_connection(recipient_shard) as (conn, cursor):
+            recipient_type = transfer_engine.load_client_type(cursor, recipient_id)
+        if sender_type is None or recipient_type is None:
+            return transfer_engine.NOT_FOUND
+
+        fee, message = fee_rule(sender_type, recipient_type, amount)
+        if fee is None:
+            return message
+
+        xid = uuid.uuid4().hex
+        with self.recovery_lock():
+            with self.connection(recipient_shard, immediate=True) as (conn, cursor):
+                prepare(cursor, xid, CREDIT, recipient_id, sender_id, amount, 0)
+            with self.connection(sender_shard, immediate=True) as (conn, cursor):
+                reserved = prepare(cursor, xid, DEBIT, sender_id, recipient_id, amount, fee)
+            if not reserved:
+                with self.connection(recipient_shard, immediate=True) as (conn, cursor):
+                    finish(cursor, xid, commit=False)
+                return message
+
+            self._commit(xid, (sender_shard, recipient_shard))
+        return transfer_engine.SUCCESS
+
+    def _commit(self, xid, shards):
+        """Записывает решение о переводе xid и фиксирует его части в шардах shards"""
+        with self.directory.connection() as conn:
+            conn.execute('INSERT INTO twophase_log (xid) VALUES (?)', (xid,))
+        try:
+            for shard in shards:
+                with self.connection(shard, immediate=True) as (conn, cursor):
+                    finish(cursor, xid, commit=True)
+            with self.directory.connection() as conn:
+                conn.execute('DELETE FROM twophase_log WHERE xid = ?', (xid,))
+        except Exception:
+            # Решение уже записано: перевод совершен, незавершенные части доведет recover
+            pass
+
+    def settle_fees(self):
+        """
+        Переносит комиссии всех шардов на счет банка (см. fees.settle_fees).
+
+        Returns:
+            int: Перенесенная сумма в копейках (0, если переносить нечего или счета банка нет).
+        """
+        bank_shard = self.shard_of(BANK_ACCOUNT_ID)
+        if bank_shard is None:
+            return 0
+        with self.connection(bank_shard, immediate=True) as (conn, cursor):
+            settled = fees.settle(cursor)
+        for shard in range(self.shards):
+            if shard == bank_shard:
+                continue
+            xid = uuid.uuid4().hex
+            with self.recovery_lock():
+                with self.connection(shard, immediate=True) as (conn, cursor):
+                    amount = prepare_fees(cursor, xid, bank_shard)
+                if not amount:
+                    continue
+                with self.connection(bank_shard, immediate=True) as (conn, cursor):
+                    prepare(cursor, xid, SETTLE, BANK_ACCOUNT_ID, shard, amount, 0)
+                self._commit(xid, (shard, bank_shard))
+            settled += amount
+        return settled
+
+    def recover(self):
+        """
+        Доводит переводы между шардами, прерванные сбоем. Держит исключительную блокировку восстановления: ждет
+        переводов, которые идут сейчас (в том числе в других процессах), и не пускает новые до конца восстановления.
+
+        Returns:
+            tuple: (число зафиксированных, число откатанных переводов).
+        """
+        with self.recovery_lock(exclusive=True):
+            with self.directory.connection() as conn:
+                committed = {xid for xid, in conn.execute('SELECT xid FROM twophase_log')}
+            finished, rolled_back = set(), set()
+            for shard in range(self.shards):
+                with self.connection(shard, immediate=True) as (conn, cursor):
+                    cursor.execute('SELECT DISTINCT xid FROM prepared_transfers')
+                    for xid, in cursor.fetchall():
+                        finish(cursor, xid, xid in committed)
+                        (finished if xid in committed else rolled_back).add(xid)
+            with self.directory.connection() as conn:
+                conn.execute('DELETE FROM twophase_log')
+        return len(finished), len(rolled_back)
+
+
+def reshard(source, path, shards=SHARDS, chunk_size=CHUNK_SIZE):
+    """
+    Переносит клиентов, счета, транзакции и не перенесенные комиссии из БД source в новое хранилище из shards шардов.
+
+    Транзакция попадает в шард отправителя и, если он другой, в шард получателя с комиссией 0 (как при переводе между
+    шардами) - с тем же id. Не перенесенные комиссии fee_ledger попадают в шард счета банка. Балансы на момент
+    переноса становятся контрольной точкой журнала каждого шарда (см. journal).
+
+    Returns:
+        dict: clients, accounts, transactions и seconds.
+    """
+    started = time.perf_counter()
+    bank = ShardedBank(path, shards)
+    source_pool = ConnectionPool(source, size=1, read_only=True)
+    counts = {'clients': 0, 'accounts': 0, 'transactions': 0}
+    try:
+        with bank.directory.connection() as conn:
+            if conn.execute('SELECT COUNT(*) FROM client_directory').fetchone()[0]:
+                raise ValueError(f'Хранилище {path} не пусто')
+
+        with source_pool.connection() as source_conn:
+            source_cursor = source_conn.cursor()
+            # Все таблицы читаются из одного снимка source
+            source_cursor.execute('BEGIN')
+            source_cursor.execute(f"SELECT {', '.join(CLIENT_COLUMNS)} FROM clients ORDER BY id")
+            for chunk in chunked(iter(source_cursor.fetchone, None), chunk_size):
+                copy_rows(bank, 'clients', CLIENT_COLUMNS, [(row[0] % bank.shards, row) for row in chunk])
+                with bank.directory.connection() as conn:
+                    conn.executemany('INSERT INTO client_directory (id, shard, email, phone) VALUES (?, ?, ?, ?)',
+                                     [(row[0], row[0] % bank.shards, row[4], row[5]) for row in chunk])
+                counts['clients'] += len(chunk)
+
+            source_cursor.execute(f"SELECT {', '.join(ACCOUNT_COLUMNS)} FROM accounts ORDER BY id")
+            routes = {}
+            for chunk in chunked(iter(source_cursor.fetchone, None), chunk_size):
+                for row in chunk:
+                    routes[row[0]] = (row[1] if row[1] is not None else row[0]) % bank.shards
+                copy_rows(bank, 'accounts', ACCOUNT_COLUMNS, [(routes[row[0]], row) for row in chunk])
+                with bank.directory.connection() as conn:
+                    conn.executemany('INSERT INTO account_directory (id, client_id, shard) VALUES (?, ?, ?)',
+                                     [(row[0], row[1], routes[row[0]]) for row in chunk])
+                counts['accounts'] += len(chunk)
+
+            source_cursor.execute(f"SELECT {', '.join(JOURNAL_COLUMNS)} FROM transactions ORDER BY id")
+            for chunk in chunked(iter(source_cursor.fetchone, None), chunk_size):
+                copy_rows(bank, 'transactions', JOURNAL_COLUMNS,
+                          [copy for row in chunk for copy in transaction_copies(row, routes)])
+                counts['transactions'] += len(chunk)
+
+            bank_shard = routes.get(BANK_ACCOUNT_ID, 0)
+            source_cursor.execute('SELECT id, transaction_id, amount FROM fee_ledger')
+            with bank.connection(bank_shard) as (conn, cursor):
+                cursor.executemany('INSERT INTO fee_ledger (id, transaction_id, amount) VALUES (?, ?, ?)',
+                                   source_cursor.fetchall())
+            source_conn.rollback()
+
+        for shard in range(bank.shards):
+            with bank.connection(shard) as (conn, cursor):
+                migrations.add_balance_checkpoint(cursor)
+    finally:
+        source_pool.close()
+        bank.close()
+
+    counts['seconds'] = time.perf_counter() - started
+    return counts
+
+
+def transaction_copies(row, routes):
+    """
+    Копии строки transactions (id, отправитель, получатель, сумма, комиссия, время) по шардам: (шард, строка).
+
+    Копия в шарде получателя - без комиссии: ее учитывает шард отправителя.
+    """
+    sender_shard, recipient_shard = routes.get(row[1]), routes.get(row[2])
+    copies = []
+    if sender_shard is not None:
+        copies.append((sender_shard, row))
+    if recipient_shard is not None and recipient_shard != sender_shard:
+        copies.append((recipient_shard, row[:4] + (0,) + row[5:]))
+    return copies
+
+
+def copy_rows(bank, table, columns, rows):
+    """Вставляет строки [(шард, строка)] в таблицу шардов, по транзакции на шард"""
+    by_shard = {}
+    for shard, row in rows:
+        by_shard.setdefault(shard, []).append(row)
+    for shard, shard_rows in by_shard.items():
+        with bank.connection(shard) as (conn, cursor):
+            cursor.executemany(insert_sql(table, columns), shard_rows)
+
+
+bank = None
+
+
+def start(path, shards=None, **options):
+    """Открывает хранилище модуля и доводит прерванные переводы между шардами; options - параметры ShardedBank"""
+    global bank
+    bank = ShardedBank(path, shards, **options)
+    bank.recover()
+    return bank
+
+
+def stop():
+    """Закрывает хранилище модуля"""
+    global bank
+    bank.close()
+    bank = None
+
+
+def deposit_money(client_id, amount):
+    """Пополнение счета (сумма в рублях)"""
+    return bank.deposit(client_id, money.to_minor(amount))
+
+
+def pay_salary(sender_id, recipient_id, salary_amount, principal=None):
+    """Выплата зарплаты (сумма в рублях)"""
+    if principal is not None and not principal.owns(sender_id):
+        return transfer_engine.ACCESS_DENIED
+    sender_type = None if principal is None else principal.client_type
+    return bank.salary(sender_id, recipient_id, money.to_minor(salary_amount), sender_type)
+
+
+def make_transfer(sender_id, recipient_id, amount, principal=None):
+    """Перевод между клиентами (сумма в рублях)"""
+    if principal is not None and not principal.owns(sender_id):
+        return transfer_engine.ACCESS_DENIED
+    sender_type = None if principal is None else principal.client_type
+    return bank.transfer(sender_id, recipient_id, money.to_minor(amount), sender_type)
+
+
+def withdraw_money(account_id, amount, principal=None):
+    """Снятие наличных (сумма в рублях)"""
+    try:
+        amount_minor = money.to_minor(amount)
+    except ValueError:
+        return transfer_engine.INVALID_AMOUNT
+    account_type = client_type = None
+    if principal is not None:
+        if not principal.owns(account_id):
+            return transfer_engine.ACCESS_DENIED
+        account_type, client_type = principal.accounts[int(account_id)], principal.client_type
+    return bank.withdrawal(account_id, amount_minor, account_type, client_type)
+
+
+def view_balance(account_id):
+    """Просмотр баланса (в рублях)"""
+    return money.from_minor(bank.balance(account_id))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    reshard_parser = subparsers.add_parser('reshard', help='Перенести bank.db в шарды')
+    reshard_parser.add_argument('source', help='Исходная БД')
+    reshard_parser.add_argument('path', help='Каталог нового хранилища')
+    reshard_parser.add_argument('--shards', type=int, default=SHARDS)
+    reshard_parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    recover_parser = subparsers.add_parser('recover', help='Довести прерванные переводы между шардами')
+    recover_parser.add_argument('path', help='Каталог хранилища')
+    settle_parser = subparsers.add_parser('settle-fees', help='Перенести комиссии всех шардов на счет банка')
+    settle_parser.add_argument('path', help='Каталог хранилища')
+    args = parser.parse_args()
+
+    if args.command == 'reshard':
+        result = reshard(args.source, args.path, args.shards, args.chunk_size)
+        print(f"Перенесено клиентов {result['clients']}, счетов {result['accounts']}, "
+              f"транзакций {result['transactions']} в {args.shards} шардов за {result['seconds']:.1f} с")
+    elif args.command == 'settle-fees':
+        sharded = ShardedBank(args.path)
+        settled = sharded.settle_fees()
+        sharded.close()
+        print(f'Перенесено комиссий: {money.from_minor(settled)}')
+    else:
+        sharded = ShardedBank(args.path)
+        committed, rolled_back = sharded.recover()
+        sharded.close()
+        print(f'Зафиксировано переводов: {committed}, откатано: {rolled_back}')
+
+
+if __name__ == '__main__':
+    main()
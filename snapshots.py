@@ -0,0 +1,149 @@
+"""
+Ежедневные снимки балансов.
+
+take_daily_snapshots(day) после окончания дня записывает в balance_snapshots баланс на конец дня только для счетов,
+у которых в этот день были операции. Снимки строятся вперед по журналу: предыдущий снимок счета плюс операции
+после него до конца дня, а первый снимок счета - от контрольной точки журнала (см. journal). Поэтому стоимость
+задания не зависит от того, сколько прошло после дня снимка, а расхождение текущего баланса с журналом в снимки
+не попадает. balance_at(account_id, ts) берет ближайший снимок не позже ts и добавляет
+только операции между концом дня снимка и ts, а без снимка - считает баланс от контрольной точки журнала, поэтому
+стоимость запроса не зависит ни от возраста счета, ни от числа операций после ts.
+
+Запуск по расписанию (по умолчанию - за вчерашний день):
+    python snapshots.py [ГГГГ-ММ-ДД]
+"""
+import argparse
+from datetime import date, datetime, timedelta, timezone
+
+import journal
+import money
+from database import db_connection, db_read_connection
+
+END_OF_DAY = '23:59:59'
+
+
+def day_end(day):
+    """Метка времени конца дня 'ГГГГ-ММ-ДД 23:59:59'"""
+    return f'{day} {END_OF_DAY}'
+
+
+def as_timestamp(ts):
+    """Приводит datetime или строку к формату меток времени таблицы transactions"""
+    if isinstance(ts, datetime):
+        return ts.strftime('%Y-%m-%d %H:%M:%S')
+    return str(ts)
+
+
+def journal_delta(cursor, account_id, after, until):
+    """Изменение баланса счета в копейках по операциям с меткой времени в (after, until]"""
+    cursor.execute('''
+        SELECT
+            (SELECT COALESCE(SUM(amount), 0) FROM transactions
+             WHERE recipient_id = ? AND timestamp > ? AND timestamp <= ?)
+            - (SELECT COALESCE(SUM(amount + COALESCE(transfer_fee, 0)), 0) FROM transactions
+               WHERE sender_id = ? AND timestamp > ? AND timestamp <= ?)
+    ''', (account_id, after, until, account_id, after, until))
+    return cursor.fetchone()[0]
+
+
+def checkpoint_balance_at(cursor, account_id, ts):
+    """
+    Баланс счета в копейках на момент ts по контрольной точке журнала.
+
+    Контрольная точка учитывает строки журнала до balance_checkpoint_seq: к ее балансу добавляются строки после нее
+    не позже ts и вычитаются уже свернутые в нее строки позже ts.
+    """
+    since = journal.checkpoint_sequence(cursor)
+    cursor.execute('''
+        SELECT COALESCE((SELECT balance FROM balance_checkpoint WHERE account_id = ?), 0)
+            + (SELECT COALESCE(SUM(amount), 0) FROM transactions WHERE recipient_id = ? AND id > ? AND timestamp <= ?)
+            - (SELECT COALESCE(SUM(amount + COALESCE(transfer_fee, 0)), 0) FROM transactions
+               WHERE sender_id = ? AND id > ? AND timestamp <= ?)
+            - (SELECT COALESCE(SUM(amount), 0) FROM transactions WHERE recipient_id = ? AND id <= ? AND timestamp > ?)
+            + (SELECT COALESCE(SUM(amount + COALESCE(transfer_fee, 0)), 0) FROM transactions
+               WHERE sender_id = ? AND id <= ? AND timestamp > ?)
+    ''', (account_id, account_id, since, ts, account_id, since, ts, account_id, since, ts, account_id, since, ts))
+    return cursor.fetchone()[0]
+
+
+def take_daily_snapshots(day=None):
+    """
+    Записывает снимки балансов на конец дня day для счетов, затронутых в этот день.
+
+    Снимок - предыдущий снимок счета плюс операции между концом его дня и концом дня day; для счета без более
+    ранних снимков - баланс по контрольной точке журнала. Повторный запуск за тот же день перезаписывает снимки.
+
+    Returns:
+        int: Количество записанных снимков.
+    """
+    # Метки времени в transactions пишутся в UTC (CURRENT_TIMESTAMP)
+    day = str(day or datetime.now(timezone.utc).date() - timedelta(days=1))
+    with db_connection() as (conn, cursor):
+        cursor.execute('SELECT id FROM accounts WHERE id IN ('
+                       'SELECT sender_id FROM transactions WHERE timestamp >= ? AND timestamp <= ? '
+                       'UNION SELECT recipient_id FROM transactions WHERE timestamp >= ? AND timestamp <= ?)',
+                       (day, day_end(day), day, day_end(day)))
+        account_ids = [row[0] for row in cursor.fetchall()]
+
+        snapshots = []
+        for account_id in account_ids:
+            cursor.execute('SELECT day, balance FROM balance_snapshots WHERE account_id = ? AND day < ? '
+                           'ORDER BY day DESC LIMIT 1', (account_id, day))
+            previous = cursor.fetchone()
+            if previous is None:
+                balance = checkpoint_balance_at(cursor, account_id, day_end(day))
+            else:
+                balance = previous[1] + journal_delta(cursor, account_id, day_end(previous[0]), day_end(day))
+            snapshots.append((account_id, day, balance))
+
+        cursor.executemany('INSERT OR REPLACE INTO balance_snapshots (account_id, day, balance) VALUES (?, ?, ?)',
+                           snapshots)
+        return len(snapshots)
+
+
+def balance_at_minor(cursor, account_id, ts):
+    """Баланс счета в копейках на момент ts включительно через уже открытый курсор"""
+    ts = as_timestamp(ts)
+    # Снимок дня D описывает баланс на D 23:59:59, поэтому снимок дня ts подходит, только если ts не раньше конца дня
+    last_day = ts[:10]
+    if ts[11:] < END_OF_DAY:
+        last_day = str(date.fromisoformat(last_day) - timedelta(days=1))
+
+    cursor.execute('SELECT day, balance FROM balance_snapshots WHERE account_id = ? AND day <= ? '
+                   'ORDER BY day DESC LIMIT 1', (account_id, last_day))
+    snapshot = cursor.fetchone()
+    if snapshot is None:
+        cursor.execute('SELECT 1 FROM accounts WHERE id = ?', (account_id,))
+        if cursor.fetchone() is None:
+            return None
+        return checkpoint_balance_at(cursor, account_id, ts)
+
+    day, balance = snapshot
+    return balance + journal_delta(cursor, account_id, day_end(day), ts)
+
+
+def balance_at(account_id, ts):
+    """
+    Баланс счета на момент ts.
+
+    Args:
+        account_id (int): Идентификатор счета.
+        ts (str | datetime): Момент времени 'ГГГГ-ММ-ДД ЧЧ:ММ:СС' (включительно).
+
+    Returns:
+        float: Баланс в рублях или None, если счета нет.
+    """
+    with db_read_connection() as (conn, cursor):
+        balance = balance_at_minor(cursor, account_id, ts)
+    return None if balance is None else money.from_minor(balance)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Снимки балансов на конец дня')
+    parser.add_argument('day', nargs='?', help='День ГГГГ-ММ-ДД (по умолчанию - вчера)')
+    args = parser.parse_args()
+    print(f'Записано снимков: {take_daily_snapshots(args.day)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""
+Выписки по счету.
+
+Выписка содержит входящие и исходящие операции счета от новых к старым вместе с балансом после каждой операции.
+У пополнений и снятий наличных нет второй стороны: counterparty_id пустой.
+Страницы выбираются по ключу (timestamp, id) последней выданной записи, а не через OFFSET, поэтому стоимость любой
+страницы одинакова: оба запроса идут по индексам idx_transactions_sender_ts и idx_transactions_recipient_ts.
+
+Баланс после операции считается назад от текущего баланса счета: для первой страницы один агрегирующий запрос
+вычитает операции новее to_ts, дальше баланс переносится между страницами внутри курсора. Баланс и операции
+страницы читаются в одной транзакции чтения (один снимок WAL), поэтому операция, зафиксированная между этими
+запросами, не сдвигает баланс относительно строк страницы.
+"""
+import csv
+
+import money
+from database import db_read_connection
+
+PAGE_SIZE = 100
+
+ENTRY_FIELDS = ('id', 'timestamp', 'direction', 'counterparty_id', 'amount', 'fee', 'balance')
+
+# Операции счета: исходящие уменьшают баланс на сумму с комиссией, входящие увеличивают на сумму.
+# Параметры: счет, граница (timestamp, id), from_ts - по разу для исходящих и входящих, затем размер страницы.
+PAGE_QUERY = '''
+    SELECT id, timestamp, 'out', recipient_id, amount, transfer_fee FROM transactions
+    WHERE sender_id = ? AND (timestamp, id) < (?, ?) AND timestamp >= ?
+    UNION ALL
+    SELECT id, timestamp, 'in', sender_id, amount, 0 FROM transactions
+    WHERE recipient_id = ? AND (timestamp, id) < (?, ?) AND timestamp >= ?
+    ORDER BY timestamp DESC, id DESC
+    LIMIT ?
+'''
+
+MAX_TIMESTAMP = '9999-12-31 23:59:59'
+MIN_TIMESTAMP = '0000-01-01 00:00:00'
+MAX_ID = 2 ** 63 - 1
+
+
+def entry_delta(direction, amount, fee):
+    """Изменение баланса счета от операции в копейках"""
+    return -(amount + fee) if direction == 'out' else amount
+
+
+def balance_after(cursor, account_id, ts, transaction_id=MAX_ID):
+    """Баланс счета сразу после операции (ts, transaction_id): текущий баланс минус все более поздние операции"""
+    cursor.execute('SELECT balance FROM accounts WHERE id = ?', (account_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+
+    cursor.execute('''
+        SELECT
+            (SELECT COALESCE(SUM(amount + transfer_fee), 0) FROM transactions
+             WHERE sender_id = ? AND (timestamp, id) > (?, ?)),
+            (SELECT COALESCE(SUM(amount), 0) FROM transactions
+             WHERE recipient_id = ? AND (timestamp, id) > (?, ?))
+    ''', (account_id, ts, transaction_id, account_id, ts, transaction_id))
+    outgoing, incoming = cursor.fetchone()
+    return row[0] + outgoing - incoming
+
+
+def encode_cursor(ts, transaction_id, balance):
+    """Курсор страницы: ключ последней выданной записи и баланс перед ней"""
+    return f'{ts}|{transaction_id}|{balance}'
+
+
+def decode_cursor(page_cursor):
+    """Разбирает курсор страницы"""
+    ts, transaction_id, balance = page_cursor.rsplit('|', 2)
+    return ts, int(transaction_id), int(balance)
+
+
+def fetch_page(cursor, account_id, from_ts, to_ts, page_size, page_cursor):
+    """
+    Читает одну страницу выписки через уже открытый курсор.
+
+    Returns:
+        tuple: (список записей в копейках, курсор следующей страницы или None).
+    """
+    if page_cursor is None:
+        # Верхняя граница включает to_ts целиком: все операции с timestamp <= to_ts
+        upper_ts, upper_id = to_ts or MAX_TIMESTAMP, MAX_ID
+        balance = balance_after(cursor, account_id, upper_ts, upper_id)
+        if balance is None:
+            return [], None
+    else:
+        upper_ts, upper_id, balance = decode_cursor(page_cursor)
+
+    lower_ts = from_ts or MIN_TIMESTAMP
+    cursor.execute(PAGE_QUERY, (account_id, upper_ts, upper_id, lower_ts,
+                                account_id, upper_ts, upper_id, lower_ts, page_size))
+
+    entries = []
+    for transaction_id, ts, direction, counterparty_id, amount, fee in cursor.fetchall():
+        entries.append({
+            'id': transaction_id,
+            'timestamp': ts,
+            'direction': direction,
+            'counterparty_id': counterparty_id,
+            'amount': amount,
+            'fee': fee if direction == 'out' else 0,
+            'balance': balance,
+        })
+        balance -= entry_delta(direction, amount, fee)
+
+    if len(entries) < page_size:
+        return entries, None
+    return entries, encode_cursor(entries[-1]['timestamp'], entries[-1]['id'], balance)
+
+
+def to_rubles(entry):
+    """Переводит суммы записи выписки в рубли"""
+    return dict(entry, amount=money.from_minor(entry['amount']), fee=money.from_minor(entry['fee']),
+                balance=money.from_minor(entry['balance']))
+
+
+def get_statement(account_id, from_ts=None, to_ts=None, page_size=PAGE_SIZE, cursor=None):
+    """
+    Страница выписки по счету.
+
+    Args:
+        account_id (int): Идентификатор счета.
+        from_ts (str): Начало периода 'ГГГГ-ММ-ДД ЧЧ:ММ:СС' включительно (None - с начала истории).
+        to_ts (str): Конец периода включительно (None - по текущий момент).
+        page_size (int): Количество записей на странице.
+        cursor (str): Курсор из предыдущей страницы (None - первая страница).
+
+    Returns:
+        dict: entries - записи от новых к старым (id, timestamp, direction 'in'/'out', counterparty_id, amount, fee,
+        balance - баланс после операции, суммы в рублях); next_cursor - курсор следующей страницы или None.
+    """
+    with db_read_connection() as (conn, db_cursor):
+        db_cursor.execute('BEGIN')
+        entries, next_cursor = fetch_page(db_cursor, account_id, from_ts, to_ts, page_size, cursor)
+    return {'entries': [to_rubles(entry) for entry in entries], 'next_cursor': next_cursor}
+
+
+def iter_statement(account_id, from_ts=None, to_ts=None, page_size=1000):
+    """Лениво возвращает все записи выписки, читая по одной странице за раз"""
+    page_cursor = None
+    while True:
+        with db_read_connection() as (conn, cursor):
+            cursor.execute('BEGIN')
+            entries, page_cursor = fetch_page(cursor, account_id, from_ts, to_ts, page_size, page_cursor)
+        for entry in entries:
+            yield to_rubles(entry)
+        if page_cursor is None:
+            return
+
+
+def export_statement_csv(account_id, path, from_ts=None, to_ts=None):
+    """
+    Записывает выписку в CSV-файл потоково.
+
+    Returns:
+        int: Количество записанных строк.
+    """
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=ENTRY_FIELDS)
+        writer.writeheader()
+        for entry in iter_statement(account_id, from_ts, to_ts):
+            writer.writerow(entry)
+            count += 1
+    return count
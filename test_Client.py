@@ -1,7 +1,7 @@
 import unittest
 from Client import is_valid_name, is_valid_phone
 import Client
-from unittest.mock import patch, MagicMock
+from unittest.mock import call, patch, MagicMock
 import hashlib
 
 
@@ -40,12 +40,12 @@ class TestIsValidPhone(unittest.TestCase):
 
 
 class TestUpdateClientInfoCompany(unittest.TestCase):
-    @patch('your_module.connect_to_db')
+    @patch('Client.db_connection')
     def test_update_client_info_company(self, mock_connect):
-        # Создаем мок-объекты для connect_to_db
+        # Создаем мок-объекты для db_connection
         mock_conn = MagicMock()
         mock_cursor = MagicMock()
-        mock_connect.return_value = (mock_conn, mock_cursor)
+        mock_connect.return_value.__enter__.return_value = (mock_conn, mock_cursor)
 
         # Параметры для теста
         client_id = 1
@@ -63,16 +63,14 @@ class TestUpdateClientInfoCompany(unittest.TestCase):
 
         # Проверяем, что были вызваны ожидаемые SQL-запросы
         expected_password_hash = hashlib.sha256(new_password.encode()).hexdigest()
-        mock_cursor.execute.assert_called_once_with('UPDATE clients SET full_name = ?, director_name = ?, phone = ?,'
-                                                    ' email = ?, password = ? WHERE id = ?',
-                                                    (new_name, new_director_name, new_phone, new_email,
-                                                     expected_password_hash, client_id))
-        mock_cursor.execute.assert_called_once_with('UPDATE accounts SET owner_name = ? WHERE client_id = ?',
-                                                    (new_name, client_id))
-
-        # Проверяем, что соединение было закрыто
-        mock_conn.commit.assert_called_once()
-        mock_conn.close.assert_called_once()
+        mock_cursor.execute.assert_has_calls([
+            call('UPDATE clients SET full_name = ?, director_name = ?, phone = ?, email = ?, password = ? '
+                 'WHERE id = ?', (new_name, new_director_name, new_phone, new_email, expected_password_hash, client_id)),
+            call('UPDATE accounts SET owner_name = ? WHERE client_id = ?', (new_name, client_id)),
+        ])
+
+        # Проверяем, что изменения выполнены в одной транзакции
+        mock_connect.assert_called_once_with()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,55 @@
+import asyncio
+import threading
+import unittest
+
+import async_bank
+from test_transfer_engine import BankDatabaseTestCase
+
+
+class TestAsyncBank(BankDatabaseTestCase):
+    def run_async(self, coroutine_function, workers=2, **kwargs):
+        async def scenario():
+            async with async_bank.AsyncBank(workers=workers, **kwargs) as bank:
+                return await coroutine_function(bank)
+
+        return asyncio.run(scenario())
+
+    def test_operations(self):
+        async def scenario(bank):
+            self.assertEqual(await bank.make_transfer(1, 3, 200000), 'Перевод успешно выполнен')
+            return await bank.view_balance(3)
+
+        self.assertEqual(self.run_async(scenario), 200000.0)
+        self.assertEqual(self.balances()[1], 98000.0)
+
+    def test_many_in_flight(self):
+        async def scenario(bank):
+            return await asyncio.gather(*(bank.deposit_money(3, 1) for _ in range(500)))
+
+        results = self.run_async(scenario, max_in_flight=50)
+        self.assertEqual(len(results), 500)
+        self.assertEqual(self.balances()[3], 500.0)
+
+    def test_timeout_and_cancellation_of_queued_operation(self):
+        release = threading.Event()
+
+        async def scenario(bank):
+            blocker = asyncio.ensure_future(bank.call(release.wait))
+            await asyncio.sleep(0.01)
+            with self.assertRaises(asyncio.TimeoutError):
+                await bank.deposit_money(3, 100, timeout=0.05)
+            queued = asyncio.ensure_future(bank.deposit_money(3, 100))
+            await asyncio.sleep(0.01)
+            queued.cancel()
+            release.set()
+            await blocker
+            with self.assertRaises(asyncio.CancelledError):
+                await queued
+
+        self.run_async(scenario, workers=1)
+        # Ни операция с истекшим timeout, ни отмененная не выполнены
+        self.assertEqual(self.balances()[3], 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import time
+import unittest
+
+import balance_cache
+import database
+import group_commit
+import main_bank_system
+from test_transfer_engine import BankDatabaseTestCase
+
+
+class TestBalanceCache(unittest.TestCase):
+    def test_lru_eviction_and_counters(self):
+        cache = balance_cache.BalanceCache(max_size=2, ttl=None)
+        for account_id in (1, 2):
+            cache.put(account_id, account_id * 100, cache.generation())
+        self.assertEqual(cache.get(1), 100)
+        cache.put(3, 300, cache.generation())
+
+        self.assertIsNone(cache.get(2))
+        self.assertEqual(cache.get(3), 300)
+        self.assertEqual(cache.stats(), {'hits': 2, 'misses': 1, 'hit_ratio': 2 / 3, 'size': 2})
+
+    def test_ttl(self):
+        cache = balance_cache.BalanceCache(ttl=0.01)
+        cache.put(1, 100, cache.generation())
+        time.sleep(0.02)
+        self.assertIsNone(cache.get(1))
+
+    def test_stale_put_is_dropped(self):
+        cache = balance_cache.BalanceCache()
+        generation = cache.generation()
+        cache.invalidate([1])
+        cache.put(1, 100, generation)
+        self.assertIsNone(cache.get(1))
+
+    def test_disabled(self):
+        cache = balance_cache.BalanceCache(enabled=False)
+        cache.put(1, 100, cache.generation())
+        self.assertIsNone(cache.get(1))
+
+
+class TestViewBalanceCache(BankDatabaseTestCase):
+    def tearDown(self):
+        balance_cache.configure()
+        super().tearDown()
+
+    def test_repeated_reads_hit_cache(self):
+        self.assertEqual(main_bank_system.view_balance(1), 300000.0)
+        self.assertEqual(main_bank_system.view_balance('1'), 300000.0)
+        stats = balance_cache.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_committed_writes_invalidate(self):
+        for account_id in (1, 2, 3, 4):
+            main_bank_system.view_balance(account_id)
+
+        main_bank_system.make_transfer(1, 3, 200000)
+        self.assertEqual(main_bank_system.view_balance(1), 98000.0)
+        self.assertEqual(main_bank_system.view_balance(2), 2000.0)
+        self.assertEqual(main_bank_system.view_balance(3), 200000.0)
+
+        main_bank_system.pay_salary(4, 3, 1000)
+        self.assertEqual(main_bank_system.view_balance(4), 8580.0)
+
+        main_bank_system.deposit_money(3, 500)
+        main_bank_system.withdraw_money(3, 100)
+        self.assertEqual(main_bank_system.view_balance(3), 201400.0)
+
+        writer = group_commit.GroupCommitWriter().start()
+        writer.make_transfer(3, 1, 1400).result()
+        writer.stop()
+        self.assertEqual(main_bank_system.view_balance(1), 99400.0)
+
+    def test_rejected_write_keeps_cache(self):
+        main_bank_system.view_balance(3)
+        main_bank_system.make_transfer(3, 1, 10)
+        main_bank_system.view_balance(3)
+        self.assertEqual(balance_cache.cache.stats()['hits'], 1)
+
+    def test_disabled_cache_reads_database(self):
+        balance_cache.configure(enabled=False)
+        main_bank_system.view_balance(1)
+        with database.db_connection() as (conn, cursor):
+            cursor.execute('UPDATE accounts SET balance = 0 WHERE id = 1')
+        self.assertEqual(main_bank_system.view_balance(1), 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import csv
+import json
+import os
+import tempfile
+import unittest
+
+from bulk_transfers import run_bulk_transfers
+from test_transfer_engine import BankDatabaseTestCase
+
+
+class TestBulkTransfers(BankDatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+        super().tearDown()
+
+    def results(self, path):
+        with open(path, newline='', encoding='utf-8') as file:
+            return [row['result'] for row in csv.DictReader(file)]
+
+    def test_csv_file(self):
+        source = os.path.join(self.directory.name, 'transfers.csv')
+        results = os.path.join(self.directory.name, 'results.csv')
+        with open(source, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(['sender_id', 'recipient_id', 'amount'])
+            writer.writerows([[1, 3, 100], [1, 4, 1000], [4, 3, 10], ['abc', 3, 1], [1, 3, -5], [3, 1, 10 ** 9]])
+
+        stats = run_bulk_transfers(source, results, chunk_size=2)
+        self.assertEqual((stats['total'], stats['succeeded']), (6, 2))
+        self.assertEqual(self.results(results), [
+            "Перевод успешно выполнен",
+            "Перевод успешно выполнен",
+            "Перевод запрещен. Нельзя переводить с расчетного счета физическим лицам.",
+            "Некорректная строка",
+            "Некорректная сумма",
+            "Недостаточно средств для перевода с учетом комиссии",
+        ])
+        self.assertEqual(self.balances(), {1: 298700.0, 2: 200.0, 3: 100.0, 4: 11000.0})
+
+    def test_jsonl_file(self):
+        source = os.path.join(self.directory.name, 'transfers.jsonl')
+        results = os.path.join(self.directory.name, 'results.csv')
+        with open(source, 'w', encoding='utf-8') as file:
+            file.write(json.dumps({'sender_id': 1, 'recipient_id': 3, 'amount': 50}) + '\n')
+            file.write('{broken\n')
+
+        stats = run_bulk_transfers(source, results)
+        self.assertEqual((stats['total'], stats['succeeded']), (2, 1))
+        self.assertEqual(self.results(results), ["Перевод успешно выполнен", "Некорректная строка"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import csv
+import os
+import tempfile
+import unittest
+
+import client_importer
+import database
+import sessions
+from test_transfer_engine import BankDatabaseTestCase
+
+ROWS = [
+    ('individual', 'Сидоров Сидор', '', '', 'sidorov@example.com', '999 111 22 33', 'Password1'),
+    ('Юридическое лицо', '', 'ООО Лютик', 'Смирнов Олег', 'lutik@example.com', '999 111 22 34', 'Password1'),
+    ('individual', 'Smith John', '', '', 'smith@example.com', '999 111 22 35', 'Password1'),
+    ('individual', 'Козлов Иван', '', '', 'kozlov@example.com', '999 111 22 36', 'password'),
+    ('individual', 'Сидоров Петр', '', '', 'sidorov@example.com', '999 111 22 37', 'Password1'),
+    ('unknown', 'Козлов Иван', '', '', 'kozlov2@example.com', '999 111 22 38', 'Password1'),
+]
+
+
+class TestClientImporter(BankDatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.directory.name, 'clients.csv')
+        self.rejects = os.path.join(self.directory.name, 'rejects.csv')
+        with open(self.source, 'w', encoding='utf-8', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(client_importer.FIELDS)
+            writer.writerows(ROWS)
+
+    def tearDown(self):
+        self.directory.cleanup()
+        super().tearDown()
+
+    def test_import(self):
+        result = client_importer.import_clients(self.source, self.rejects, chunk_size=2)
+        self.assertEqual((result['imported'], result['rejected']), (2, 4))
+
+        with open(self.rejects, encoding='utf-8') as file:
+            rejects = {int(row['line']): row['reason'] for row in csv.DictReader(file)}
+        self.assertEqual(rejects, {
+            4: 'Ошибка. ФИО не должно содержать цифры или специальные символы.',
+            5: 'Ошибка: Пароль должен содержать хотя бы одну цифру.',
+            6: client_importer.DUPLICATE_EMAIL,
+            7: 'Некорректный тип клиента',
+        })
+
+        with database.db_connection() as (conn, cursor):
+            cursor.execute('SELECT c.type, a.owner_name, a.account_type, a.balance FROM clients c '
+                           'JOIN accounts a ON a.client_id = c.id WHERE c.id > 4 ORDER BY c.id')
+            self.assertEqual(cursor.fetchall(), [('Физическое лицо', 'Сидоров Сидор', 'Лицевой', 0),
+                                                 ('Юридическое лицо', 'Смирнов Олег', 'Расчетный', 0)])
+        self.assertIsNotNone(sessions.authenticate('999 111 22 34', 'Password1'))
+
+    def test_existing_clients_and_hash_pool(self):
+        client_importer.import_clients(self.source, self.rejects)
+        result = client_importer.import_clients(self.source, self.rejects, hash_workers=2)
+        self.assertEqual((result['imported'], result['rejected']), (0, 6))
+
+
+if __name__ == '__main__':
+    unittest.main()
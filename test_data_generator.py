@@ -0,0 +1,98 @@
+import os
+import re
+import tempfile
+import unittest
+from datetime import datetime, timezone
+
+import data_generator
+import database
+import migrations
+import reconciliation
+import statements
+from Client import is_valid_name
+
+END = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class TestGenerator(unittest.TestCase):
+    def test_seeded_determinism(self):
+        self.assertEqual(list(data_generator.generate_clients(100, seed=7)),
+                         list(data_generator.generate_clients(100, seed=7)))
+        self.assertNotEqual(list(data_generator.generate_clients(100, seed=7)),
+                            list(data_generator.generate_clients(100, seed=8)))
+
+        accounts = [(client[0], client[1]) for client, _ in data_generator.generate_clients(100)]
+        for distribution in data_generator.DISTRIBUTIONS:
+            with self.subTest(distribution=distribution):
+                first = list(data_generator.generate_transactions(accounts, 500, distribution=distribution, end=END))
+                second = list(data_generator.generate_transactions(accounts, 500, distribution=distribution, end=END))
+                self.assertEqual(first, second)
+                self.assertEqual([row[4] for row in first], sorted(row[4] for row in first))
+                self.assertFalse(any(sender == recipient for sender, recipient, *_ in first))
+
+    def test_clients_are_valid(self):
+        rows = list(data_generator.generate_clients(1000))
+        self.assertEqual(rows[1][0][1:3], ('Юридическое лицо', 'АО Банк'))
+        for client, account in rows:
+            self.assertTrue(is_valid_name(client[2]) and is_valid_name(account[3]), client)
+            self.assertRegex(client[5], r'^\d{3} \d{3} \d{2} \d{2}$')
+            self.assertTrue(re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', client[4]), client[4])
+            self.assertEqual(account[2], 'Расчетный' if client[1] == 'Юридическое лицо' else 'Лицевой')
+        self.assertEqual(len({client[4] for client, _ in rows}), len(rows))
+
+    def test_zipf_concentrates_transfers(self):
+        accounts = [(client[0], client[1]) for client, _ in data_generator.generate_clients(1000)]
+        rows = list(data_generator.generate_transactions(accounts, 5000, distribution='zipf', end=END))
+        counts = {}
+        for _, recipient, *_ in rows:
+            counts[recipient] = counts.get(recipient, 0) + 1
+        self.assertGreater(max(counts.values()), 5000 / 1000 * 20)
+
+
+class TestLoad(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        database.configure_pool(self.path, size=2)
+        database.create_tables()
+        migrations.migrate()
+
+    def tearDown(self):
+        database.close_pool()
+        os.remove(self.path)
+
+    def indexes(self):
+        with database.db_connection() as (conn, cursor):
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL ORDER BY name")
+            return cursor.fetchall()
+
+    def test_load_restores_indexes_and_continues_ids(self):
+        indexes = self.indexes()
+        stats = data_generator.load(300, 1000, chunk_size=128, end=END)
+        self.assertEqual((stats['clients'], stats['transactions']), (300, 1000))
+        data_generator.load(10, chunk_size=128, seed=2)
+        self.assertEqual(self.indexes(), indexes)
+
+        with database.db_connection() as (conn, cursor):
+            cursor.execute('SELECT COUNT(*), MAX(id) FROM clients')
+            self.assertEqual(cursor.fetchone(), (310, 310))
+            cursor.execute('SELECT COUNT(*) FROM accounts a JOIN clients c ON c.id = a.client_id')
+            self.assertEqual(cursor.fetchone(), (310,))
+            cursor.execute('SELECT COUNT(*) FROM transactions')
+            self.assertEqual(cursor.fetchone(), (1000,))
+
+    def test_balances_follow_generated_transfers(self):
+        data_generator.load(300, 2000, distribution='zipf', chunk_size=128, end=END)
+        data_generator.load(20, 200, chunk_size=128, seed=2, end=END)
+        self.assertEqual(reconciliation.reconcile()['drifted'], 0)
+        with database.db_connection() as (conn, cursor):
+            cursor.execute('SELECT MIN(balance) FROM accounts')
+            self.assertGreaterEqual(cursor.fetchone()[0], 0)
+        # Ни один счет не уходил в минус в прошлом
+        for account_id in range(1, 321):
+            lowest = min((entry['balance'] for entry in statements.iter_statement(account_id)), default=0)
+            self.assertGreaterEqual(lowest, 0, account_id)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from database import ConnectionPool, on_commit, storage_profile
+
+
+class TestConnectionPool(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.pool = ConnectionPool(self.path, size=2, pragmas={'cache_size': -4000})
+
+    def tearDown(self):
+        self.pool.close()
+        os.remove(self.path)
+
+    def test_connections_are_reused(self):
+        with self.pool.connection() as first:
+            pass
+        with self.pool.connection() as second:
+            pass
+        self.assertIs(first, second)
+
+    def test_pragmas_applied(self):
+        with self.pool.connection() as conn:
+            self.assertEqual(conn.execute('PRAGMA cache_size').fetchone()[0], -4000)
+
+    def test_commit_and_rollback(self):
+        with self.pool.connection() as conn:
+            conn.execute('CREATE TABLE t (x INTEGER)')
+            conn.execute('INSERT INTO t VALUES (1)')
+
+        with self.assertRaises(RuntimeError):
+            with self.pool.connection() as conn:
+                conn.execute('INSERT INTO t VALUES (2)')
+                raise RuntimeError('Ошибка внутри операции')
+
+        with self.pool.connection() as conn:
+            self.assertEqual(conn.execute('SELECT x FROM t').fetchall(), [(1,)])
+
+    def test_commit_hooks(self):
+        called = []
+        with self.pool.connection() as conn:
+            on_commit(conn, lambda: called.append('commit'))
+            self.assertEqual(called, [])
+        self.assertEqual(called, ['commit'])
+
+        with self.assertRaises(RuntimeError):
+            with self.pool.connection() as conn:
+                on_commit(conn, lambda: called.append('rollback'))
+                raise RuntimeError('Ошибка внутри операции')
+        with self.pool.connection():
+            pass
+        self.assertEqual(called, ['commit'])
+
+    def test_commit_hooks_of_next_transaction_wait_for_its_commit(self):
+        # Соединение после release сразу берет другой поток: его функция не должна вызваться при чужом COMMIT
+        pool = ConnectionPool(self.path, size=1)
+        release = pool.release
+        called = []
+        registered, proceed = threading.Event(), threading.Event()
+
+        def other():
+            with pool.connection() as conn:
+                on_commit(conn, lambda: called.append('other'))
+                registered.set()
+                proceed.wait(5)
+
+        thread = threading.Thread(target=other)
+
+        def release_and_switch(conn):
+            release(conn)
+            if not thread.is_alive() and not registered.is_set():
+                thread.start()
+                registered.wait(5)
+
+        pool.release = release_and_switch
+        with pool.connection() as conn:
+            on_commit(conn, lambda: called.append('first'))
+        self.assertEqual(called, ['first'])
+        proceed.set()
+        thread.join()
+        self.assertEqual(called, ['first', 'other'])
+        pool.close()
+
+    def test_pinned_connection(self):
+        self.pool.pin()
+        with self.pool.connection() as pinned:
+            # Вложенное соединение не может быть закрепленным - оно уже выдано
+            with self.pool.connection() as nested:
+                self.assertIsNot(nested, pinned)
+        with self.pool.connection() as conn:
+            self.assertIs(conn, pinned)
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(self.pool.acquire()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], pinned)
+        self.pool.release(other[0])
+
+        self.pool.unpin()
+        self.assertEqual(self.pool._idle.qsize(), 2)
+
+    def test_size_is_bounded(self):
+        self.pool.timeout = 0.1
+        first = self.pool.acquire()
+        second = self.pool.acquire()
+        with self.assertRaises(TimeoutError):
+            self.pool.acquire()
+
+        # Освобожденное в другом потоке соединение достается ожидающему
+        self.pool.timeout = 5
+        threading.Timer(0.05, self.pool.release, args=(first,)).start()
+        self.assertIs(self.pool.acquire(), first)
+        self.pool.release(first)
+        self.pool.release(second)
+
+
+class TestReadOnlyPool(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.pool = ConnectionPool(self.path, size=1, pragmas=storage_profile(busy_timeout=100))
+        self.read_pool = ConnectionPool(self.path, size=2, pragmas=storage_profile(busy_timeout=100), read_only=True)
+        with self.pool.connection() as conn:
+            conn.execute('CREATE TABLE t (x INTEGER)')
+            conn.execute('INSERT INTO t VALUES (1)')
+
+    def tearDown(self):
+        self.read_pool.close()
+        self.pool.close()
+        os.remove(self.path)
+
+    def test_wal_mode(self):
+        with self.pool.connection() as conn:
+            self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+
+    def test_read_only(self):
+        with self.assertRaises(sqlite3.OperationalError):
+            with self.read_pool.connection() as conn:
+                conn.execute('INSERT INTO t VALUES (2)')
+
+    def test_reads_do_not_wait_for_writer(self):
+        with self.pool.connection(immediate=True) as writer:
+            writer.execute('INSERT INTO t VALUES (2)')
+            with self.read_pool.connection() as reader:
+                self.assertEqual(reader.execute('SELECT COUNT(*) FROM t').fetchone()[0], 1)
+        with self.read_pool.connection() as reader:
+            self.assertEqual(reader.execute('SELECT COUNT(*) FROM t').fetchone()[0], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import sqlite3
+import threading
+import unittest
+
+from group_commit import GroupCommitWriter
+from test_transfer_engine import BankDatabaseTestCase
+
+
+def failing_operation(cursor, account_id):
+    """Операция, которая успевает изменить баланс и падает"""
+    cursor.execute('UPDATE accounts SET balance = 0 WHERE id = ?', (account_id,))
+    raise RuntimeError('Ошибка операции')
+
+
+class LockedPool:
+    """Пул, который не может начать транзакцию: БД заблокирована другим процессом"""
+
+    def connection(self, immediate=False):
+        raise sqlite3.OperationalError('database is locked')
+
+
+class TestGroupCommitWriter(BankDatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.writer = GroupCommitWriter(max_batch=50, max_latency=0.05).start()
+
+    def tearDown(self):
+        self.writer.stop()
+        super().tearDown()
+
+    def test_operations_from_many_threads(self):
+        futures = []
+        lock = threading.Lock()
+
+        def worker():
+            for _ in range(20):
+                future = self.writer.make_transfer(1, 3, 10)
+                with lock:
+                    futures.append(future)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual({future.result(timeout=5) for future in futures}, {"Перевод успешно выполнен"})
+        balances = self.balances()
+        self.assertEqual(balances[1], 300000.0 - 160 * 10)
+        self.assertEqual(balances[3], 160 * 10)
+
+    def test_failed_operation_does_not_abort_batch(self):
+        deposit = self.writer.deposit_money(3, 50)
+        failing = self.writer.submit(failing_operation, 1)
+        withdrawal = self.writer.withdraw_money(3, 20)
+
+        self.assertEqual(deposit.result(timeout=5), "Счет успешно пополнен для None. Новый баланс: 50.0")
+        with self.assertRaises(RuntimeError):
+            failing.result(timeout=5)
+        self.assertEqual(withdrawal.result(timeout=5), "Сумма 20.0 успешно снята. Новый баланс: 30.0")
+        self.assertEqual(self.balances()[1], 300000.0)
+
+    def test_batch_fails_when_database_is_locked(self):
+        writer = GroupCommitWriter(max_batch=50, max_latency=0.05, pool=LockedPool()).start()
+        futures = [writer.deposit_money(3, 50), writer.make_transfer(1, 3, 10)]
+        cancelled = writer.withdraw_money(3, 20)
+        cancelled.cancel()
+        writer.stop()
+        for future in futures:
+            with self.assertRaises(sqlite3.OperationalError):
+                future.result(timeout=5)
+        self.assertTrue(cancelled.cancelled())
+        self.assertEqual(self.balances()[3], 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import http.client
+import json
+import threading
+import unittest
+
+import http_service
+from test_transfer_engine import BankDatabaseTestCase
+
+
+class TestHttpService(BankDatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.server = http_service.BankHTTPServer(('127.0.0.1', 0), workers=2, backlog=2)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.conn = http.client.HTTPConnection('127.0.0.1', self.server.server_address[1], timeout=5)
+
+    def tearDown(self):
+        self.conn.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        super().tearDown()
+
+    def request(self, method, path, body=None, token=None):
+        headers = {'Content-Type': 'application/json'}
+        if token is not None:
+            headers['Authorization'] = f'Bearer {token}'
+        self.conn.request(method, path, json.dumps(body) if body is not None else None, headers)
+        response = self.conn.getresponse()
+        return response.status, json.loads(response.read())
+
+    def register_and_login(self):
+        status, payload = self.request('POST', '/register', {
+            'type': 'individual', 'full_name': 'Сидоров Сидор', 'email': 'sidorov@example.com',
+            'phone': '999 111 22 33', 'password': 'Password1'})
+        self.assertEqual(status, 201)
+        status, payload = self.request('POST', '/login', {'login': 'sidorov@example.com', 'password': 'Password1'})
+        self.assertEqual(status, 200)
+        return payload['token']
+
+    def test_register_login_and_operations(self):
+        token = self.register_and_login()
+        account_id = 5
+
+        self.assertEqual(self.request('POST', '/deposit', {'account_id': account_id, 'amount': 500}, token)[0], 200)
+        self.assertEqual(self.request('GET', f'/accounts/{account_id}/balance', token=token),
+                         (200, {'account_id': account_id, 'balance': 500.0}))
+        status, payload = self.request('POST', '/transfer', {'sender_id': account_id, 'recipient_id': 3,
+                                                             'amount': 100}, token)
+        self.assertEqual((status, payload['message']), (200, 'Перевод успешно выполнен'))
+        self.assertEqual(self.balances()[3], 100.0)
+
+    def test_keep_alive(self):
+        token = self.register_and_login()
+        sock = self.conn.sock
+        self.request('GET', '/accounts/5/balance', token=token)
+        self.assertIs(self.conn.sock, sock)
+
+    def test_errors(self):
+        token = self.register_and_login()
+        self.assertEqual(self.request('GET', '/accounts/1/balance', token=token)[0], 403)
+        self.assertEqual(self.request('POST', '/transfer', {'sender_id': 1, 'recipient_id': 3, 'amount': 1},
+                                      token)[0], 403)
+        self.assertEqual(self.request('POST', '/deposit', {'account_id': 1, 'amount': 1})[0], 401)
+        self.assertEqual(self.request('POST', '/deposit', {'account_id': 1}, token)[0], 400)
+        self.assertEqual(self.request('POST', '/withdraw', {'account_id': 5, 'amount': 'много'}, token)[0], 400)
+        self.assertEqual(self.request('POST', '/login', {'login': 'sidorov@example.com', 'password': 'x'})[0], 401)
+        self.assertEqual(self.request('POST', '/unknown', {}, token)[0], 404)
+        status, payload = self.request('POST', '/register', {'type': 'individual', 'full_name': 'Иван',
+                                                             'email': 'bad', 'phone': '1', 'password': 'Password1'})
+        self.assertEqual((status, payload['message']), (400, 'Некорректный формат почты.'))
+
+    def test_content_length(self):
+        for length, status in (('ten', 400), ('-1', 400), (str(http_service.MAX_BODY + 1), 413)):
+            with self.subTest(length=length):
+                self.conn.putrequest('POST', '/login')
+                self.conn.putheader('Content-Length', length)
+                self.conn.endheaders()
+                response = self.conn.getresponse()
+                self.assertEqual(response.status, status)
+                response.read()
+                self.conn.close()
+
+    def test_invalid_amounts(self):
+        token = self.register_and_login()
+        self.request('POST', '/deposit', {'account_id': 5, 'amount': 500}, token)
+        balances = self.balances()
+        for path, body in (('/deposit', {'account_id': 1}), ('/transfer', {'sender_id': 5, 'recipient_id': 3}),
+                           ('/salary', {'sender_id': 5, 'recipient_id': 3}), ('/withdraw', {'account_id': 5})):
+            for amount in (-100, 0, float('nan'), float('inf'), '-1e400'):
+                with self.subTest(path=path, amount=amount):
+                    self.assertEqual(self.request('POST', path, dict(body, amount=amount), token),
+                                     (400, {'message': 'Некорректная сумма'}))
+        self.assertEqual(self.balances(), balances)
+
+    def test_deposit_to_any_account(self):
+        # Пополнение только зачисляет наличные, поэтому чужой счет можно пополнить, но не уменьшить
+        token = self.register_and_login()
+        self.assertEqual(self.request('POST', '/deposit', {'account_id': 1, 'amount': 100}, token)[0], 200)
+        self.assertEqual(self.balances()[1], 300100.0)
+
+    def test_register_duplicates_and_field_types(self):
+        self.register_and_login()
+        body = {'type': 'individual', 'full_name': 'Сидоров Петр', 'email': 'sidorov@example.com',
+                'phone': '999 111 22 34', 'password': 'Password1'}
+        self.assertEqual(self.request('POST', '/register', body), (409, {'message': 'Почта уже зарегистрирована'}))
+        body.update(email='petrov@example.com', phone='999 111 22 33')
+        self.assertEqual(self.request('POST', '/register', body), (409, {'message': 'Телефон уже зарегистрирован'}))
+        body.update(phone='999 111 22 35', full_name=['Сидоров', 'Петр'])
+        self.assertEqual(self.request('POST', '/register', body), (400, {'message': 'Некорректное поле full_name'}))
+        body.update(full_name='Сидоров Петр', password=['Password1'])
+        self.assertEqual(self.request('POST', '/register', body), (400, {'message': 'Некорректное поле password'}))
+        self.assertEqual(self.request('POST', '/login', {'login': ['sidorov@example.com'], 'password': 'Password1'}),
+                         (400, {'message': 'Некорректное поле login'}))
+
+
+if __name__ == '__main__':
+    unittest.main()
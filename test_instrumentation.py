@@ -0,0 +1,103 @@
+import os
+import tempfile
+import unittest
+
+import database
+import instrumentation
+import main_bank_system
+from test_transfer_engine import BankDatabaseTestCase
+
+
+class TestHistogram(unittest.TestCase):
+    def test_small_values_are_exact(self):
+        histogram = instrumentation.Histogram()
+        for value in range(1, 101):
+            histogram.record(value)
+        self.assertEqual(histogram.percentile(0.5), 50)
+        self.assertEqual(histogram.percentile(0.99), 99)
+        self.assertEqual(histogram.max, 100)
+
+    def test_relative_error(self):
+        histogram = instrumentation.Histogram()
+        values = [int(1.1 ** power) + 200 for power in range(150)]
+        for value in values:
+            histogram.record(value)
+        for fraction in (0.5, 0.9, 0.99):
+            expected = sorted(values)[round(fraction * len(values)) - 1]
+            self.assertLessEqual(abs(histogram.percentile(fraction) - expected), expected / 64)
+
+    def test_bucket_bounds(self):
+        for value in (0, 127, 128, 255, 256, 1000, 123456789):
+            index = instrumentation.Histogram.bucket(value)
+            self.assertGreaterEqual(instrumentation.Histogram.bucket_upper(index), value)
+            if index:
+                self.assertLess(instrumentation.Histogram.bucket_upper(index - 1), value)
+
+
+class TestInstrumentation(BankDatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        instrumentation.reset()
+        instrumentation.enable()
+
+    def tearDown(self):
+        instrumentation.disable()
+        instrumentation.reset()
+        super().tearDown()
+
+    def test_operation_counters(self):
+        main_bank_system.make_transfer(1, 3, 1000)
+        main_bank_system.view_balance(3)
+        snapshot = instrumentation.snapshot()
+
+        transfer = snapshot['make_transfer']
+        self.assertEqual((transfer['calls'], transfer['errors']), (1, 0))
+        self.assertGreater(transfer['statements'], 0)
+        # Списание, зачисление, запись о переводе и комиссия
+        self.assertGreaterEqual(transfer['rows'], 3)
+        self.assertGreater(transfer['p50_ms'], 0)
+        self.assertEqual(snapshot['view_balance']['rows'], 0)
+
+    def test_connections_opened(self):
+        database.close_pool()
+        database.configure_pool(self.path, size=4)
+        main_bank_system.deposit_money(1, 100)
+        self.assertEqual(instrumentation.snapshot()['deposit_money']['connections'], 1)
+
+    def test_nested_operations(self):
+        @instrumentation.operation('outer')
+        def outer():
+            main_bank_system.deposit_money(1, 100)
+
+        outer()
+        snapshot = instrumentation.snapshot()
+        self.assertEqual(snapshot['outer']['statements'], snapshot['deposit_money']['statements'])
+        self.assertEqual(snapshot['outer']['rows'], snapshot['deposit_money']['rows'])
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            main_bank_system.deposit_money(1, 'много')
+        self.assertEqual(instrumentation.snapshot()['deposit_money']['errors'], 1)
+
+    def test_disabled(self):
+        instrumentation.disable()
+        main_bank_system.deposit_money(1, 100)
+        self.assertNotIn('deposit_money', instrumentation.snapshot())
+
+    def test_prometheus_dump(self):
+        main_bank_system.deposit_money(1, 100)
+        fd, path = tempfile.mkstemp(suffix='.prom')
+        os.close(fd)
+        try:
+            instrumentation.write_prometheus(path)
+            with open(path, encoding='utf-8') as file:
+                text = file.read()
+        finally:
+            os.remove(path)
+        self.assertIn('bank_operation_calls_total{operation="deposit_money"} 1', text)
+        self.assertIn('bank_operation_latency_seconds_bucket{operation="deposit_money",le="+Inf"} 1', text)
+        self.assertIn('# TYPE bank_operation_latency_seconds histogram', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
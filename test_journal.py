@@ -0,0 +1,67 @@
+import sqlite3
+import unittest
+
+import database
+import fees
+import journal
+import main_bank_system
+import reconciliation
+from test_transfer_engine import BankDatabaseTestCase
+
+
+class TestJournal(BankDatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        # Балансы счетов фикстуры - исходные
+        with database.db_connection() as (conn, cursor):
+            cursor.execute('INSERT OR REPLACE INTO balance_checkpoint (account_id, balance) '
+                           'SELECT id, balance FROM accounts')
+        main_bank_system.deposit_money(3, 1000)
+        main_bank_system.make_transfer(1, 3, 200000)
+        main_bank_system.withdraw_money(3, 500)
+        main_bank_system.pay_salary(4, 3, 1000)
+
+    def test_every_movement_is_journaled(self):
+        with database.db_connection() as (conn, cursor):
+            cursor.execute('SELECT id, sender_id, recipient_id, amount, transfer_fee FROM transactions ORDER BY id')
+            self.assertEqual(cursor.fetchall(), [(1, None, 3, 100000, 0), (2, 1, 3, 20000000, 200000),
+                                                 (3, 3, None, 50000, 0), (4, 4, 3, 100000, 42000)])
+        self.assertEqual(reconciliation.reconcile()['drifted'], 0)
+
+    def test_journal_is_append_only(self):
+        with database.db_connection() as (conn, cursor):
+            with self.assertRaisesRegex(sqlite3.IntegrityError, 'только дополняется'):
+                cursor.execute('UPDATE transactions SET amount = 0 WHERE id = 1')
+            with self.assertRaisesRegex(sqlite3.IntegrityError, 'только дополняется'):
+                cursor.execute('DELETE FROM transactions')
+
+    def test_checkpoint_folds_the_tail(self):
+        balances = self.balances()
+        self.assertEqual(journal.checkpoint(), 4)
+        self.assertEqual(journal.checkpoint(), 0)
+        with database.db_connection() as (conn, cursor):
+            self.assertEqual(journal.checkpoint_sequence(cursor), 4)
+            cursor.execute('SELECT account_id, balance FROM balance_checkpoint ORDER BY account_id')
+            self.assertEqual({account_id: balance / 100 for account_id, balance in cursor.fetchall()}, balances)
+            self.assertEqual(journal.expected_balance(cursor, 3), 20150000)
+
+        main_bank_system.make_transfer(3, 1, 100)
+        self.assertEqual(reconciliation.reconcile()['drifted'], 0)
+
+    def test_rebuild_corrupted_balances(self):
+        journal.checkpoint()
+        main_bank_system.make_transfer(3, 1, 100)
+        fees.settle_fees()
+        balances = self.balances()
+        with database.db_connection() as (conn, cursor):
+            cursor.execute('UPDATE accounts SET balance = 0 WHERE id IN (1, 2, 3)')
+
+        self.assertEqual(journal.rebuild([3]), 1)
+        self.assertEqual(self.balances()[3], balances[3])
+        self.assertEqual(journal.rebuild(), 2)
+        self.assertEqual(self.balances(), balances)
+        self.assertEqual(journal.rebuild(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,16 +4,21 @@ from main_bank_system import money_cash
 
 
 class TestMoneyCash(unittest.TestCase):
-    @patch('main_bank_system.connect_to_db')
-    def test_successful_money_cash(self, mock_connect):
-        # Создаем мок-объекты для connect_to_db
+    @patch('builtins.print')
+    @patch('builtins.input', return_value='100')
+    @patch('main_bank_system.db_connection')
+    @patch('main_bank_system.db_read_connection')
+    def test_successful_money_cash(self, mock_read_connect, mock_connect, mock_input, mock_print):
+        # Создаем мок-объекты для db_read_connection и db_connection
         mock_conn = MagicMock()
         mock_cursor = MagicMock()
-        mock_connect.return_value = (mock_conn, mock_cursor)
+        mock_read_connect.return_value.__enter__.return_value = (mock_conn, mock_cursor)
+        mock_connect.return_value.__enter__.return_value = (mock_conn, mock_cursor)
 
-        # Устанавливаем ожидаемые значения из базы данных
-        account_info = (1, 1, 'Сберегательный', 1, 1, 1000.0)  # Пример данных счета
-        mock_cursor.fetchone.return_value = account_info
+        # Устанавливаем ожидаемые значения из базы данных (суммы в копейках): счет при просмотре, счет при
+        # снятии и баланс после списания
+        account_info = (1, 1, 'Сберегательный', 'Иванов Иван', 100000, 'Физическое лицо')  # Пример данных счета
+        mock_cursor.fetchone.side_effect = [account_info, account_info, (90000,)]
 
         # Вызываем функцию
         result = money_cash(1)
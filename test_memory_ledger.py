@@ -0,0 +1,88 @@
+import os
+import tempfile
+
+import Client
+import database
+import memory_ledger
+from test_transfer_engine import BankDatabaseTestCase
+
+
+class TestMemoryLedger(BankDatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.log_directory = tempfile.TemporaryDirectory()
+        self.log_dir = self.log_directory.name
+
+    def tearDown(self):
+        if memory_ledger.ledger is not None:
+            memory_ledger.stop()
+        self.log_directory.cleanup()
+        super().tearDown()
+
+    def crash(self, ledger):
+        """Останавливает движок без переноса операций в БД, как при аварийном завершении"""
+        ledger._stopped.set()
+        ledger._thread.join()
+        with ledger._lock:
+            ledger._sync()
+            ledger._segment.close()
+
+    def test_same_rules_as_sqlite_engine(self):
+        memory_ledger.start(self.log_dir, flush_interval=60)
+        self.assertEqual(memory_ledger.make_transfer(1, 3, 200000), "Перевод успешно выполнен")
+        self.assertEqual(memory_ledger.make_transfer(4, 3, 10),
+                         "Перевод запрещен. Нельзя переводить с расчетного счета физическим лицам.")
+        self.assertEqual(memory_ledger.make_transfer(1, 1, 10), "Нельзя переводить самому себе.")
+        self.assertEqual(memory_ledger.make_transfer(1, 99, 10), "Клиент не найден")
+        self.assertEqual(memory_ledger.pay_salary(1, 3, 10), "Перевод зарплаты запрещен")
+        self.assertEqual(memory_ledger.make_transfer(3, 1, -100), "Некорректная сумма")
+        self.assertEqual(memory_ledger.pay_salary(4, 3, -100), "Некорректная сумма")
+        self.assertEqual(memory_ledger.deposit_money(1, -100), "Некорректная сумма")
+        self.assertEqual(memory_ledger.deposit_money(1, 0), "Некорректная сумма")
+        self.assertEqual(memory_ledger.pay_salary(4, 3, 1000), "Перевод успешно выполнен")
+        self.assertEqual(memory_ledger.withdraw_money(4, 10), "Нельзя снимать деньги с расчетного счета.")
+        self.assertEqual(memory_ledger.withdraw_money(3, 500), "Сумма 500.0 успешно снята. Новый баланс: 200500.0")
+        self.assertEqual(memory_ledger.withdraw_money(3, 900000), "Недостаточно средств на счете.")
+        self.assertEqual(memory_ledger.deposit_money(1, 100), "Счет успешно пополнен для None. Новый баланс: 98100.0")
+        self.assertEqual(memory_ledger.view_balance(2), 2420.0)
+
+        memory_ledger.stop()
+        self.assertEqual(self.balances(), {1: 98100.0, 2: 2420.0, 3: 200500.0, 4: 8580.0})
+        with database.db_connection() as (conn, cursor):
+            cursor.execute('SELECT sender_id, recipient_id, amount, transfer_fee FROM transactions ORDER BY id')
+            self.assertEqual(cursor.fetchall(), [(1, 3, 20000000, 200000), (4, 3, 100000, 42000),
+                                                 (3, None, 50000, 0), (None, 1, 10000, 0)])
+        self.assertEqual(os.listdir(self.log_dir), [])
+
+    def test_account_opened_after_start(self):
+        memory_ledger.start(self.log_dir, flush_interval=60)
+        _, message = Client.Client.register('individual', 'new@example.com', '999 111 22 33', 'Password1',
+                                            full_name='Сидоров Сидор')
+        self.assertEqual(message, "Регистрация успешно завершена!")
+        self.assertEqual(memory_ledger.view_balance(5), 0.0)
+        self.assertEqual(memory_ledger.make_transfer(1, 5, 100), "Перевод успешно выполнен")
+        self.assertEqual(memory_ledger.deposit_money(5, 50),
+                         "Счет успешно пополнен для Сидоров Сидор. Новый баланс: 150.0")
+        self.assertEqual(memory_ledger.make_transfer(1, 99, 10), "Клиент не найден")
+        memory_ledger.stop()
+        self.assertEqual(self.balances()[5], 150.0)
+
+    def test_replay_after_crash(self):
+        ledger = memory_ledger.MemoryLedger(self.log_dir, flush_interval=60).start()
+        ledger.transfer(1, 3, 100000)
+        ledger.flush()
+        ledger.transfer(1, 4, 100000)
+        ledger.deposit(3, 500)
+        self.crash(ledger)
+        self.assertEqual(self.balances(), {1: 299000.0, 2: 0.0, 3: 1000.0, 4: 10000.0})
+
+        # Недописанная при сбое строка в конце журнала пропускается
+        with open(ledger._segment.name, 'a', encoding='utf-8') as segment:
+            segment.write('99\tt\t1\t3')
+
+        memory_ledger.start(self.log_dir, flush_interval=60)
+        self.assertEqual(memory_ledger.view_balance(1), 297800.0)
+        self.assertEqual(memory_ledger.view_balance(3), 1005.0)
+        self.assertEqual(memory_ledger.make_transfer(3, 1, 5), "Перевод успешно выполнен")
+        memory_ledger.stop()
+        self.assertEqual(self.balances(), {1: 297805.0, 2: 200.0, 3: 1000.0, 4: 11000.0})
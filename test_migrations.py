@@ -0,0 +1,60 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import database
+import migrations
+
+
+class TestMigrations(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        database.configure_pool(self.path)
+        database.create_tables()
+
+    def tearDown(self):
+        database.close_pool()
+        os.remove(self.path)
+
+    def test_migrations_are_applied_once_in_order(self):
+        latest = migrations.MIGRATIONS[-1][0]
+        self.assertEqual(migrations.migrate(target=1), [1])
+        self.assertEqual(migrations.migrate(), list(range(2, latest + 1)))
+        self.assertEqual(migrations.migrate(), [])
+        with database.db_connection() as (conn, cursor):
+            self.assertEqual(migrations.current_version(cursor), latest)
+
+    def test_login_lookup_uses_indexes(self):
+        migrations.migrate()
+        with database.db_connection() as (conn, cursor):
+            cursor.execute('EXPLAIN QUERY PLAN SELECT id FROM clients WHERE (email = ? OR phone = ?)', ('a', 'a'))
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+            self.assertIn('idx_clients_email', plan)
+            self.assertIn('idx_clients_phone', plan)
+
+            cursor.execute("INSERT INTO clients (email, phone) VALUES ('a@a.ru', '111 111 11 11')")
+            with self.assertRaises(sqlite3.IntegrityError):
+                cursor.execute("INSERT INTO clients (email, phone) VALUES ('a@a.ru', '222 222 22 22')")
+
+    def test_money_columns_converted_to_kopecks(self):
+        migrations.migrate(target=4)
+        with database.db_connection() as (conn, cursor):
+            cursor.execute("INSERT INTO accounts (id, client_id, account_type, balance) VALUES (1, 1, 'Лицевой', 10.5)")
+            cursor.execute('INSERT INTO transactions (sender_id, recipient_id, amount, transfer_fee) '
+                           'VALUES (1, 2, 0.29, 0.01)')
+            cursor.execute('INSERT INTO fee_ledger (amount) VALUES (0.01)')
+
+        migrations.migrate(target=5)
+        with database.db_connection() as (conn, cursor):
+            cursor.execute('SELECT balance, typeof(balance) FROM accounts')
+            self.assertEqual(cursor.fetchone(), (1050, 'integer'))
+            cursor.execute('SELECT amount, transfer_fee FROM transactions')
+            self.assertEqual(cursor.fetchone(), (29, 1))
+            cursor.execute('SELECT amount FROM fee_ledger')
+            self.assertEqual(cursor.fetchone(), (1,))
+
+
+if __name__ == '__main__':
+    unittest.main()
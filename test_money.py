@@ -0,0 +1,37 @@
+import unittest
+
+import money
+
+
+class TestMoney(unittest.TestCase):
+    def test_to_minor(self):
+        self.assertEqual(money.to_minor(100), 10000)
+        self.assertEqual(money.to_minor(0.1 + 0.2), 30)
+        self.assertEqual(money.to_minor('12.345'), 1235)
+        self.assertEqual(money.from_minor(90000), 900.0)
+        for value in ('abc', None, float('nan'), float('inf')):
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    money.to_minor(value)
+
+    def test_fees(self):
+        self.assertEqual(money.individual_fee(money.to_minor(100000)), 0)
+        self.assertEqual(money.individual_fee(money.to_minor(200000)), money.to_minor(2000))
+        self.assertEqual(money.legal_tax(money.to_minor(0.03)), 1)  # 0.6 копейки округляются вверх
+        self.assertEqual(money.salary_tax(money.to_minor(1000)), money.to_minor(420))
+
+    def test_batch_matches_scalar(self):
+        amounts = [1, 3, 12345, money.to_minor(100000), money.to_minor(100000.01), money.to_minor(10 ** 9)]
+        for fee_function in (money.individual_fee, money.legal_tax, money.salary_tax):
+            with self.subTest(fee_function=fee_function.__name__):
+                self.assertEqual(money.apply_batch(fee_function, amounts),
+                                 [fee_function(amount) for amount in amounts])
+
+    @unittest.skipIf(money.np is None, 'NumPy не установлен')
+    def test_numpy_array(self):
+        amounts = money.as_array([money.to_minor(200000), money.to_minor(50)])
+        self.assertEqual(money.individual_fee(amounts).tolist(), [money.to_minor(2000), 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
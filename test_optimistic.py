@@ -0,0 +1,91 @@
+import threading
+import unittest
+
+import database
+import instrumentation
+import main_bank_system
+import money
+import optimistic
+import transfer_engine
+from test_transfer_engine import BankDatabaseTestCase
+
+WRITERS = 32
+DEPOSITS = 5
+
+
+class TestOptimistic(BankDatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        instrumentation.reset()
+
+    def tearDown(self):
+        instrumentation.disable()
+        instrumentation.reset()
+        super().tearDown()
+
+    def versions(self):
+        with database.db_connection() as (conn, cursor):
+            cursor.execute('SELECT id, version FROM accounts ORDER BY id')
+            return dict(cursor.fetchall())
+
+    def test_stale_account_is_not_written(self):
+        with database.db_connection() as (conn, cursor):
+            account = transfer_engine.load_account(cursor, 3)
+        main_bank_system.deposit_money(3, 100)
+        with database.db_connection(immediate=True) as (conn, cursor):
+            self.assertEqual(transfer_engine.apply_deposit(cursor, 3, 5000, account), transfer_engine.CONFLICT)
+        self.assertEqual(self.balances()[3], 100.0)
+        self.assertEqual(self.versions()[3], 1)
+
+    def test_relative_updates_bump_version(self):
+        self.assertEqual(main_bank_system.make_transfer(1, 3, 1000), "Перевод успешно выполнен")
+        self.assertEqual(main_bank_system.withdraw_money(3, 100), "Сумма 100.0 успешно снята. Новый баланс: 900.0")
+        self.assertEqual(self.versions(), {1: 1, 2: 0, 3: 2, 4: 0})
+
+    def test_retry(self):
+        instrumentation.enable()
+        results = iter([transfer_engine.CONFLICT, transfer_engine.CONFLICT, 'готово'])
+
+        @instrumentation.operation('attempts')
+        def run():
+            return optimistic.retry(lambda: next(results), backoff=0)
+
+        self.assertEqual(run(), 'готово')
+        self.assertEqual(optimistic.retry(lambda: transfer_engine.CONFLICT, retries=2, backoff=0),
+                         transfer_engine.CONFLICT)
+        snapshot = instrumentation.snapshot()
+        self.assertEqual(snapshot['attempts']['conflicts'], 2)
+        self.assertEqual(snapshot[instrumentation.OTHER]['conflicts'], 3)
+
+    def test_concurrent_writers_lose_no_updates(self):
+        instrumentation.enable()
+        barrier = threading.Barrier(WRITERS)
+        results = []
+        lock = threading.Lock()
+
+        def writer():
+            barrier.wait()
+            for _ in range(DEPOSITS):
+                result = main_bank_system.deposit_money(3, 1)
+                with lock:
+                    results.append(result)
+
+        threads = [threading.Thread(target=writer) for _ in range(WRITERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Счет читается и пишется в одной транзакции на запись: ни конфликтов, ни потерянных пополнений
+        self.assertTrue(all(result.startswith('Счет успешно пополнен') for result in results), results)
+        self.assertEqual(len(results), WRITERS * DEPOSITS)
+        self.assertEqual(self.balances()[3], float(WRITERS * DEPOSITS))
+        self.assertEqual(self.versions()[3], WRITERS * DEPOSITS)
+        with database.db_connection() as (conn, cursor):
+            cursor.execute('SELECT COUNT(*), SUM(amount) FROM transactions WHERE recipient_id = 3')
+            self.assertEqual(cursor.fetchone(), (WRITERS * DEPOSITS, money.to_minor(WRITERS * DEPOSITS)))
+        self.assertEqual(instrumentation.snapshot()['deposit_money']['conflicts'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+
+import database
+import fees
+import main_bank_system
+import reconciliation
+from test_transfer_engine import BankDatabaseTestCase
+
+
+class TestReconciliation(BankDatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        # Балансы счетов фикстуры - исходные
+        with database.db_connection() as (conn, cursor):
+            cursor.execute('INSERT OR REPLACE INTO balance_checkpoint (account_id, balance) '
+                           'SELECT id, balance FROM accounts')
+
+    def test_journal_matches_balances(self):
+        main_bank_system.make_transfer(1, 3, 200000)
+        main_bank_system.pay_salary(4, 3, 1000)
+        fees.settle_fees()
+        main_bank_system.make_transfer(3, 1, 500)
+
+        for workers in (1, 2):
+            report = reconciliation.reconcile(workers=workers, chunk_size=2)
+            self.assertEqual((report['accounts'], report['transactions'], report['drifted']), (4, 3, 0))
+
+    def test_drift_is_reported(self):
+        main_bank_system.make_transfer(1, 3, 1000)
+        with database.db_connection() as (conn, cursor):
+            cursor.execute('UPDATE accounts SET balance = balance + 5000 WHERE id = 3')
+            cursor.execute('DELETE FROM fee_ledger')
+
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        os.close(fd)
+        try:
+            report = reconciliation.reconcile(output=path)
+            with open(path, encoding='utf-8') as file:
+                lines = file.read().splitlines()
+        finally:
+            os.remove(path)
+        self.assertEqual(report['drifted'], 1)
+        self.assertEqual(report['largest'], [(3, 1000.0, 1050.0, 50.0)])
+        self.assertEqual(lines, ['account_id,expected,actual,drift', '3,1000.0,1050.0,50.0'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import hashlib
+import unittest
+from unittest.mock import patch
+
+import database
+import instrumentation
+import main_bank_system
+import sessions
+from test_transfer_engine import BankDatabaseTestCase
+
+
+class TestSessionStore(unittest.TestCase):
+    def test_expiry_and_revoke(self):
+        store = sessions.SessionStore(ttl=60)
+        token = store.create(sessions.Principal(1, 'Физическое лицо', 'Иванов Иван', {1: 'Лицевой'}))
+        self.assertEqual(store.get(token).client_id, 1)
+        self.assertIsNone(store.get('чужой токен'))
+
+        store.revoke(token)
+        self.assertIsNone(store.get(token))
+
+        expired = sessions.SessionStore(ttl=-1)
+        token = expired.create(sessions.Principal(1, 'Физическое лицо', 'Иванов Иван', {}))
+        self.assertIsNone(expired.get(token))
+
+
+class TestSessions(BankDatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        with database.db_connection() as (conn, cursor):
+            cursor.execute('UPDATE clients SET email = ?, password = ? WHERE id = 1',
+                           ('ivanov@bank.ru', hashlib.sha256(b'secret').hexdigest()))
+
+    def test_authenticate(self):
+        self.assertIsNone(sessions.authenticate('ivanov@bank.ru', 'wrong'))
+        self.assertIsNone(sessions.authenticate('nobody@bank.ru', 'secret'))
+
+        principal = sessions.store.get(sessions.authenticate('ivanov@bank.ru', 'secret'))
+        self.assertEqual((principal.client_id, principal.client_type, principal.accounts),
+                         (1, 'Физическое лицо', {1: 'Лицевой'}))
+        self.assertEqual(principal.withdrawal_limit, 100000000)
+
+    def test_operations_use_principal(self):
+        principal = sessions.store.get(sessions.authenticate('ivanov@bank.ru', 'secret'))
+        statements = {}
+        instrumentation.enable()
+        try:
+            for name, args in (('make_transfer', (1, 4, 500)), ('withdraw_money', (1, 100))):
+                for session in (principal, None):
+                    instrumentation.reset()
+                    getattr(main_bank_system, name)(*args, session)
+                    statements[name, session is not None] = instrumentation.snapshot()[name]['statements']
+        finally:
+            instrumentation.disable()
+            instrumentation.reset()
+        self.assertTrue(all(count > 0 for count in statements.values()), statements)
+        # Перевод с сессией читает только получателя вместо обоих счетов, снятие - не читает счет вовсе
+        self.assertLessEqual(statements['make_transfer', True], statements['make_transfer', False])
+        self.assertLess(statements['withdraw_money', True], statements['withdraw_money', False])
+
+        self.assertEqual(main_bank_system.make_transfer(4, 1, 10, principal), "Счет не принадлежит клиенту")
+        self.assertEqual(main_bank_system.withdraw_money(4, 10, principal), "Счет не принадлежит клиенту")
+        self.assertEqual(main_bank_system.withdraw_money(1, 600, principal),
+                         "Сумма 600.0 успешно снята. Новый баланс: 298000.0")
+        self.assertEqual(main_bank_system.withdraw_money(1, 1000000, principal), "Недостаточно средств на счете.")
+        self.assertEqual(self.balances(), {1: 298000.0, 2: 200.0, 3: 0.0, 4: 11000.0})
+
+    def test_salary_batch_checks_owner(self):
+        principal = sessions.store.get(sessions.authenticate('ivanov@bank.ru', 'secret'))
+        before = self.balances()
+        instrumentation.enable()
+        try:
+            self.assertEqual(main_bank_system.pay_salary_batch(4, [(1, 1000), (3, 500)], principal),
+                             [(1, 1000.0, "Счет не принадлежит клиенту"), (3, 500.0, "Счет не принадлежит клиенту")])
+            self.assertEqual(instrumentation.snapshot()['pay_salary_batch']['calls'], 1)
+        finally:
+            instrumentation.disable()
+            instrumentation.reset()
+        self.assertEqual(self.balances(), before)
+
+    def test_money_cash_reads_account_from_session(self):
+        principal = sessions.store.get(sessions.authenticate('ivanov@bank.ru', 'secret'))
+        with patch('builtins.input', return_value='100'), patch('builtins.print'), \
+                patch('main_bank_system.db_read_connection') as read_connection:
+            result = main_bank_system.money_cash(1, principal)
+        self.assertEqual(result, "Сумма 100.0 успешно снята. Новый баланс: 299900.0")
+        read_connection.assert_not_called()
+
+    def test_select_account(self):
+        with patch('builtins.print'):
+            self.assertIsNone(main_bank_system.select_account([]))
+            self.assertEqual(main_bank_system.select_account([7]), 7)
+            with patch('builtins.input', side_effect=['1', 'x', '9']) as answers:
+                self.assertEqual(main_bank_system.select_account([7, 9]), 9)
+        self.assertEqual(answers.call_count, 3)
+
+    def test_refresh_picks_up_new_accounts(self):
+        token = sessions.authenticate('ivanov@bank.ru', 'secret')
+        with database.db_connection() as (conn, cursor):
+            cursor.execute("INSERT INTO accounts (id, client_id, account_type, balance) VALUES (5, 1, 'Лицевой', 0)")
+        self.assertEqual(sessions.refresh(token).accounts, {1: 'Лицевой', 5: 'Лицевой'})
+        self.assertEqual(sessions.store.get(token).accounts, {1: 'Лицевой', 5: 'Лицевой'})
+
+
+if __name__ == '__main__':
+    unittest.main()
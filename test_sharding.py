@@ -0,0 +1,212 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import database
+import fees
+import main_bank_system
+import reconciliation
+import sharding
+from test_transfer_engine import BankDatabaseTestCase
+
+
+class TestSharding(BankDatabaseTestCase):
+    """Фикстура переносится в 2 шарда: клиенты и счета 1, 3 - в шард 1, 2, 4 - в шард 0"""
+
+    def setUp(self):
+        super().setUp()
+        main_bank_system.make_transfer(1, 4, 5000)
+        self.directory = tempfile.TemporaryDirectory()
+        self.shards_path = os.path.join(self.directory.name, 'shards')
+        self.result = sharding.reshard(self.path, self.shards_path, shards=2, chunk_size=2)
+
+    def tearDown(self):
+        if sharding.bank is not None:
+            sharding.stop()
+        self.directory.cleanup()
+        super().tearDown()
+
+    def shard_balances(self):
+        return {account_id: sharding.view_balance(account_id) for account_id in range(1, 5)}
+
+    def test_reshard(self):
+        self.assertEqual((self.result['clients'], self.result['accounts'], self.result['transactions']), (4, 4, 1))
+        bank = sharding.start(self.shards_path)
+        self.assertEqual([bank.shard_of(account_id) for account_id in range(1, 6)], [1, 0, 1, 0, None])
+        self.assertEqual(self.shard_balances(), self.balances())
+        # Перевод между шардами записан в оба шарда с тем же id, комиссия - только у отправителя
+        for shard, fee in ((1, 100000), (0, 0)):
+            with bank.read_connection(shard) as (conn, cursor):
+                cursor.execute('SELECT id, sender_id, recipient_id, amount, transfer_fee FROM transactions')
+                self.assertEqual(cursor.fetchall(), [(1, 1, 4, 500000, fee)])
+
+    def test_same_results_as_single_database(self):
+        sharding.start(self.shards_path)
+        operations = [
+            ('make_transfer', (1, 3, 200000)),  # внутри шарда 1
+            ('pay_salary', (4, 3, 1000)),  # между шардами
+            ('make_transfer', (3, 4, 100)),
+            ('make_transfer', (4, 1, 100)),
+            ('pay_salary', (4, 1, 10 ** 6)),  # недостаточно средств
+            ('make_transfer', (4, 1, -100)),  # между шардами: отрицательная сумма
+            ('pay_salary', (4, 3, 0)),
+            ('deposit_money', (4, 300)),
+            ('withdraw_money', (3, 50)),
+            ('make_transfer', (1, 99, 10)),
+        ]
+        for name, args in operations:
+            with self.subTest(name=name, args=args):
+                self.assertEqual(getattr(sharding, name)(*args), getattr(main_bank_system, name)(*args))
+        self.assertEqual(self.shard_balances(), self.balances())
+
+        with sharding.bank.directory.connection() as conn:
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM twophase_log').fetchone()[0], 0)
+        for shard in range(2):
+            with sharding.bank.read_connection(shard) as (conn, cursor):
+                cursor.execute('SELECT COUNT(*) FROM prepared_transfers')
+                self.assertEqual(cursor.fetchone()[0], 0)
+        sharding.stop()
+
+        # Журнал каждого шарда сходится с балансами его счетов
+        for shard in range(2):
+            database.configure_pool(sharding.shard_path(self.shards_path, shard))
+            self.assertEqual(reconciliation.reconcile()['drifted'], 0)
+
+    def test_recover(self):
+        bank = sharding.ShardedBank(self.shards_path)
+        for xid, decided in (('committed', True), ('aborted', False)):
+            with bank.connection(0) as (conn, cursor):
+                sharding.prepare(cursor, xid, sharding.CREDIT, 4, 1, 1000, 0)
+            with bank.connection(1) as (conn, cursor):
+                sharding.prepare(cursor, xid, sharding.DEBIT, 1, 4, 1000, 200)
+            if decided:
+                with bank.directory.connection() as conn:
+                    conn.execute('INSERT INTO twophase_log (xid) VALUES (?)', (xid,))
+        bank.close()
+
+        bank = sharding.start(self.shards_path)
+        self.assertEqual(bank.recover(), (0, 0))
+        balances = self.balances()
+        balances.update({1: balances[1] - 12, 2: balances[2] + 2, 4: balances[4] + 10})
+        self.assertEqual(self.shard_balances(), balances)
+
+    def test_recover_waits_for_transfers_in_flight(self):
+        bank = sharding.start(self.shards_path)
+        for account_id in (1, 4):
+            bank.shard_of(account_id)  # маршруты в кэше: справочник нужен переводу только для решения
+        paused, resume = threading.Event(), threading.Event()
+        log_connection = bank.directory.connection
+
+        def paused_connection(*args, **kwargs):
+            # Перевод останавливается после prepare обоих шардов, до записи решения
+            paused.set()
+            resume.wait()
+            return log_connection(*args, **kwargs)
+
+        results = {}
+
+        def recover():
+            other = sharding.ShardedBank(self.shards_path)
+            try:
+                results['recover'] = other.recover()
+            finally:
+                other.close()
+
+        with mock.patch.object(bank.directory, 'connection', paused_connection):
+            transfer = threading.Thread(target=lambda: results.update(transfer=sharding.make_transfer(1, 4, 10)))
+            transfer.start()
+            self.assertTrue(paused.wait(5))
+            recovery = threading.Thread(target=recover)
+            recovery.start()
+            recovery.join(0.3)
+            waiting = recovery.is_alive()
+            resume.set()
+            transfer.join()
+            recovery.join()
+
+        self.assertTrue(waiting)
+        self.assertEqual(results, {'transfer': "Перевод успешно выполнен", 'recover': (0, 0)})
+        balances = self.balances()
+        balances.update({1: balances[1] - 12, 2: balances[2] + 2, 4: balances[4] + 10})
+        self.assertEqual(self.shard_balances(), balances)
+
+    def test_failure_after_decision_is_finished_by_recover(self):
+        bank = sharding.start(self.shards_path)
+        finish = sharding.finish
+        calls = []
+
+        def failing_finish(cursor, xid, commit):
+            calls.append(xid)
+            if len(calls) == 2:
+                raise sqlite3.OperationalError('disk I/O error')
+            finish(cursor, xid, commit)
+
+        with mock.patch('sharding.finish', failing_finish):
+            self.assertEqual(sharding.make_transfer(1, 4, 10), "Перевод успешно выполнен")
+        balances = self.balances()
+        self.assertEqual(self.shard_balances()[4], balances[4])
+        self.assertEqual(bank.recover(), (1, 0))
+        balances.update({1: balances[1] - 12, 2: balances[2] + 2, 4: balances[4] + 10})
+        self.assertEqual(self.shard_balances(), balances)
+
+    def pending_fees(self, bank):
+        pending = []
+        for shard in range(bank.shards):
+            with bank.read_connection(shard) as (conn, cursor):
+                pending.append(fees.pending_fees(cursor))
+        return pending
+
+    def test_settle_fees(self):
+        bank = sharding.start(self.shards_path)
+        self.assertEqual(sharding.make_transfer(1, 3, 200000), "Перевод успешно выполнен")  # внутри шарда 1
+        self.assertEqual(sharding.pay_salary(4, 3, 1000), "Перевод успешно выполнен")  # налог в шарде 0 банка
+        bank_balance = sharding.view_balance(2)
+        pending = self.pending_fees(bank)
+        self.assertTrue(all(pending), pending)
+
+        self.assertEqual(bank.settle_fees(), sum(pending))
+        self.assertEqual(self.pending_fees(bank), [0, 0])
+        self.assertEqual(sharding.view_balance(2), bank_balance)
+        self.assertEqual(bank.settle_fees(), 0)
+        sharding.stop()
+
+        for shard in range(2):
+            database.configure_pool(sharding.shard_path(self.shards_path, shard))
+            self.assertEqual(reconciliation.reconcile()['drifted'], 0)
+
+    def test_interrupted_fee_settlement_is_rolled_back(self):
+        bank = sharding.ShardedBank(self.shards_path)
+        self.assertEqual(bank.transfer(1, 3, 20000000), "Перевод успешно выполнен")
+        pending = self.pending_fees(bank)
+        self.assertGreater(pending[1], 0)
+        with bank.connection(1) as (conn, cursor):
+            self.assertEqual(sharding.prepare_fees(cursor, 'fees', 0), pending[1])
+        self.assertEqual(self.pending_fees(bank), [pending[0], 0])
+        self.assertEqual(bank.recover(), (0, 1))
+        self.assertEqual(self.pending_fees(bank), pending)
+        bank.close()
+
+    def test_commit_of_missing_transfer_fails(self):
+        bank = sharding.start(self.shards_path)
+        with bank.connection(0) as (conn, cursor):
+            sharding.finish(cursor, 'missing', commit=False)
+            with self.assertRaises(RuntimeError):
+                sharding.finish(cursor, 'missing', commit=True)
+
+    def test_register(self):
+        sharding.start(self.shards_path)
+        self.assertEqual(sharding.bank.register('individual', 'new@example.com', '999 111 22 33', 'Password1',
+                                                full_name='Сидоров Сидор'), (5, "Регистрация успешно завершена!"))
+        self.assertEqual(sharding.bank.register('individual', 'new@example.com', '999 111 22 34', 'Password1',
+                                                full_name='Сидоров Петр'), (None, 'Почта уже зарегистрирована'))
+        self.assertEqual(sharding.bank.shard_of(5), 1)
+        self.assertEqual(sharding.make_transfer(1, 5, 100), "Перевод успешно выполнен")
+        self.assertEqual(sharding.make_transfer(5, 4, 50), "Перевод успешно выполнен")
+        self.assertEqual(sharding.view_balance(5), 40.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+
+import database
+import journal
+import snapshots
+import statements
+from test_transfer_engine import BankDatabaseTestCase
+
+
+class TestSnapshots(BankDatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        with database.db_connection() as (conn, cursor):
+            # Исходные балансы - контрольная точка журнала, текущие балансы - после всех операций
+            cursor.execute('UPDATE accounts SET balance = 10000 WHERE id = 3')
+            cursor.execute('INSERT OR REPLACE INTO balance_checkpoint (account_id, balance) '
+                           'SELECT id, balance FROM accounts')
+            cursor.executemany('INSERT INTO transactions (sender_id, recipient_id, amount, transfer_fee, timestamp) '
+                               'VALUES (?, ?, ?, ?, ?)', [
+                                   (3, 1, 5000, 0, '2024-01-01 10:00:00'),
+                                   (1, 4, 10000, 2000, '2024-01-02 10:00:00'),
+                                   (1, 3, 1000, 0, '2024-01-02 12:00:00'),
+                                   (4, 1, 700, 0, '2024-01-03 10:00:00'),
+                               ])
+            cursor.executemany('UPDATE accounts SET balance = ? WHERE id = ?',
+                               [(29992700, 1), (6000, 3), (1009300, 4)])
+
+    def snapshot_rows(self):
+        with database.db_connection() as (conn, cursor):
+            cursor.execute('SELECT account_id, day, balance FROM balance_snapshots ORDER BY day, account_id')
+            return cursor.fetchall()
+
+    def test_only_touched_accounts_are_snapshotted(self):
+        self.assertEqual(snapshots.take_daily_snapshots('2024-01-01'), 2)
+        self.assertEqual(snapshots.take_daily_snapshots('2024-01-02'), 3)
+        self.assertEqual(snapshots.take_daily_snapshots('2023-12-31'), 0)
+        self.assertEqual(self.snapshot_rows(), self.expected_rows())
+
+    def expected_rows(self):
+        return [
+            (1, '2024-01-01', 30005000), (3, '2024-01-01', 5000),
+            (1, '2024-01-02', 29992000), (3, '2024-01-02', 6000), (4, '2024-01-02', 1010000),
+        ]
+
+    def test_snapshots_follow_journal_not_live_balance(self):
+        # Все операции уже свернуты в контрольную точку, а текущий баланс разошелся с журналом
+        journal.checkpoint()
+        with database.db_connection() as (conn, cursor):
+            cursor.execute('UPDATE accounts SET balance = 0 WHERE id = 1')
+        snapshots.take_daily_snapshots('2024-01-01')
+        snapshots.take_daily_snapshots('2024-01-02')
+        self.assertEqual(self.snapshot_rows(), self.expected_rows())
+
+    def test_snapshot_builds_on_previous_snapshot(self):
+        snapshots.take_daily_snapshots('2024-01-01')
+        with database.db_connection() as (conn, cursor):
+            cursor.execute("UPDATE balance_snapshots SET balance = balance + 100 WHERE account_id = 1")
+        snapshots.take_daily_snapshots('2024-01-03')
+        self.assertEqual(self.snapshot_rows()[-2:], [(1, '2024-01-03', 29992800), (4, '2024-01-03', 1009300)])
+
+    def test_balance_at_matches_history_replay(self):
+        snapshots.take_daily_snapshots('2024-01-01')
+        moments = ['2023-12-31 00:00:00', '2024-01-01 10:00:00', '2024-01-01 23:59:59', '2024-01-02 11:00:00',
+                   '2024-01-02 12:00:00', '2024-01-03 09:00:00', '2024-01-05 00:00:00']
+        for ts in moments:
+            with self.subTest(ts=ts):
+                with database.db_connection() as (conn, cursor):
+                    expected = statements.balance_after(cursor, 1, ts)
+                    self.assertEqual(snapshots.balance_at_minor(cursor, 1, ts), expected)
+        self.assertEqual(snapshots.balance_at(1, '2024-01-02 11:00:00'), 299930.0)
+        self.assertIsNone(snapshots.balance_at(99, '2024-01-02 11:00:00'))
+
+
+    def test_balance_at_without_snapshots_follows_checkpoint(self):
+        # Снимков нет, текущий баланс разошелся с журналом: баланс считается от контрольной точки
+        with database.db_connection() as (conn, cursor):
+            cursor.execute('UPDATE accounts SET balance = 0 WHERE id = 1')
+        self.assertEqual(snapshots.balance_at(1, '2024-01-02 11:00:00'), 299930.0)
+        journal.checkpoint()
+        self.assertEqual(snapshots.balance_at(1, '2024-01-02 11:00:00'), 299930.0)
+        self.assertEqual(snapshots.balance_at(1, '2023-12-31 00:00:00'), 300000.0)
+
+if __name__ == '__main__':
+    unittest.main()
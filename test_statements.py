@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+
+import database
+import main_bank_system
+import statements
+from test_transfer_engine import BankDatabaseTestCase
+
+
+class TestStatements(BankDatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        with database.db_connection() as (conn, cursor):
+            cursor.executemany('INSERT INTO transactions (sender_id, recipient_id, amount, transfer_fee, timestamp) '
+                               'VALUES (?, ?, ?, ?, ?)', [
+                                   (3, 1, 5000, 0, '2024-01-01 10:00:00'),
+                                   (1, 4, 10000, 2000, '2024-01-02 10:00:00'),
+                                   (1, 3, 1000, 0, '2024-01-02 10:00:00'),
+                                   (4, 1, 700, 0, '2024-01-03 10:00:00'),
+                               ])
+
+    def test_pages_with_running_balance(self):
+        first = statements.get_statement(1, page_size=3)
+        self.assertEqual([(entry['id'], entry['direction'], entry['balance']) for entry in first['entries']],
+                         [(4, 'in', 300000.0), (3, 'out', 299993.0), (2, 'out', 300003.0)])
+        self.assertEqual(first['entries'][2]['fee'], 20.0)
+
+        second = statements.get_statement(1, page_size=3, cursor=first['next_cursor'])
+        self.assertEqual([(entry['id'], entry['balance']) for entry in second['entries']], [(1, 300123.0)])
+        self.assertIsNone(second['next_cursor'])
+
+    def test_running_balance_and_rows_share_one_snapshot(self):
+        # Пополнение фиксируется между чтением баланса и чтением строк первой страницы
+        balance_after = statements.balance_after
+
+        def balance_then_deposit(*args):
+            balance = balance_after(*args)
+            main_bank_system.deposit_money(1, 10)
+            return balance
+
+        statements.balance_after = balance_then_deposit
+        try:
+            page = statements.get_statement(1, page_size=2)
+        finally:
+            statements.balance_after = balance_after
+        self.assertEqual([(entry['id'], entry['balance']) for entry in page['entries']],
+                         [(4, 300000.0), (3, 299993.0)])
+        self.assertEqual(statements.get_statement(1, page_size=1)['entries'][0]['balance'], 300010.0)
+
+    def test_period_bounds(self):
+        page = statements.get_statement(1, from_ts='2024-01-02 00:00:00', to_ts='2024-01-02 23:59:59')
+        self.assertEqual([(entry['id'], entry['balance']) for entry in page['entries']],
+                         [(3, 299993.0), (2, 300003.0)])
+
+    def test_export_is_consistent_with_transfers(self):
+        main_bank_system.make_transfer(1, 3, 100)
+        path = os.path.join(tempfile.mkdtemp(), 'statement.csv')
+        self.assertEqual(statements.export_statement_csv(1, path), 5)
+        entries = list(statements.iter_statement(1, page_size=2))
+        self.assertEqual(entries[0]['balance'], main_bank_system.view_balance(1))
+        self.assertEqual([entry['id'] for entry in entries], [5, 4, 3, 2, 1])
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import os
+import tempfile
+import threading
+import unittest
+
+import balance_cache
+import database
+import fees
+import main_bank_system
+import migrations
+import money
+
+
+class BankDatabaseTestCase(unittest.TestCase):
+    """Временная БД: счет банка id 2, физические лица 1 и 3, юридическое лицо 4"""
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        database.configure_pool(self.path, size=4)
+        balance_cache.cache.clear()
+        database.create_tables()
+        migrations.migrate()
+        with database.db_connection() as (conn, cursor):
+            cursor.executemany('INSERT INTO clients (id, type, full_name) VALUES (?, ?, ?)', [
+                (1, 'Физическое лицо', 'Иванов Иван'),
+                (2, 'Юридическое лицо', 'Банк'),
+                (3, 'Физическое лицо', 'Петров Петр'),
+                (4, 'Юридическое лицо', 'ООО Ромашка'),
+            ])
+            cursor.executemany('INSERT INTO accounts (id, client_id, account_type, balance) VALUES (?, ?, ?, ?)', [
+                (1, 1, 'Лицевой', money.to_minor(300000)),
+                (2, 2, 'Расчетный', 0),
+                (3, 3, 'Лицевой', 0),
+                (4, 4, 'Расчетный', money.to_minor(10000)),
+            ])
+
+    def tearDown(self):
+        database.close_pool()
+        os.remove(self.path)
+
+    def balances(self):
+        with database.db_connection() as (conn, cursor):
+            cursor.execute('SELECT id, balance FROM accounts ORDER BY id')
+            balances = dict(cursor.fetchall())
+            balances[2] = fees.bank_balance(cursor)
+            return {account_id: money.from_minor(balance) for account_id, balance in balances.items()}
+
+
+class TestTransferEngine(BankDatabaseTestCase):
+    def test_individual_transfer_with_fee(self):
+        self.assertEqual(main_bank_system.make_transfer(1, 3, 200000), "Перевод успешно выполнен")
+        self.assertEqual(self.balances(), {1: 98000.0, 2: 2000.0, 3: 200000.0, 4: 10000.0})
+
+    def test_transfer_to_company_is_taxed(self):
+        self.assertEqual(main_bank_system.make_transfer(1, 4, 1000), "Перевод успешно выполнен")
+        self.assertEqual(self.balances(), {1: 298800.0, 2: 200.0, 3: 0.0, 4: 11000.0})
+
+    def test_rejections_leave_balances_untouched(self):
+        before = self.balances()
+        self.assertEqual(main_bank_system.make_transfer(4, 3, 10),
+                         "Перевод запрещен. Нельзя переводить с расчетного счета физическим лицам.")
+        self.assertEqual(main_bank_system.make_transfer(1, 1, 10), "Нельзя переводить самому себе.")
+        self.assertEqual(main_bank_system.make_transfer(1, 99, 10), "Клиент не найден")
+        self.assertEqual(main_bank_system.make_transfer(3, 1, 10),
+                         "Недостаточно средств для перевода с учетом комиссии")
+        self.assertEqual(main_bank_system.pay_salary(4, 3, 10000),
+                         "Недостаточно средств для перевода с учетом налога")
+        self.assertEqual(main_bank_system.pay_salary(1, 3, 10), "Перевод зарплаты запрещен")
+        self.assertEqual(self.balances(), before)
+
+    def test_non_positive_amounts_are_rejected(self):
+        # Отрицательная сумма иначе прошла бы проверку balance >= ? и перевела деньги в обратную сторону
+        before = self.balances()
+        for amount in (-1000, 0):
+            with self.subTest(amount=amount):
+                self.assertEqual(main_bank_system.make_transfer(3, 1, amount), "Некорректная сумма")
+                self.assertEqual(main_bank_system.pay_salary(4, 3, amount), "Некорректная сумма")
+                self.assertEqual(main_bank_system.deposit_money(1, amount), "Некорректная сумма")
+        self.assertEqual(self.balances(), before)
+
+    def test_pay_salary(self):
+        self.assertEqual(main_bank_system.pay_salary('4', '3', 1000), "Перевод успешно выполнен")
+        self.assertEqual(self.balances(), {1: 300000.0, 2: 420.0, 3: 1000.0, 4: 8580.0})
+
+    def test_pay_salary_batch(self):
+        report = main_bank_system.pay_salary_batch(4, [(1, 1000), (3, 2000), (3, 500)])
+        self.assertEqual([line[2] for line in report], ["Перевод успешно выполнен"] * 3)
+        self.assertEqual(self.balances(), {1: 301000.0, 2: 1470.0, 3: 2500.0, 4: 10000.0 - 3500 * 1.42})
+
+    def test_pay_salary_batch_is_all_or_nothing(self):
+        before = self.balances()
+        report = main_bank_system.pay_salary_batch(4, [(1, 1000), (99, 10), (4, 10)])
+        self.assertEqual([line[2] for line in report], ["Выплата отменена из-за ошибок в ведомости",
+                                                        "Клиент не найден", "Перевод зарплаты запрещен"])
+        report = main_bank_system.pay_salary_batch(4, [(1, 5000), (3, 5000)])
+        self.assertEqual({line[2] for line in report}, {"Недостаточно средств для перевода с учетом налога"})
+        self.assertEqual(self.balances(), before)
+
+    def test_fees_are_settled_to_bank_account(self):
+        main_bank_system.make_transfer(1, 3, 200000)
+        main_bank_system.pay_salary(4, 3, 1000)
+        self.assertEqual(main_bank_system.view_balance(2), 2420.0)
+
+        self.assertEqual(fees.settle_fees(), 242000)
+        self.assertEqual(fees.settle_fees(), 0)
+        with database.db_connection() as (conn, cursor):
+            cursor.execute('SELECT balance FROM accounts WHERE id = 2')
+            self.assertEqual(cursor.fetchone()[0], 242000)
+        self.assertEqual(main_bank_system.view_balance(2), 2420.0)
+
+    def test_concurrent_transfers_do_not_lose_updates(self):
+        def worker():
+            for _ in range(25):
+                main_bank_system.make_transfer(1, 3, 100)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        balances = self.balances()
+        self.assertEqual(balances[1], 300000.0 - 100 * 100)
+        self.assertEqual(balances[3], 100 * 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+import tempfile
+import unittest
+
+import main_bank_system
+import sharding
+from test_transfer_engine import BankDatabaseTestCase
+from transfer_executor import TransferExecutor
+
+
+class TestTransferExecutor(BankDatabaseTestCase):
+    """Два раздела: счета 2 и 4 - раздел 0, счета 1 и 3 - раздел 1"""
+
+    def run_operations(self, executor):
+        executor.start()
+        try:
+            futures = [
+                executor.make_transfer(1, 3, 200000),  # внутри раздела 1
+                executor.pay_salary(4, 3, 1000),  # между разделами
+                executor.withdraw_money(3, 201000),  # после зарплаты денег хватает
+                executor.make_transfer(1, 4, 100),
+                executor.make_transfer(3, 1, 10),  # после снятия средств нет
+                executor.deposit_money(4, 300),
+                executor.make_transfer(1, 99, 10),
+            ]
+            return [future.result(timeout=10) for future in futures]
+        finally:
+            executor.stop()
+
+    def expected(self):
+        return [
+            "Перевод успешно выполнен",
+            "Перевод успешно выполнен",
+            "Сумма 201000.0 успешно снята. Новый баланс: 0.0",
+            "Перевод успешно выполнен",
+            "Недостаточно средств для перевода с учетом комиссии",
+            "Счет успешно пополнен для None. Новый баланс: 8980.0",
+            "Клиент не найден",
+        ]
+
+    def test_database(self):
+        self.assertEqual(self.run_operations(TransferExecutor(partitions=2, database_path=self.path)),
+                         self.expected())
+        self.assertEqual(self.balances(), {1: 97880.0, 2: 2440.0, 3: 0.0, 4: 8980.0})
+
+    def test_sharded_storage(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'shards')
+            sharding.reshard(self.path, path, shards=2)
+            results = self.run_operations(TransferExecutor(partitions=2, shards_path=path))
+            self.assertEqual(results, self.expected())
+
+            sharding.start(path)
+            try:
+                balances = {account_id: sharding.view_balance(account_id) for account_id in range(1, 5)}
+            finally:
+                sharding.stop()
+        self.assertEqual(balances, {1: 97880.0, 2: 2440.0, 3: 0.0, 4: 8980.0})
+
+    def test_results_match_single_process(self):
+        operations = [(1, 3, 500), (3, 1, 400), (1, 4, 100), (4, 3, 50), (3, 4, 300), (1, 3, 10 ** 6)]
+        executor = TransferExecutor(partitions=2, database_path=self.path).start()
+        try:
+            futures = [executor.make_transfer(*args) for args in operations]
+            results = [future.result(timeout=10) for future in futures]
+        finally:
+            executor.stop()
+        balances = self.balances()
+
+        # Те же переводы по одному в прежней БД дают те же ответы и балансы
+        with main_bank_system.db_connection() as (conn, cursor):
+            cursor.execute('DELETE FROM fee_ledger')
+            cursor.executemany('UPDATE accounts SET balance = ? WHERE id = ?',
+                               [(300000 * 100, 1), (0, 2), (0, 3), (10000 * 100, 4)])
+        self.assertEqual([main_bank_system.make_transfer(*args) for args in operations], results)
+        self.assertEqual(self.balances(), balances)
+
+    def test_cancelled_transfer_is_skipped(self):
+        executor = TransferExecutor(partitions=2, database_path=self.path).start()
+        try:
+            # Пока тест держит блокировку записи, раздел 0 не дойдет до отметки перевода и его можно отменить
+            with main_bank_system.db_connection(immediate=True):
+                first = executor.deposit_money(2, 10)
+                cancelled = executor.make_transfer(1, 4, 100)
+                self.assertTrue(cancelled.cancel())
+                last = executor.deposit_money(1, 10)
+            self.assertEqual(first.result(timeout=10), "Счет успешно пополнен для None. Новый баланс: 10.0")
+            self.assertEqual(last.result(timeout=10), "Счет успешно пополнен для None. Новый баланс: 300010.0")
+            self.assertEqual(executor.make_transfer(1, 4, 100).result(timeout=10), "Перевод успешно выполнен")
+        finally:
+            executor.stop()
+        self.assertEqual(self.balances()[4], 10100.0)
+
+    def test_stop_without_start(self):
+        executor = TransferExecutor(partitions=2, database_path=self.path)
+        executor.stop()
+        with self.assertRaises(RuntimeError):
+            executor.deposit_money(1, 10).result(timeout=1)
+
+    def test_crashed_partition_fails_pending_operations(self):
+        executor = TransferExecutor(partitions=2, database_path=self.path).start()
+        try:
+            self.assertEqual(executor.deposit_money(2, 10).result(timeout=10), "Счет успешно пополнен для None. "
+                                                                               "Новый баланс: 10.0")
+            executor._processes[0].kill()
+            executor._processes[0].join()
+            # Перевод между разделами ждет отметки упавшего раздела, пополнение - самого раздела
+            futures = [executor.make_transfer(1, 4, 100), executor.deposit_money(2, 10),
+                       executor.deposit_money(1, 10)]
+        finally:
+            executor.stop()
+        for future in futures:
+            with self.assertRaises(RuntimeError):
+                future.result(timeout=10)
+        self.assertEqual(self.balances()[4], 10000.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
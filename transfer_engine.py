@@ -0,0 +1,379 @@
+"""
+Движок денежных операций: переводы, выплата зарплаты, пополнение и снятие.
+
+Каждая функция apply_* работает на курсоре вызывающего кода и не фиксирует транзакцию сама, поэтому операции
+можно проводить по одной (main_bank_system), пачками (bulk_transfers) или группой в одной транзакции
+(group_commit).
+
+Все проверки и изменения одного перевода выполняются на одном курсоре внутри одной транзакции, которую открывает
+вызывающий код (make_transfer и pay_salary открывают ее через BEGIN IMMEDIATE):
+
+    1. SELECT счетов отправителя и получателя вместе с типами клиентов (один запрос);
+    2. UPDATE баланса отправителя относительным изменением с условием balance >= суммы списания;
+    3. UPDATE баланса получателя;
+    4. INSERT записи в transactions;
+    5. INSERT комиссии в fee_ledger (только если комиссия больше нуля).
+
+Комиссии не зачисляются на счет банка сразу, а копятся в fee_ledger и периодически переносятся на счет банка
+(см. fees.settle_fees), поэтому параллельные переводы не упираются в одну строку счета банка.
+
+Все суммы и балансы - целые копейки (см. money). Балансы не пересчитываются в Python, поэтому два параллельных перевода не могут затереть изменения друг друга.
+
+Пополнения и снятия наличных тоже записываются в transactions без второй стороны (см. journal).
+
+Каждое изменение баланса увеличивает версию счета (accounts.version). Пополнение записывает вычисленный баланс через
+compare_and_swap: если счет прочитан в той же транзакции на запись, конфликта быть не может; если вызывающий код
+передал счет, прочитанный раньше, и его с тех пор изменили, возвращается CONFLICT (повторы - см. optimistic).
+
+Каждая операция, изменившая баланс, сбрасывает затронутые счета в кэше балансов после COMMIT (см. balance_cache).
+"""
+import money
+from balance_cache import invalidate_on_commit
+
+INDIVIDUAL = 'Физическое лицо'
+LEGAL_ENTITY = 'Юридическое лицо'
+
+BANK_ACCOUNT_ID = 2  # Счет банка, на который зачисляются комиссии и налоги (через fee_ledger)
+
+NOT_FOUND = "Клиент не найден"
+SUCCESS = "Перевод успешно выполнен"
+SELF_TRANSFER = "Нельзя переводить самому себе."
+LEGAL_TO_INDIVIDUAL = "Перевод запрещен. Нельзя переводить с расчетного счета физическим лицам."
+SALARY_FORBIDDEN = "Перевод зарплаты запрещен"
+NO_FUNDS_FEE = "Недостаточно средств для перевода с учетом комиссии"
+NO_FUNDS_TAX = "Недостаточно средств для перевода с учетом налога"
+INVALID_AMOUNT = 'Некорректная сумма'
+SETTLEMENT_WITHDRAWAL = 'Нельзя снимать деньги с расчетного счета.'
+WITHDRAWAL_LIMIT = 'Физическим лицам запрещено снимать более 1 миллиона. Вам нужно явиться в банк.'
+NO_FUNDS = 'Недостаточно средств на счете.'
+ACCESS_DENIED = 'Счет не принадлежит клиенту'
+BATCH_CANCELLED = "Выплата отменена из-за ошибок в ведомости"
+CONFLICT = 'Счет одновременно изменен другой операцией, повторите попытку'
+
+SQLITE_MAX_PARAMS = 900  # Ограничение на число параметров в одном запросе IN (...)
+
+
+def load_parties(cursor, sender_id, recipient_id):
+    """
+    Получает счета отправителя и получателя одним запросом.
+
+    Returns:
+        tuple: Две записи (id счета, баланс, тип клиента) или None для отсутствующего счета.
+    """
+    cursor.execute('SELECT a.id, a.balance, c.type FROM accounts a JOIN clients c ON c.id = a.client_id '
+                   'WHERE a.id IN (?, ?)', (sender_id, recipient_id))
+    parties = {row[0]: row for row in cursor.fetchall()}
+    return parties.get(sender_id), parties.get(recipient_id)
+
+
+def load_client_type(cursor, account_id):
+    """Тип клиента - владельца счета или None, если счета нет"""
+    cursor.execute('SELECT c.type FROM accounts a JOIN clients c ON c.id = a.client_id WHERE a.id = ?', (account_id,))
+    row = cursor.fetchone()
+    return None if row is None else row[0]
+
+
+def party_types(cursor, sender_id, recipient_id, sender_type=None):
+    """
+    Типы клиентов отправителя и получателя.
+
+    Если тип отправителя уже известен (из сессии, см. sessions.Principal), запрашивается только получатель.
+
+    Returns:
+        tuple: (тип отправителя, тип получателя) или None, если какого-то счета нет.
+    """
+    if sender_type is not None:
+        recipient_type = load_client_type(cursor, recipient_id)
+        return None if recipient_type is None else (sender_type, recipient_type)
+
+    sender, recipient = load_parties(cursor, sender_id, recipient_id)
+    if sender is None or recipient is None:
+        return None
+    return sender[2], recipient[2]
+
+
+def transfer_fee(sender_type, recipient_type, amount):
+    """
+    Рассчитывает комиссию или налог в копейках для перевода суммы amount (в копейках) между клиентами.
+
+    Returns:
+        tuple: (комиссия, сообщение об отсутствии средств) или (None, сообщение об ошибке), если перевод запрещен.
+    """
+    if sender_type == LEGAL_ENTITY and recipient_type == INDIVIDUAL:
+        return None, LEGAL_TO_INDIVIDUAL
+
+    if sender_type == INDIVIDUAL and recipient_type == INDIVIDUAL:
+        return money.individual_fee(amount), NO_FUNDS_FEE
+
+    if recipient_type == LEGAL_ENTITY and sender_type in (INDIVIDUAL, LEGAL_ENTITY):
+        return money.legal_tax(amount), NO_FUNDS_TAX
+
+    return None, None
+
+
+def salary_tax(sender_type, recipient_type, amount):
+    """
+    Рассчитывает налог в копейках на выплату зарплаты amount (в копейках). Зарплату может платить только
+    юридическое лицо физическому.
+
+    Returns:
+        tuple: (налог, сообщение об отсутствии средств) или (None, сообщение об ошибке), если выплата запрещена.
+    """
+    if sender_type == LEGAL_ENTITY and recipient_type == INDIVIDUAL:
+        return money.salary_tax(amount), NO_FUNDS_TAX
+
+    if sender_type in (INDIVIDUAL, LEGAL_ENTITY) and recipient_type in (INDIVIDUAL, LEGAL_ENTITY):
+        return None, SALARY_FORBIDDEN
+
+    return None, None
+
+
+def move_funds(cursor, sender_id, recipient_id, amount, fee):
+    """
+    Списывает сумму с комиссией у отправителя, зачисляет сумму получателю, записывает транзакцию и начисляет
+    комиссию банку в fee_ledger.
+
+    Returns:
+        bool: False, если у отправителя недостаточно средств (в этом случае ничего не изменено).
+    """
+    total_amount = amount + fee
+    cursor.execute('UPDATE accounts SET balance = balance - ?, version = version + 1 WHERE id = ? AND balance >= ?',
+                   (total_amount, sender_id, total_amount))
+    if cursor.rowcount == 0:
+        return False
+
+    cursor.execute('UPDATE accounts SET balance = balance + ?, version = version + 1 WHERE id = ?',
+                   (amount, recipient_id))
+    cursor.execute('INSERT INTO transactions (sender_id, recipient_id, amount, transfer_fee) VALUES (?, ?, ?, ?)',
+                   (sender_id, recipient_id, amount, fee))
+    invalidate_on_commit(cursor, sender_id, recipient_id)
+    if fee:
+        record_fee(cursor, fee, cursor.lastrowid)
+    return True
+
+
+def record_fee(cursor, fee, transaction_id=None):
+    """Начисляет комиссию банку: добавляет запись в fee_ledger"""
+    cursor.execute('INSERT INTO fee_ledger (transaction_id, amount) VALUES (?, ?)', (transaction_id, fee))
+    invalidate_on_commit(cursor, BANK_ACCOUNT_ID)
+
+
+def apply_transfer(cursor, sender_id, recipient_id, amount, sender_type=None):
+    """
+    Выполняет перевод между клиентами по правилам make_transfer в текущей транзакции курсора.
+
+    sender_type - тип клиента-отправителя, если он уже известен вызывающему коду.
+    """
+    if amount <= 0:
+        return INVALID_AMOUNT
+    sender_id, recipient_id = int(sender_id), int(recipient_id)
+    types = party_types(cursor, sender_id, recipient_id, sender_type)
+    if types is None:
+        return NOT_FOUND
+
+    fee, message = transfer_fee(*types, amount)
+    if fee is None:
+        return message
+
+    if sender_id == recipient_id:
+        return SELF_TRANSFER
+
+    if not move_funds(cursor, sender_id, recipient_id, amount, fee):
+        return message
+    return SUCCESS
+
+
+def apply_salary(cursor, sender_id, recipient_id, salary_amount, sender_type=None):
+    """Выполняет выплату зарплаты по правилам pay_salary в текущей транзакции курсора"""
+    if salary_amount <= 0:
+        return INVALID_AMOUNT
+    sender_id, recipient_id = int(sender_id), int(recipient_id)
+    types = party_types(cursor, sender_id, recipient_id, sender_type)
+    if types is None:
+        return NOT_FOUND
+
+    tax, message = salary_tax(*types, salary_amount)
+    if tax is None:
+        return message
+
+    if not move_funds(cursor, sender_id, recipient_id, salary_amount, tax):
+        return message
+    return SUCCESS
+
+
+def load_account_types(cursor, account_ids):
+    """Возвращает словарь {id счета: тип клиента} для переданных счетов, запрашивая их пачками"""
+    account_ids = list(set(account_ids))
+    types = {}
+    for start in range(0, len(account_ids), SQLITE_MAX_PARAMS):
+        chunk = account_ids[start:start + SQLITE_MAX_PARAMS]
+        placeholders = ', '.join('?' * len(chunk))
+        cursor.execute(f'SELECT a.id, c.type FROM accounts a JOIN clients c ON c.id = a.client_id '
+                       f'WHERE a.id IN ({placeholders})', chunk)
+        types.update(cursor.fetchall())
+    return types
+
+
+def apply_salary_batch(cursor, sender_id, payments):
+    """
+    Выплачивает зарплату списку сотрудников в текущей транзакции курсора.
+
+    Ведомость проводится целиком или не проводится совсем: если хотя бы одна строка некорректна или у отправителя
+    не хватает средств на всю ведомость с налогом, ничего не изменяется.
+
+    Args:
+        sender_id (int): Счет юридического лица, с которого выплачивается зарплата.
+        payments (list): Список пар (счет получателя, сумма зарплаты в копейках).
+
+    Returns:
+        tuple: (True, если ведомость проведена; отчет - список (счет получателя, сумма, сообщение) по каждой строке).
+    """
+    sender_id = int(sender_id)
+    payments = [(int(recipient_id), amount) for recipient_id, amount in payments]
+    types = load_account_types(cursor, [sender_id] + [recipient_id for recipient_id, _ in payments])
+    sender_type = types.get(sender_id)
+
+    messages = []
+    for recipient_id, amount in payments:
+        recipient_type = types.get(recipient_id)
+        if sender_type is None or recipient_type is None:
+            messages.append(NOT_FOUND)
+        elif amount <= 0:
+            messages.append(INVALID_AMOUNT)
+        elif (sender_type, recipient_type) != (LEGAL_ENTITY, INDIVIDUAL):
+            messages.append(SALARY_FORBIDDEN)
+        else:
+            messages.append(SUCCESS)
+
+    if any(message != SUCCESS for message in messages):
+        report = [(recipient_id, amount, BATCH_CANCELLED if message == SUCCESS else message)
+                  for (recipient_id, amount), message in zip(payments, messages)]
+        return False, report
+
+    taxes = money.apply_batch(money.salary_tax, [amount for _, amount in payments])
+    total_tax = sum(taxes)
+    total_amount = sum(amount for _, amount in payments) + total_tax
+    cursor.execute('UPDATE accounts SET balance = balance - ?, version = version + 1 WHERE id = ? AND balance >= ?',
+                   (total_amount, sender_id, total_amount))
+    if cursor.rowcount == 0:
+        return False, [(recipient_id, amount, NO_FUNDS_TAX) for recipient_id, amount in payments]
+
+    cursor.executemany('UPDATE accounts SET balance = balance + ?, version = version + 1 WHERE id = ?',
+                       [(amount, recipient_id) for recipient_id, amount in payments])
+    cursor.executemany('INSERT INTO transactions (sender_id, recipient_id, amount, transfer_fee) VALUES (?, ?, ?, ?)',
+                       [(sender_id, recipient_id, amount, tax) for (recipient_id, amount), tax in zip(payments, taxes)])
+    invalidate_on_commit(cursor, sender_id, *(recipient_id for recipient_id, _ in payments))
+    if total_tax:
+        record_fee(cursor, total_tax)
+    return True, [(recipient_id, amount, SUCCESS) for recipient_id, amount in payments]
+
+
+def load_account(cursor, account_id):
+    """
+    Получает счет вместе с типом клиента одним запросом.
+
+    Returns:
+        tuple: (id счета, id клиента, тип счета, владелец, баланс, тип клиента, версия) или None.
+    """
+    cursor.execute('SELECT a.id, a.client_id, a.account_type, a.owner_name, a.balance, c.type, a.version '
+                   'FROM accounts a LEFT JOIN clients c ON c.id = a.client_id WHERE a.id = ?', (account_id,))
+    return cursor.fetchone()
+
+
+def compare_and_swap(cursor, account_id, version, balance):
+    """
+    Записывает новый баланс счета, только если версия счета не изменилась с момента чтения.
+
+    Returns:
+        bool: False, если баланс успела изменить другая операция (ничего не изменено).
+    """
+    cursor.execute('UPDATE accounts SET balance = ?, version = version + 1 WHERE id = ? AND version = ?',
+                   (balance, account_id, version))
+    return cursor.rowcount == 1
+
+
+def apply_deposit(cursor, account_id, amount, account=None):
+    """
+    Пополняет счет на amount копеек по правилам deposit_money в текущей транзакции курсора.
+
+    account - запись load_account, прочитанная заранее (например, вне транзакции на запись); по умолчанию счет
+    читается в текущей транзакции. Новый баланс записывается через compare_and_swap: если счет с момента чтения
+    изменился, возвращается CONFLICT.
+    """
+    if amount <= 0:
+        return INVALID_AMOUNT
+    if account is None:
+        account = load_account(cursor, account_id)
+    if account is None:
+        return NOT_FOUND
+
+    new_balance = account[4] + amount  # Вычисление нового баланса
+    if not compare_and_swap(cursor, account_id, account[6], new_balance):
+        return CONFLICT
+    journal_cash(cursor, None, account_id, amount)
+    invalidate_on_commit(cursor, account_id)
+    return deposit_message(account[3], new_balance)
+
+
+def journal_cash(cursor, sender_id, recipient_id, amount):
+    """Записывает в журнал transactions пополнение (sender_id None) или снятие наличных (recipient_id None)"""
+    cursor.execute('INSERT INTO transactions (sender_id, recipient_id, amount, transfer_fee) VALUES (?, ?, ?, 0)',
+                   (sender_id, recipient_id, amount))
+
+
+def deposit_message(owner_name, new_balance):
+    """Сообщение об успешном пополнении счета"""
+    return f"Счет успешно пополнен для {owner_name}. Новый баланс: {money.from_minor(new_balance)}"
+
+
+def withdrawal_limit(client_type):
+    """Лимит снятия наличных в копейках для типа клиента (None - без лимита)"""
+    return money.WITHDRAWAL_LIMIT_INDIVIDUAL if client_type == INDIVIDUAL else None
+
+
+def withdrawal_error(account_type, client_type, amount):
+    """Проверяет снятие amount копеек по правилам money_cash; возвращает сообщение об ошибке или None"""
+    if account_type == 'Расчетный':
+        return SETTLEMENT_WITHDRAWAL
+
+    if amount <= 0:
+        return INVALID_AMOUNT
+
+    limit = withdrawal_limit(client_type)
+    if limit is not None and amount > limit:
+        return WITHDRAWAL_LIMIT
+    return None
+
+
+def apply_withdrawal(cursor, account_id, amount, account_type=None, client_type=None):
+    """
+    Снимает amount копеек наличными по правилам money_cash в текущей транзакции курсора.
+
+    Если тип счета и тип клиента уже известны вызывающему коду (из сессии), счет заранее не читается: снятие
+    выполняется одним UPDATE с условием balance >= amount.
+    """
+    if account_type is None:
+        account = load_account(cursor, account_id)
+        if account is None:
+            return NOT_FOUND
+        account_type, client_type = account[2], account[5]
+
+    message = withdrawal_error(account_type, client_type, amount)
+    if message is not None:
+        return message
+
+    cursor.execute('UPDATE accounts SET balance = balance - ?, version = version + 1 WHERE id = ? AND balance >= ? '
+                   'RETURNING balance', (amount, account_id, amount))
+    row = cursor.fetchone()
+    if row is None:
+        return NO_FUNDS
+
+    new_balance = row[0]
+    journal_cash(cursor, account_id, None, amount)
+    invalidate_on_commit(cursor, account_id)
+    return withdrawal_message(amount, new_balance)
+
+
+def withdrawal_message(amount, new_balance):
+    """Сообщение об успешном снятии наличных"""
+    return f"Сумма {money.from_minor(amount)} успешно снята. Новый баланс: {money.from_minor(new_balance)}"
@@ -0,0 +1,388 @@
+"""
+Многопроцессный исполнитель денежных операций, разбитый на разделы по счету отправителя.
+
+Потоки Python не ускоряют проверки и расчеты операций (их держит GIL), а запись в SQLite и так идет по одной.
+Исполнитель запускает partitions процессов; операция попадает в раздел account_id % partitions по счету
+отправителя (у пополнения и снятия - по своему счету). Каждый процесс держит свое соединение с БД и проводит
+операции своего раздела пачками, как group_commit: пачка - одна транзакция, каждая операция - в своем SAVEPOINT
+и по правилам transfer_engine (make_transfer, pay_salary, deposit_money, money_cash). Хранилище - одна БД в
+режиме WAL или шардированное хранилище (sharding): там операции подряд в одном шарде идут одной транзакцией, а
+переводы между шардами - через двухфазный коммит ShardedBank.
+
+Порядок операций одного счета сохраняется. Очередь раздела FIFO, поэтому операции со счетом в своем разделе
+проводятся в порядке поступления. Перевод, получатель которого в другом разделе, идет через координатор: в
+очереди обоих разделов ставится отметка (fence). Процесс, дойдя до отметки, фиксирует текущую пачку и ждет.
+Когда отметки достигли оба раздела, перевод проводит процесс отправителя, после чего продолжает раздел
+получателя. Отметки ставятся в обе очереди под одной блокировкой, поэтому во всех очередях они идут в одном
+порядке и не могут ждать друг друга по кругу.
+
+Если процесс раздела падает, все неразрешенные операции (и новые) завершаются RuntimeError: их результат неизвестен,
+а переводы через отметки с упавшим разделом не дождались бы его. stop() так же завершает ошибкой операции, которые
+не успели провести, и останавливает оставшиеся процессы, если один из них упал.
+
+Процессы исполнителя не сбрасывают кэш балансов вызывающего процесса: просмотр баланса там может отставать
+не больше balance_cache.TTL.
+
+Пример:
+    executor = TransferExecutor(partitions=4).start()
+    future = executor.make_transfer(1, 3, 100)
+    print(future.result())
+    executor.stop()
+"""
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import database
+import money
+import sharding
+import transfer_engine
+from database import ConnectionPool
+
+MAX_BATCH = 256
+MAX_LATENCY = 0.002  # секунд
+POLL_INTERVAL = 0.1  # секунд между проверками, живы ли процессы разделов
+
+# Виды операций
+TRANSFER = 'transfer'
+SALARY = 'salary'
+DEPOSIT = 'deposit'
+WITHDRAWAL = 'withdrawal'
+
+OPERATIONS = {
+    TRANSFER: transfer_engine.apply_transfer,
+    SALARY: transfer_engine.apply_salary,
+    DEPOSIT: transfer_engine.apply_deposit,
+    WITHDRAWAL: transfer_engine.apply_withdrawal,
+}
+
+# Сообщения между исполнителем и процессами разделов
+OPERATION = 'operation'  # (OPERATION, id запроса, вид, аргументы)
+FENCE = 'fence'  # (FENCE, id запроса)
+FENCED = 'fenced'  # (FENCED, id запроса, раздел)
+RESULT = 'result'  # (RESULT, id запроса, успех, результат или исключение)
+APPLY = 'apply'  # (APPLY, id запроса, вид, аргументы) - провести перевод отметки и продолжить
+CONTINUE = 'continue'  # (CONTINUE,) - продолжить после отметки
+
+
+def accounts_of(kind, args):
+    """Счета операции: отправитель и получатель перевода или счет пополнения и снятия"""
+    return args[:2] if kind in (TRANSFER, SALARY) else args[:1]
+
+
+def apply_in_savepoints(cursor, operations):
+    """Проводит операции [(вид, аргументы)] на курсоре, каждую в своем SAVEPOINT; возвращает [(успех, результат)]"""
+    results = []
+    for kind, args in operations:
+        cursor.execute('SAVEPOINT operation')
+        try:
+            results.append((True, OPERATIONS[kind](cursor, *args)))
+        except Exception as error:
+            cursor.execute('ROLLBACK TO operation')
+            results.append((False, error))
+        cursor.execute('RELEASE operation')
+    return results
+
+
+class DatabaseStorage:
+    """Одна БД: пачка операций - одна транзакция"""
+
+    def __init__(self, path, pragmas=None):
+        self.pool = ConnectionPool(path, size=1, pragmas=pragmas)
+
+    def apply(self, operations):
+        with self.pool.connection(immediate=True) as conn:
+            return apply_in_savepoints(conn.cursor(), operations)
+
+    def close(self):
+        self.pool.close()
+
+
+class ShardedStorage:
+    """Шардированное хранилище: операции подряд в одном шарде - одна транзакция, между шардами - двухфазный коммит"""
+
+    def __init__(self, path, pragmas=None):
+        self.bank = sharding.ShardedBank(path, pool_size=1, pragmas=pragmas)
+        self.methods = {TRANSFER: self.bank.transfer, SALARY: self.bank.salary, DEPOSIT: self.bank.deposit,
+                        WITHDRAWAL: self.bank.withdrawal}
+
+    def local_shard(self, kind, args):
+        """Шард, в котором лежат все счета операции, или None"""
+        shards = {self.bank.shard_of(account_id) for account_id in accounts_of(kind, args)}
+        return shards.pop() if len(shards) == 1 else None
+
+    def apply(self, operations):
+        results = []
+        run, run_shard = [], None
+        for kind, args in operations:
+            shard = self.local_shard(kind, args)
+            if run and shard != run_shard:
+                results.extend(self._apply_run(run_shard, run))
+                run = []
+            if shard is None:
+                # Счета нет или счета в разных шардах: ShardedBank ответит NOT_FOUND или проведет двухфазный коммит
+                try:
+                    results.append((True, self.methods[kind](*args)))
+                except Exception as error:
+                    results.append((False, error))
+            else:
+                run.append((kind, args))
+                run_shard = shard
+        if run:
+            results.extend(self._apply_run(run_shard, run))
+        return results
+
+    def _apply_run(self, shard, operations):
+        # Одновременно открыта транзакция только в одном шарде, иначе процессы могли бы ждать шарды друг друга
+        with self.bank.connection(shard, immediate=True) as (conn, cursor):
+            return apply_in_savepoints(cursor, operations)
+
+    def close(self):
+        self.bank.close()
+
+
+def next_batch(requests, max_batch, max_latency):
+    """Ждет первое сообщение и добирает пачку до max_batch или до истечения max_latency"""
+    batch = [requests.get()]
+    deadline = time.monotonic() + max_latency
+    while batch[-1] is not None and len(batch) < max_batch:
+        timeout = deadline - time.monotonic()
+        try:
+            batch.append(requests.get(timeout=timeout) if timeout > 0 else requests.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def run_partition(partition, database_path, shards_path, pragmas, max_batch, max_latency, requests, resume, results):
+    """Процесс раздела: проводит операции из очереди requests и отправляет результаты в results"""
+    storage = ShardedStorage(shards_path, pragmas) if shards_path else DatabaseStorage(database_path, pragmas)
+
+    def flush(pending):
+        if not pending:
+            return
+        try:
+            outcomes = storage.apply([(kind, args) for _, kind, args in pending])
+        except Exception as error:
+            # Пачку не удалось зафиксировать: ни одна операция не проведена
+            outcomes = [(False, error)] * len(pending)
+        for (request_id, _, _), (succeeded, value) in zip(pending, outcomes):
+            results.put((RESULT, request_id, succeeded, value))
+
+    try:
+        running = True
+        while running:
+            pending = []
+            for message in next_batch(requests, max_batch, max_latency):
+                if message is None:
+                    running = False
+                    break
+                if message[0] == OPERATION:
+                    pending.append(message[1:])
+                    continue
+                flush(pending)
+                pending = []
+                results.put((FENCED, message[1], partition))
+                command = resume.get()
+                if command[0] == APPLY:
+                    flush([command[1:]])
+            flush(pending)
+    finally:
+        storage.close()
+
+
+class Fence:
+    """Перевод между разделами, ожидающий, пока оба раздела дойдут до его отметки"""
+
+    __slots__ = ('waiting', 'sender_partition', 'recipient_partition', 'kind', 'args')
+
+    def __init__(self, sender_partition, recipient_partition, kind, args):
+        self.waiting = {sender_partition, recipient_partition}
+        self.sender_partition = sender_partition
+        self.recipient_partition = recipient_partition
+        self.kind = kind
+        self.args = args
+
+
+class TransferExecutor:
+    """Процессы разделов, очереди к ним и координатор переводов между разделами"""
+
+    def __init__(self, partitions=None, database_path=None, shards_path=None, pragmas=None, max_batch=MAX_BATCH,
+                 max_latency=MAX_LATENCY):
+        """
+        Args:
+            partitions (int): Число процессов-разделов (по умолчанию - число ядер).
+            database_path (str): Файл БД (по умолчанию БД общего пула, см. database.get_pool).
+            shards_path (str): Каталог шардированного хранилища (sharding); если задан, database_path не нужен.
+            pragmas (dict): PRAGMA соединений процессов (см. database.storage_profile).
+            max_batch (int): Наибольшее число операций в пачке раздела.
+            max_latency (float): Сколько секунд раздел добирает пачку после первой операции.
+        """
+        self.partitions = partitions or os.cpu_count() or 1
+        self.database_path = database_path or database.get_pool().database
+        self.shards_path = shards_path
+        self.pragmas = pragmas
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self._ids = itertools.count(1)
+        self._futures = {}
+        self._fences = {}
+        self._lock = threading.Lock()
+        self._processes = []
+        self._requests = []
+        self._resume = []
+        self._results = None
+        self._collector = None
+        self._stopping = threading.Event()
+        self._error = None
+
+    def start(self):
+        """Запускает процессы разделов и поток, собирающий их результаты"""
+        context = multiprocessing.get_context()
+        self._results = context.Queue()
+        self._stopping.clear()
+        self._error = None
+        for partition in range(self.partitions):
+            requests, resume = context.Queue(), context.Queue()
+            process = context.Process(target=run_partition, name=f'transfer-partition-{partition}', daemon=True,
+                                      args=(partition, self.database_path, self.shards_path, self.pragmas,
+                                            self.max_batch, self.max_latency, requests, resume, self._results))
+            process.start()
+            self._requests.append(requests)
+            self._resume.append(resume)
+            self._processes.append(process)
+        self._collector = threading.Thread(target=self._collect, name='transfer-executor', daemon=True)
+        self._collector.start()
+        return self
+
+    def stop(self):
+        """
+        Проводит уже поставленные операции и останавливает процессы. Операции, которые не удалось провести (упал
+        раздел), завершаются RuntimeError. Можно вызывать и у незапущенного исполнителя.
+        """
+        for requests in self._requests:
+            requests.put(None)
+        self._join_partitions()
+        # В очередь результатов пишут только разделы: остановленный раздел мог оставить ее блокировку записи занятой
+        self._stopping.set()
+        if self._collector is not None:
+            self._collector.join()
+        self._fail_pending(RuntimeError('Исполнитель остановлен до проведения операции'))
+        self._processes, self._requests, self._resume = [], [], []
+        self._results, self._collector = None, None
+
+    def _join_partitions(self):
+        """Ждет процессы разделов; если раздел упал, останавливает остальные - они могут ждать его отметки"""
+        while any(process.is_alive() for process in self._processes):
+            if any(process.exitcode for process in self._processes):
+                for process in self._processes:
+                    process.terminate()
+            for process in self._processes:
+                process.join(POLL_INTERVAL)
+
+    def _fail_pending(self, error):
+        """Завершает ошибкой error все неразрешенные операции; новые операции тоже получат ее"""
+        with self._lock:
+            if self._error is None:
+                self._error = error
+            futures = list(self._futures.values())
+            self._futures.clear()
+            self._fences.clear()
+        for future in futures:
+            if future.done():
+                continue
+            if future.running() or future.set_running_or_notify_cancel():
+                future.set_exception(error)
+
+    def partition_of(self, account_id):
+        return int(account_id) % self.partitions
+
+    def submit(self, kind, *args):
+        """
+        Ставит операцию в очередь раздела ее отправителя (через координатор, если получатель в другом разделе).
+
+        Args:
+            kind (str): TRANSFER, SALARY, DEPOSIT или WITHDRAWAL.
+            args: Аргументы функции transfer_engine без курсора (суммы в копейках).
+
+        Returns:
+            Future: Сообщение о результате операции после фиксации. Перевод между разделами можно отменить
+                (Future.cancel), пока оба раздела не дошли до его отметки; остальные операции уже в очереди.
+        """
+        future = Future()
+        partitions = [self.partition_of(account_id) for account_id in accounts_of(kind, args)]
+        with self._lock:
+            if self._error is not None:
+                future.set_exception(self._error)
+                return future
+            request_id = next(self._ids)
+            self._futures[request_id] = future
+            if len(set(partitions)) == 1:
+                # Операция уходит в раздел сразу: отменить ее после submit уже нельзя
+                future.set_running_or_notify_cancel()
+                self._requests[partitions[0]].put((OPERATION, request_id, kind, args))
+            else:
+                self._fences[request_id] = Fence(partitions[0], partitions[1], kind, args)
+                for partition in partitions:
+                    self._requests[partition].put((FENCE, request_id))
+        return future
+
+    def make_transfer(self, sender_id, recipient_id, amount):
+        """Перевод между клиентами (сумма в рублях)"""
+        return self.submit(TRANSFER, int(sender_id), int(recipient_id), money.to_minor(amount))
+
+    def pay_salary(self, sender_id, recipient_id, salary_amount):
+        """Выплата зарплаты (сумма в рублях)"""
+        return self.submit(SALARY, int(sender_id), int(recipient_id), money.to_minor(salary_amount))
+
+    def deposit_money(self, account_id, amount):
+        """Пополнение счета (сумма в рублях)"""
+        return self.submit(DEPOSIT, int(account_id), money.to_minor(amount))
+
+    def withdraw_money(self, account_id, amount):
+        """Снятие наличных (сумма в рублях)"""
+        return self.submit(WITHDRAWAL, int(account_id), money.to_minor(amount))
+
+    def _collect(self):
+        """Выставляет результаты операций и ведет переводы между разделами через их отметки"""
+        while True:
+            try:
+                message = self._results.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    return
+                crashed = [process for process in self._processes if process.exitcode]
+                if crashed:
+                    self._fail_pending(RuntimeError(f'Процесс {crashed[0].name} завершился с кодом '
+                                                    f'{crashed[0].exitcode}: результат операции неизвестен'))
+                    return
+                continue
+            if message[0] == FENCED:
+                _, request_id, partition = message
+                fence = self._fences[request_id]
+                fence.waiting.discard(partition)
+                if not fence.waiting:
+                    if self._futures[request_id].set_running_or_notify_cancel():
+                        self._resume[fence.sender_partition].put((APPLY, request_id, fence.kind, fence.args))
+                    else:
+                        # Перевод отменен, пока разделы шли к отметке: оба продолжают без него
+                        del self._fences[request_id], self._futures[request_id]
+                        for partition in (fence.sender_partition, fence.recipient_partition):
+                            self._resume[partition].put((CONTINUE,))
+                continue
+
+            _, request_id, succeeded, value = message
+            fence = self._fences.pop(request_id, None)
+            if fence is not None:
+                self._resume[fence.recipient_partition].put((CONTINUE,))
+            future = self._futures.pop(request_id)
+            if future.done():
+                continue
+            if succeeded:
+                future.set_result(value)
+            else:
+                future.set_exception(value)